@@ -22,11 +22,12 @@ from .read.metadata import (
     read_clipboard,
     read_csv,
     read_dbs,
+    read_dbs_many,
     read_excel,
     read_fwf,
     read_table,
 )
-from .read.titrations import read_dat, write_dat
+from .read.titrations import read_dat, write_dat, write_dat_many
 
 
 # For backwards-compatibility
@@ -43,10 +44,12 @@ __all__ = [
     "read_clipboard",
     "read_csv",
     "read_dbs",
+    "read_dbs_many",
     "read_excel",
     "read_fwf",
     "read_table",
     "write_dat",
+    "write_dat_many",
     "Titration",
     "to_Titration",
 ]
@@ -0,0 +1,287 @@
+# Calkulate: seawater total alkalinity from titration data
+# Copyright (C) 2019--2025  Matthew P. Humphreys  (GNU GPLv3)
+"""Keep track of batch-averaged titrant molinities as reference materials are
+edited.
+
+`BatchStats` holds running sums of the good `titrant_molinity_here` values in
+each `analysis_batch`, so that changing one reference material's
+`titrant_molinity_here` or `reference_good` updates its batch's mean, standard
+deviation and count in constant time, instead of recalculating every batch
+with `calk.dataset.get_batches`.
+"""
+
+import numpy as np
+import pandas as pd
+
+from . import dataset
+
+
+class BatchStats:
+    """
+    calkulate.batches.BatchStats
+    ============================
+    Titrant molinity statistics for each `analysis_batch` that can be updated
+    one reference material at a time.
+
+    Parameters
+    ----------
+    ds : pandas.DataFrame
+        A calibrated dataset, with `analysis_batch`, `titrant_molinity_here`
+        and `reference_good` columns.
+
+    Methods
+    -------
+    update
+        Change one titration's `titrant_molinity_here` and/or
+        `reference_good` and update its batch's statistics.
+    get
+        Get the mean, standard deviation and count for one batch.
+    to_frame
+        Get the statistics for all batches, like `calk.dataset.get_batches`.
+    """
+
+    def __init__(self, ds):
+        self.analysis_batch = ds.analysis_batch.to_dict()
+        self.batch_dtype = ds.analysis_batch.dtype
+        self.titrant_molinity_here = ds.titrant_molinity_here.to_dict()
+        self.reference_good = ds.reference_good.astype(bool).to_dict()
+        good = (
+            ds.reference_good.astype(bool) & ds.titrant_molinity_here.notnull()
+        )
+        grouped = ds.titrant_molinity_here[good].groupby(
+            ds.analysis_batch[good]
+        )
+        # Sums are of differences from a fixed shift for each batch (its
+        # initial mean), which avoids losing precision in the variance
+        self.shift = grouped.mean().to_dict()
+        deviation = ds.titrant_molinity_here[good] - ds.analysis_batch[
+            good
+        ].map(self.shift)
+        grouped = deviation.groupby(ds.analysis_batch[good])
+        self.count = grouped.count().to_dict()
+        self.sum = grouped.sum().to_dict()
+        self.sum_sq = (
+            (deviation**2).groupby(ds.analysis_batch[good]).sum().to_dict()
+        )
+        for batch in ds.analysis_batch.dropna().unique():
+            self.shift.setdefault(batch, np.nan)
+            self.count.setdefault(batch, 0)
+            self.sum.setdefault(batch, 0.0)
+            self.sum_sq.setdefault(batch, 0.0)
+
+    def _add(self, index, sign):
+        """Add (`sign=1`) or remove (`sign=-1`) one titration's contribution
+        to its batch's sums.
+        """
+        batch = self.analysis_batch[index]
+        value = self.titrant_molinity_here[index]
+        if (
+            not self.reference_good[index]
+            or pd.isnull(value)
+            or pd.isnull(batch)
+        ):
+            return
+        if np.isnan(self.shift[batch]):
+            self.shift[batch] = value
+        deviation = value - self.shift[batch]
+        self.count[batch] += sign
+        self.sum[batch] += sign * deviation
+        self.sum_sq[batch] += sign * deviation**2
+        if self.count[batch] == 0:
+            # Reset exactly, so rounding errors don't build up
+            self.shift[batch] = np.nan
+            self.sum[batch] = 0.0
+            self.sum_sq[batch] = 0.0
+
+    def update(self, index, titrant_molinity_here=None, reference_good=None):
+        """Change one titration's `titrant_molinity_here` and/or
+        `reference_good` and update its batch's statistics.
+
+        Parameters
+        ----------
+        index
+            The row index of the titration in the dataset.
+        titrant_molinity_here : float, optional
+            The new `titrant_molinity_here`, by default `None` (no change).
+        reference_good : bool, optional
+            The new `reference_good`, by default `None` (no change).
+
+        Returns
+        -------
+        dict
+            The updated statistics for the titration's batch (see `get`).
+        """
+        self._add(index, -1)
+        if titrant_molinity_here is not None:
+            self.titrant_molinity_here[index] = titrant_molinity_here
+        if reference_good is not None:
+            self.reference_good[index] = bool(reference_good)
+        self._add(index, 1)
+        return self.get(self.analysis_batch[index])
+
+    def get(self, batch):
+        """Get the statistics for one batch.
+
+        Parameters
+        ----------
+        batch
+            The `analysis_batch` value.
+
+        Returns
+        -------
+        dict
+            With the keys `titrant_molinity`, `titrant_molinity__std` and
+            `titrant_molinity__count`, as in `calk.dataset.get_batches`.
+        """
+        n = self.count[batch]
+        mean_deviation = self.sum[batch] / n if n > 0 else np.nan
+        if n > 1:
+            variance = (self.sum_sq[batch] - n * mean_deviation**2) / (n - 1)
+            std = np.sqrt(max(variance, 0))
+        else:
+            std = np.nan
+        return {
+            "titrant_molinity": self.shift[batch] + mean_deviation,
+            "titrant_molinity__std": std,
+            "titrant_molinity__count": float(n),
+        }
+
+    def to_frame(self):
+        """Get the statistics for all batches.
+
+        Returns
+        -------
+        pandas.DataFrame
+            In the same format as from `calk.dataset.get_batches`.
+        """
+        index = pd.Index(
+            sorted(self.count), dtype=self.batch_dtype, name="analysis_batch"
+        )
+        return pd.DataFrame(
+            [self.get(batch) for batch in index],
+            index=index,
+            columns=[
+                "titrant_molinity",
+                "titrant_molinity__std",
+                "titrant_molinity__count",
+            ],
+        )
+
+
+def get_alkalinity_sensitivity(ds, method="ratio", step=1e-3, **kwargs):
+    """Get the sensitivity of each titration's `alkalinity` to its
+    `titrant_molinity` and store it in the `alkalinity_sensitivity` column.
+
+    Parameters
+    ----------
+    ds : pandas.DataFrame
+        A solved dataset.
+    method : str, optional
+        How to get the sensitivity, one of
+            "ratio" (default) - `alkalinity / titrant_molinity`, because
+                alkalinity is very nearly proportional to titrant molinity
+            "solve" - solve every titration again with `titrant_molinity`
+                increased by a factor of `1 + step`
+    step : float, optional
+        The relative change in `titrant_molinity` for `method="solve"`, by
+        default 1e-3.
+    kwargs
+        Any kwargs that were passed to `solve`, for `method="solve"`.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The dataset with the `alkalinity_sensitivity` column added, in
+        µmol/kg-sol per mol/kg-sol.
+    """
+    if method == "ratio":
+        ds["alkalinity_sensitivity"] = ds.alkalinity / ds.titrant_molinity
+    elif method == "solve":
+        ds_step = pd.DataFrame(
+            ds.drop(
+                columns=["alkalinity_certified", "alkalinity_offset"],
+                errors="ignore",
+            )
+        )
+        ds_step["titrant_molinity"] = ds.titrant_molinity * (1 + step)
+        ds_step = dataset.solve(ds_step, **kwargs)
+        ds["alkalinity_sensitivity"] = (ds_step.alkalinity - ds.alkalinity) / (
+            ds_step.titrant_molinity - ds.titrant_molinity
+        )
+    else:
+        raise ValueError('method must be "ratio" (default) or "solve"')
+    return ds
+
+
+def leave_one_out(ds, sensitivity="ratio", **kwargs):
+    """Find how each reference material affects its batch's calibration, as if
+    `calibrate` had been run again without it, in linear time.
+
+    The results are calculated from the existing `titrant_molinity_here`
+    values and the `alkalinity_sensitivity` of each titration (see
+    `get_alkalinity_sensitivity`), which is calculated first only if it is not
+    already in `ds`.  Nothing is solved again.  The following columns are
+    added:
+        loo_titrant_molinity - the batch-averaged `titrant_molinity` without
+            this titration (same as `titrant_molinity` if it is not a good
+            reference material).
+        loo_titrant_molinity_change - `loo_titrant_molinity` minus the current
+            batch-averaged `titrant_molinity`.
+        loo_alkalinity_offset - this titration's `alkalinity_offset` if it had
+            been solved with `loo_titrant_molinity` (i.e., a cross-validation
+            residual for reference materials).
+        loo_batch_alkalinity_change - the largest change in any alkalinity in
+            the batch caused by leaving this titration out.
+        loo_alkalinity_change - the largest change in this titration's
+            alkalinity caused by leaving out any one reference material from
+            its batch.
+
+    Parameters
+    ----------
+    ds : pandas.DataFrame
+        A calibrated and solved dataset.
+    sensitivity : str, optional
+        The `method` for `get_alkalinity_sensitivity`, by default "ratio".
+    kwargs
+        Any kwargs for `get_alkalinity_sensitivity`.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The dataset with the leave-one-out columns added.
+    """
+    if "alkalinity_sensitivity" not in ds:
+        get_alkalinity_sensitivity(ds, method=sensitivity, **kwargs)
+    good = (
+        ds.reference_good.astype(bool) & ds.titrant_molinity_here.notnull()
+    ).to_numpy()
+    x = np.where(good, ds.titrant_molinity_here, 0.0)
+    batch = ds.analysis_batch
+    batch_sum = pd.Series(x, index=ds.index).groupby(batch).transform("sum")
+    batch_count = (
+        pd.Series(good, index=ds.index).groupby(batch).transform("sum")
+    )
+    batch_sum, batch_count = batch_sum.to_numpy(), batch_count.to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        titrant_molinity = batch_sum / batch_count
+        loo = np.where(
+            good, (batch_sum - x) / (batch_count - 1), titrant_molinity
+        )
+    loo[good & (batch_count == 1)] = np.nan
+    change = loo - titrant_molinity
+    sensitivity_abs = np.abs(ds.alkalinity_sensitivity)
+    ds["loo_titrant_molinity"] = loo
+    ds["loo_titrant_molinity_change"] = change
+    if "alkalinity_certified" in ds:
+        ds["loo_alkalinity_offset"] = (
+            ds.alkalinity
+            + ds.alkalinity_sensitivity * change
+            - ds.alkalinity_certified
+        )
+    ds["loo_batch_alkalinity_change"] = np.abs(
+        change
+    ) * sensitivity_abs.groupby(batch).transform("max")
+    ds["loo_alkalinity_change"] = sensitivity_abs * pd.Series(
+        np.abs(change), index=ds.index
+    ).groupby(batch).transform("max")
+    return ds
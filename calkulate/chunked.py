@@ -0,0 +1,171 @@
+# Calkulate: seawater total alkalinity from titration data
+# Copyright (C) 2019--2025  Matthew P. Humphreys  (GNU GPLv3)
+"""Process very large metadata tables in chunks.
+
+The metadata table is read a chunk of rows at a time, each chunk is calibrated
+and solved, and the results are written to a separate Parquet file in an
+output directory before the next chunk is read.  Peak memory use therefore
+depends on the chunk size rather than the size of the whole table.  The output
+directory can be read back in as one table with `pandas.read_parquet`.
+
+Chunks are never split in the middle of an `analysis_batch`, so each batch is
+calibrated with all of its reference materials.  This requires the rows of
+each batch to be next to each other in the metadata table.
+"""
+
+import os
+from warnings import warn
+
+import pandas as pd
+
+from . import dataset
+from .classes import Dataset
+
+
+def read_chunks(metadata, chunksize=10000, **read_kwargs):
+    """Read a metadata table in chunks.
+
+    Parameters
+    ----------
+    metadata : str or iterable of pandas.DataFrame
+        The metadata table, either as a file name (CSV or other text-based
+        table readable by `pandas.read_csv`, or Parquet) or as an iterable of
+        DataFrames that are already chunked.
+    chunksize : int, optional
+        Number of rows per chunk, by default 10000.
+    read_kwargs
+        Any kwargs to pass on to `pandas.read_csv`.
+
+    Yields
+    ------
+    pandas.DataFrame
+        Each chunk of the metadata table.
+    """
+    if not isinstance(metadata, str):
+        yield from metadata
+    elif metadata.lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        # Number the rows through the whole table, like `pandas.read_csv`
+        start = 0
+        for batch in pq.ParquetFile(metadata).iter_batches(
+            batch_size=chunksize
+        ):
+            chunk = batch.to_pandas()
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start += len(chunk)
+            yield chunk
+    else:
+        with pd.read_csv(metadata, chunksize=chunksize, **read_kwargs) as r:
+            yield from r
+
+
+def _check_batches(chunk, batches_done):
+    """Warn about any `analysis_batch` values in a chunk that were already in
+    an earlier chunk, and return all of the values seen so far.
+    """
+    batches = set(chunk.analysis_batch.unique())
+    repeated = batches & batches_done
+    if len(repeated) > 0:
+        warn(
+            "analysis_batch values found in more than one place in "
+            + "the metadata, so they will be calibrated separately: "
+            + ("{} " * len(repeated)).format(*repeated)
+        )
+    return batches_done | batches
+
+
+def batch_chunks(chunks):
+    """Regroup chunks of a metadata table so that no `analysis_batch` is split
+    across chunks.
+
+    The rows from the last `analysis_batch` in each chunk are held back and
+    prepended to the next chunk, because that batch might continue there.
+
+    Parameters
+    ----------
+    chunks : iterable of pandas.DataFrame
+        The chunks of the metadata table.
+
+    Yields
+    ------
+    pandas.DataFrame
+        Chunks of the metadata table, each containing only complete batches.
+    """
+    held = None
+    batches_done = set()
+    for chunk in chunks:
+        if held is not None:
+            chunk = pd.concat([held, chunk])
+        if len(chunk) == 0:
+            continue
+        if "analysis_batch" not in chunk:
+            # Without batches, chunks can only be solved, not calibrated
+            assert "alkalinity_certified" not in chunk, (
+                'metadata must contain an "analysis_batch" column!'
+            )
+            yield chunk
+            continue
+        last = chunk.analysis_batch.iloc[-1]
+        L = (chunk.analysis_batch == last).to_numpy()
+        held = chunk[L]
+        chunk = chunk[~L]
+        if len(chunk) > 0:
+            batches_done = _check_batches(chunk, batches_done)
+            yield chunk
+    if held is not None and len(held) > 0:
+        _check_batches(held, batches_done)
+        yield held
+
+
+def calkulate_chunked(
+    metadata,
+    output_path,
+    chunksize=10000,
+    read_kwargs=None,
+    verbose=False,
+    **kwargs,
+):
+    """Calibrate and solve a large metadata table one chunk at a time, writing
+    the results for each chunk to a separate Parquet file.
+
+    Parameters
+    ----------
+    metadata : str or iterable of pandas.DataFrame
+        The metadata table, either as a file name or an iterable of
+        DataFrames (see `read_chunks`).
+    output_path : str
+        The directory to write the results to.  Results for each chunk are
+        written to `part-00000.parquet`, `part-00001.parquet`, etc.
+    chunksize : int, optional
+        Number of rows to read at a time, by default 10000.  The chunks that
+        are processed may be larger or smaller than this, because they are
+        adjusted to contain only complete `analysis_batch`es.
+    read_kwargs : dict, optional
+        Any kwargs to pass on to `pandas.read_csv` when reading `metadata`.
+    verbose : bool, optional
+        Whether to print progress, by default False.
+    kwargs
+        Any kwargs that would be passed to `calibrate` or `solve`.
+
+    Returns
+    -------
+    list of str
+        The Parquet files that were written.
+    """
+    if read_kwargs is None:
+        read_kwargs = {}
+    os.makedirs(output_path, exist_ok=True)
+    parts = []
+    chunks = batch_chunks(read_chunks(metadata, chunksize, **read_kwargs))
+    for c, chunk in enumerate(chunks):
+        print(f"Calkulate: processing chunk {c} ({len(chunk)} titrations)...")
+        ds = Dataset(chunk)
+        if "alkalinity_certified" in ds:
+            ds = dataset.calibrate(ds, verbose=verbose, **kwargs)
+        else:
+            ds = dataset.solve(ds, verbose=verbose, **kwargs)
+        part = os.path.join(output_path, f"part-{c:05d}.parquet")
+        pd.DataFrame(ds).to_parquet(part)
+        parts.append(part)
+    return parts
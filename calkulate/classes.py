@@ -39,6 +39,12 @@ class Dataset(pd.DataFrame):
 
     Alkalinity solving methods
     --------------------------
+    resolve_files
+        Find every titration file, correcting small differences in
+        `file_name`, and set `file_good` to `False` for any that are missing.
+    prescreen
+        Cheaply check which titrations are worth solving and set `file_good`
+        to `False` for any that are not.
     calibrate
         Find the best-fit `titrant_molinity` for each sample that has a value
         for `alkalinity_certified`.
@@ -46,6 +52,18 @@ class Dataset(pd.DataFrame):
         Solve every sample for `alkalinity` when `titrant_molinity` is known.
     calkulate
         Run the `calibrate` and `solve` steps sequentially.
+    iter_calibrate
+        Like `calibrate`, but yield each sample's `titrant_molinity_here` as
+        soon as it is available, without assigning it to the `Dataset`.
+    iter_solve
+        Like `solve`, but yield each sample's results as soon as they are
+        available, without assigning them to the `Dataset`.
+    calibrate_async, solve_async
+        Like `calibrate` and `solve`, but awaitable, so they do not block an
+        asyncio event loop.
+    export_points
+        Solve every sample and write the results at each titration point to
+        Parquet or Arrow files, partitioned by `analysis_batch`.
 
     Data visualisation methods
     --------------------------
@@ -64,7 +82,18 @@ class Dataset(pd.DataFrame):
         Return a copy of the `Dataset` as a pandas `DataFrame`.
     """
 
-    from .dataset import calibrate, calkulate, solve
+    from .dataset import (
+        calibrate,
+        calibrate_async,
+        calkulate,
+        export_points,
+        iter_calibrate,
+        iter_solve,
+        prescreen,
+        resolve_files,
+        solve,
+        solve_async,
+    )
 
     def to_Titration(self, index, **kwargs):
         """Create a `calk.Titration` for one titration in the dataset.
@@ -29,7 +29,6 @@ calibrate_emf
 calibrate_pH
 """
 
-import warnings
 from collections import namedtuple
 from warnings import warn
 
@@ -263,12 +262,8 @@ def gran_emf0s(
     array-like float
         Gran EMF0 estimator (DAA03 eq. 11).
     """
-    with warnings.catch_warnings():
-        warnings.filterwarnings(
-            "ignore",
-            category=RuntimeWarning,
-            message="invalid value encountered in log",
-        )
+    # np.errstate (unlike warnings.catch_warnings) is safe to use in threads
+    with np.errstate(invalid="ignore"):
         emf0s = emf - (
             constants.ideal_gas
             * (temperature + constants.absolute_zero)
@@ -481,7 +476,8 @@ def add_titrant_totals(
 
     This function does not need to be used if the titrant was HCl.
 
-    Operates in-place on `totals`.
+    Returns a new dict, so `totals` itself is not modified and can be shared
+    between solvers running at the same time.
 
     Parameters
     ----------
@@ -506,10 +502,11 @@ def add_titrant_totals(
     totals dict of array-like floats
         The input totals with contributions from the titrant added.
     """
+    totals = totals.copy()
     for t_total, factor in titrant_totals.items():
         assert t_total.startswith("titrant_total_")
         total = t_total[8:]
-        totals[total] += (
+        totals[total] = totals[total] + (
             titrant_mass
             * (titrant_molinity - titrant_molinity_prev)
             * factor
@@ -881,7 +878,7 @@ def _lsqfun_calibrate_emf(
     **titrant_totals,
 ):
     """Calculate residuals for the calibrator."""
-    # Add titrant to totals (only relevant for H2SO4 etc. titrant)
+    # Add titrant to a copy of totals (only relevant for H2SO4 etc. titrant)
     totals = add_titrant_totals(
         totals,
         titrant_mass,
@@ -906,15 +903,6 @@ def _lsqfun_calibrate_emf(
         pH_max=pH_max,
         titrant_normality=titrant_normality,
     )
-    # Revert to original totals
-    totals = add_titrant_totals(
-        totals,
-        titrant_mass,
-        analyte_mass,
-        0,
-        titrant_molinity_prev=titrant_molinity,
-        **titrant_totals,
-    )
     return sr.alkalinity - alkalinity_certified
 
 
@@ -1021,7 +1009,7 @@ def _lsqfun_calibrate_pH(
     **titrant_totals,
 ):
     """Calculate residuals for the calibrator."""
-    # Add titrant to totals (only relevant for H2SO4 etc. titrant)
+    # Add titrant to a copy of totals (only relevant for H2SO4 etc. titrant)
     totals = add_titrant_totals(
         totals,
         titrant_mass,
@@ -1043,15 +1031,6 @@ def _lsqfun_calibrate_pH(
         pH_max=pH_max,
         titrant_normality=titrant_normality,
     )
-    # Revert to original totals
-    totals = add_titrant_totals(
-        totals,
-        titrant_mass,
-        analyte_mass,
-        0,
-        titrant_molinity_prev=titrant_molinity,
-        **titrant_totals,
-    )
     return sr.alkalinity - alkalinity_certified
 
 
@@ -1141,7 +1120,7 @@ def _lsqfun_calibrate_pH_gran(
     **titrant_totals,
 ):
     """Calculate residuals for the calibrator."""
-    # Add titrant to totals (only relevant for H2SO4 etc. titrant)
+    # Add titrant to a copy of totals (only relevant for H2SO4 etc. titrant)
     totals = add_titrant_totals(
         totals,
         titrant_mass,
@@ -1163,15 +1142,6 @@ def _lsqfun_calibrate_pH_gran(
         pH_max=pH_max,
         titrant_normality=titrant_normality,
     )
-    # Revert to original totals
-    totals = add_titrant_totals(
-        totals,
-        titrant_mass,
-        analyte_mass,
-        0,
-        titrant_molinity_prev=titrant_molinity,
-        **titrant_totals,
-    )
     return sr.alkalinity - alkalinity_certified
 
 
@@ -2,15 +2,34 @@
 # Copyright (C) 2019--2025  Matthew P. Humphreys  (GNU GPLv3)
 """Work with datasets containing multiple titrations."""
 
+import asyncio
+import os
+import shutil
+import sys
+import threading
+import warnings
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from functools import partial
 from warnings import warn
 
 import numpy as np
 import pandas as pd
 import PyCO2SYS as pyco2
 
-from . import files
+from . import core, files, fingerprint, store as result_store
+from .convert import amount_units, keys_cau, pH_to_emf
 from .core import SolveEmfResult, SolvePhGranResult, SolvePhResult
 from .meta import _get_kwargs_for
+from .read import archives
+from .read.resolve import FileIndex
+from .read.titrations import keys_read_dat, read_dat
 
 
 def get_total_salts(ds):
@@ -57,30 +76,467 @@ def _backcompat(kwargs, row):
     return kwargs
 
 
-def calibrate_row(row, verbose=False, **kwargs):
-    """Calibrate `titrant_molinity` for a single row of (i.e., a single
-    titration in) a dataset.
+def _resolve_kwargs(keys, kwargs, row):
+    """Get the kwargs that would be passed on for one row of a dataset."""
+    kwargs = _backcompat(kwargs.copy(), row)
+    return _get_kwargs_for(keys, kwargs, row)
+
+
+# Metadata (other than kwargs) used for each stage, and which rows need it
+stage_metadata = {
+    "calibrate": ["file_name", "alkalinity_certified", "salinity"],
+    "solve": ["file_name", "titrant_molinity", "salinity"],
+}
+stage_keys = {
+    "calibrate": files.keys_calibrate,
+    "solve": files.keys_solve,
+}
+
+
+def _stage_rows(ds, stage):
+    """Find which rows of a dataset are processed at a given stage."""
+    if stage == "calibrate":
+        L = ds.alkalinity_certified.notnull()
+    else:
+        L = ds.titrant_molinity.notnull()
+    return (L & ds.file_good.astype(bool)).to_numpy()
+
+
+def get_fingerprints(ds, stage, fingerprint_method="stat", **kwargs):
+    """Fingerprint every titration in a dataset that is processed at a given
+    stage.
+
+    Parameters
+    ----------
+    ds : pandas.DataFrame
+        A table containing metadata for each titration.
+    stage : str
+        Either "calibrate" or "solve".
+    fingerprint_method : str, optional
+        How to fingerprint the titration files, either "stat" (default; uses
+        file size and modification time) or "hash" (uses file contents).
+    kwargs
+        The kwargs that would be passed to `calibrate` or `solve`.
+
+    Returns
+    -------
+    pandas.Series
+        The fingerprint for each row, or `None` for rows that are not
+        processed at this stage.
+    """
+    assert stage in stage_metadata, f"stage must be one of {stage_metadata}."
+    fingerprints = pd.Series(None, index=ds.index, dtype=object)
+    for i, row in ds[_stage_rows(ds, stage)].iterrows():
+        kwargs_row = _resolve_kwargs(stage_keys[stage], kwargs, row)
+        file_name = row.file_name
+        if "file_path" in kwargs_row:
+            file_name = os.path.join(kwargs_row["file_path"], file_name)
+        fingerprints[i] = fingerprint.row_fingerprint(
+            stage,
+            file_name,
+            {k: row[k] for k in stage_metadata[stage]},
+            kwargs_row,
+            method=fingerprint_method,
+        )
+    return fingerprints
+
+
+def _apply_stored(
+    ds,
+    stage,
+    store,
+    fingerprint_method="stat",
+    write_every=None,
+    threads=None,
+    verbose=False,
+    **kwargs,
+):
+    """Like `_collect_results`, but reuse results from the result `store` for
+    any row whose fingerprint is found there, and add newly computed results
+    to the `store`.
+
+    New results are appended to the `store` every `write_every` rows (if
+    provided) as well as at the end, including if processing is interrupted.
+    The appended parts are combined into the store once processing has
+    finished.
+    """
+    fingerprints = get_fingerprints(
+        ds, stage, fingerprint_method=fingerprint_method, **kwargs
+    )
+    stored = result_store.read_store(store)
+    stored = stored[stored.stage == stage]
+    L = _stage_rows(ds, stage)
+    hit = L & fingerprints.isin(stored.index).to_numpy()
+    results = _empty_results(stage, len(ds))
+    if hit.any():
+        stored_hit = stored.loc[fingerprints[hit]]
+        for k in results:
+            if k in stored_hit:
+                results[k][hit] = stored_hit[k].to_numpy()
+    unwritten = {}
+
+    def write_unwritten():
+        if len(unwritten) > 0:
+            results_new = pd.DataFrame.from_dict(unwritten, orient="index")
+            results_new.index.name = "fingerprint"
+            results_new["stage"] = stage
+            result_store.write_store(store, results_new, append=True)
+            unwritten.clear()
+
+    try:
+        for i, record in _iter_records(
+            ds,
+            stage,
+            positions=np.flatnonzero(~hit),
+            threads=threads,
+            verbose=verbose,
+            **kwargs,
+        ):
+            _put_record(results, i, record)
+            if L[i]:
+                unwritten[fingerprints.iloc[i]] = record
+                if write_every is not None and len(unwritten) >= write_every:
+                    write_unwritten()
+    finally:
+        write_unwritten()
+    result_store.compact_store(store)
+    n_hits, n_computed = int(hit.sum()), int((L & ~hit).sum())
+    print(
+        f"Calkulate: {n_hits} {stage} results reused from store,"
+        + f" {n_computed} recomputed."
+    )
+    ds.attrs[f"{stage}_store"] = {"hits": n_hits, "recomputed": n_computed}
+    return results
+
+
+def _get_store(store, checkpoint, resume):
+    """Decide which result store file to use, if any, and clear out an old
+    checkpoint if not resuming from it.
+    """
+    if checkpoint is None:
+        return store
+    assert store is None, "Only one of `store` and `checkpoint` can be used."
+    if not resume:
+        result_store.remove_store(checkpoint)
+    return checkpoint
+
+
+def _write_sink(ds, stage, sink, fingerprint_method="stat", **kwargs):
+    """Add the dataset with the results from a processing stage, its run
+    metadata and fingerprints to a SQLite result `sink` (see `calk.store`).
+    """
+    results = pd.DataFrame(ds).copy()
+    results[f"{stage}_fingerprint"] = get_fingerprints(
+        ds, stage, fingerprint_method=fingerprint_method, **kwargs
+    )
+    n_written = result_store.write_results(
+        sink, results, run=result_store.run_metadata(stage, **kwargs)
+    )
+    print(f"Calkulate: {n_written} {stage} results written to sink.")
+
+
+# Warnings already shown by `_run_captured`, so each is only shown once
+_warnings_shown = {}
+# Whether `warnings.catch_warnings` is local to each thread and asyncio task
+# (Python 3.14+ with context-aware warnings), in which case every titration
+# can record its own warnings in `_run_captured`, even in threads
+_context_warnings = bool(getattr(sys.flags, "context_aware_warnings", False))
+# Otherwise, `warnings.catch_warnings` changes process-wide state, so it
+# cannot be used in threads: the threads that process titrations are marked
+# here, and they don't record warnings
+_in_threads = threading.local()
+
+
+def _run_in_thread(record_func, row, *args, **kwargs):
+    """Process one row of a dataset in a thread (see `_run_captured`)."""
+    _in_threads.active = True
+    try:
+        return record_func(row, *args, **kwargs)
+    finally:
+        _in_threads.active = False
+
+
+def _blank_errors(step):
+    """Initialise the error and warning fields for one processing step."""
+    return {
+        f"{step}_error": "",
+        f"{step}_error_message": "",
+        f"{step}_stage": "",
+        f"{step}_warnings": "",
+    }
+
+
+def _run_recording(record, step, func, *args, **kwargs):
+    """Run `func`, recording in `record` the stage it reached and any
+    exception it raised.  Returns `None` if there was an exception.
+    """
+    try:
+        result = func(*args, **kwargs)
+        record[f"{step}_stage"] = "done"
+    except Exception as e:
+        result = None
+        record[f"{step}_error"] = type(e).__name__
+        record[f"{step}_error_message"] = str(e)
+        record[f"{step}_stage"] = getattr(e, "stage", "prepare")
+    return result
+
+
+def _run_captured(record, step, func, *args, **kwargs):
+    """Run `func`, recording in `record` the stage it reached and any
+    exception or warnings it raised.  Returns `None` if there was an exception.
+
+    Warnings are shown as usual too.  Before Python 3.14 (without
+    context-aware warnings), they are not recorded when running in threads.
+    """
+    if getattr(_in_threads, "active", False) and not _context_warnings:
+        caught = []
+        result = _run_recording(record, step, func, *args, **kwargs)
+    else:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            result = _run_recording(record, step, func, *args, **kwargs)
+        for w in caught:
+            warnings.warn_explicit(
+                w.message,
+                w.category,
+                w.filename,
+                w.lineno,
+                registry=_warnings_shown,
+            )
+    record[f"{step}_warnings"] = "; ".join(str(w.message) for w in caught)
+    return result
+
+
+def _calibrate_record(row, verbose=False, **kwargs):
+    """Calibrate one titration in a dataset, returning the results and any
+    errors as a dict.
     """
-    # Initialise output
-    titrant_molinity_here = np.nan
+    calibrated = {
+        "titrant_molinity_here": np.nan,
+        **_blank_errors("calibrate"),
+    }
     if pd.notnull(row.alkalinity_certified) and row.file_good:
         if verbose:
             print(f"Calibrating {row.file_name}...")
-        try:
-            kwargs = _backcompat(kwargs, row)
-            kwargs = _get_kwargs_for(files.keys_calibrate, kwargs, row)
-            cal = files.calibrate(
+
+        def calibrate_here():
+            kwargs_calibrate = _resolve_kwargs(
+                files.keys_calibrate, kwargs, row
+            )
+            return files.calibrate(
                 row.file_name,
                 row.alkalinity_certified,
                 row.salinity,
-                **kwargs,
+                **kwargs_calibrate,
             )
-            titrant_molinity_here = cal["x"][0]
-        except Exception as e:
+
+        cal = _run_captured(calibrated, "calibrate", calibrate_here)
+        if cal is not None:
+            calibrated["titrant_molinity_here"] = cal["x"][0]
+        else:
             print(f'Error calibrating "{row.file_name}":')
-            print(f"{e}")
-            return titrant_molinity_here
-    return titrant_molinity_here
+            print(calibrated["calibrate_error_message"])
+    return calibrated
+
+
+def calibrate_row(row, verbose=False, **kwargs):
+    """Calibrate `titrant_molinity` for a single row of (i.e., a single
+    titration in) a dataset.
+    """
+    return _calibrate_record(row, verbose=verbose, **kwargs)[
+        "titrant_molinity_here"
+    ]
+
+
+def _report_errors(ds, step):
+    """Print how many titrations failed at a processing step."""
+    n_errors = (ds[f"{step}_error"] != "").sum()
+    if n_errors > 0:
+        print(
+            f"Calkulate: {n_errors} titration(s) could not be {step}d"
+            + f" (see the `{step}_error` column)."
+        )
+
+
+def prescreen_row(row, min_points=10, min_rvalue=0.95, **kwargs):
+    """Cheaply check whether a single titration is worth solving, without
+    running the full solver.
+
+    Errors from reading the file or from the Gran plot (`OSError`,
+    `ValueError`, `IndexError` and `KeyError`) mean that the titration fails
+    the prescreen, but any other errors are raised as usual.
+
+    Parameters
+    ----------
+    row : pandas.Series
+        One row of (i.e., one titration in) a dataset.
+    min_points : int, optional
+        The minimum number of valid titration data points, by default 10.
+    min_rvalue : float, optional
+        The minimum rvalue of the Gran-plot linear regression, by default 0.95.
+    kwargs
+        Any kwargs that would be passed to `solve`.
+
+    Returns
+    -------
+    str
+        Why the titration failed the prescreen, or "" if it passed.
+    """
+    kwargs = _resolve_kwargs(files.keys_solve, kwargs, row)
+    file_name = row.file_name
+    if "file_path" in kwargs:
+        file_name = os.path.join(kwargs["file_path"], file_name)
+    if not archives.file_exists(file_name):
+        return "file not found"
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        try:
+            dd = read_dat(file_name, **_get_kwargs_for(keys_read_dat, kwargs))
+        except (OSError, ValueError, IndexError, KeyError) as e:
+            return f"file could not be read ({type(e).__name__}: {e})"
+        finite = (
+            np.isfinite(dd.titrant_amount)
+            & np.isfinite(dd.measurement)
+            & np.isfinite(dd.temperature)
+        )
+        if finite.sum() < min_points:
+            return f"only {finite.sum()} valid data points"
+        try:
+            cv = amount_units(
+                dd, row.salinity, **_get_kwargs_for(keys_cau, kwargs)
+            )
+            measurement = cv.measurement[finite]
+            if kwargs.get("solve_mode", "emf").lower() != "emf":
+                # Any EMF0 gives the same Gran-plot regression rvalue
+                measurement = pH_to_emf(measurement, 0, cv.temperature[finite])
+            ga = core.gran_alkalinity(
+                cv.titrant_mass[finite],
+                measurement,
+                cv.temperature[finite],
+                cv.analyte_mass,
+                1,
+            )
+        except (OSError, ValueError, IndexError, KeyError) as e:
+            return f"Gran plot failed ({type(e).__name__}: {e})"
+    if not ga.lr.rvalue >= min_rvalue:
+        return f"Gran-plot rvalue {ga.lr.rvalue:.3f} below {min_rvalue}"
+    return ""
+
+
+def prescreen(ds, min_points=10, min_rvalue=0.95, verbose=False, **kwargs):
+    """Cheaply check which titrations are worth solving, before running the
+    full solver, and set `file_good` to `False` for any that are not.
+
+    A titration fails if its file cannot be found or read, if it has fewer
+    than `min_points` valid data points, or if the linear regression through
+    its Gran plot has an rvalue below `min_rvalue`.  The reason for each
+    failure is put in the `prescreen_error` column ("" if it passed).  Rows
+    where `file_good` is already `False` are not checked.
+
+    Parameters
+    ----------
+    ds : pandas.DataFrame
+        A table containing metadata for each titration (not used if running as
+        a method).
+    min_points : int, optional
+        The minimum number of valid titration data points, by default 10.
+    min_rvalue : float, optional
+        The minimum rvalue of the Gran-plot linear regression, by default 0.95.
+    verbose : bool, optional
+        Whether to print progress, by default False.
+    kwargs
+        Any kwargs that would be passed to `solve`.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The dataset with the `prescreen_error` column added and `file_good`
+        updated.
+    """
+    prepare(ds)
+    prescreen_error = np.full(len(ds), "", dtype=object)
+    for i, (_, row) in enumerate(ds.iterrows()):
+        if row.file_good:
+            if verbose:
+                print(f"Prescreening {row.file_name}...")
+            prescreen_error[i] = prescreen_row(
+                row, min_points=min_points, min_rvalue=min_rvalue, **kwargs
+            )
+    ds["prescreen_error"] = prescreen_error
+    ds["file_good"] = ds.file_good.astype(bool) & (prescreen_error == "")
+    n_failed = (prescreen_error != "").sum()
+    print(
+        f"Calkulate: {n_failed} titration(s) failed the prescreen"
+        + " (see the `prescreen_error` column)."
+    )
+    return ds
+
+
+def resolve_files(ds, verbose=False, **kwargs):
+    """Find every titration file by listing each `file_path` only once, and
+    set `file_good` to `False` for any that are missing.
+
+    Each directory (or archive) is listed with a `calk.read.resolve.FileIndex`
+    and each `file_name` is looked for in the listing, first exactly and then
+    after normalising whitespace and case (e.g., a single space where the
+    file name has two).  Where there is exactly one approximate match,
+    `file_name` is changed to it.  Rows where `file_good` is already `False`
+    are not checked.
+
+    Parameters
+    ----------
+    ds : pandas.DataFrame
+        A table containing metadata for each titration (not used if running as
+        a method).
+    verbose : bool, optional
+        Whether to print progress, by default False.
+    kwargs
+        Any kwargs that would be passed to `calibrate` or `solve`, of which
+        only `file_path` is used.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The dataset with `file_name` and `file_good` updated.
+    """
+    if "file_good" not in ds:
+        ds["file_good"] = True
+    file_path = kwargs.get("file_path") or ""
+    if "file_path" in ds:
+        file_path = ds.file_path.where(ds.file_path.notnull(), file_path)
+    else:
+        file_path = pd.Series(file_path, index=ds.index)
+    file_name = ds.file_name.to_numpy(dtype=object, copy=True)
+    good = ds.file_good.to_numpy(dtype=bool, copy=True)
+    checked = np.flatnonzero(good)
+    missing = []
+    n_changed = 0
+    for path, positions in (
+        file_path.iloc[checked].groupby(file_path.iloc[checked], sort=False)
+    ).indices.items():
+        if verbose:
+            print(f"Calkulate: listing {path}...")
+        index = FileIndex(path)
+        for i in checked[positions]:
+            resolved = index.resolve(file_name[i])
+            if resolved is None:
+                missing.append(file_name[i])
+                good[i] = False
+            elif resolved != file_name[i]:
+                file_name[i] = resolved
+                n_changed += 1
+    ds["file_name"] = file_name
+    ds["file_good"] = good
+    if len(missing) > 0:
+        warn(
+            "titration files not found, so file_good set to False: "
+            + ("{} " * len(missing)).format(*missing)
+        )
+    print(
+        f"Calkulate: {n_changed} file name(s) corrected and {len(missing)}"
+        + " file(s) not found."
+    )
+    return ds
 
 
 def get_group_calibration(ds_group):
@@ -99,10 +555,14 @@ def get_group_calibration(ds_group):
 
 def get_batches(ds):
     """Get mean titrant molinity and statistics for all analysis_batch groups."""
-    batches = (
-        ds[["analysis_batch", "titrant_molinity_here", "reference_good"]]
-        .groupby(by="analysis_batch")
-        .apply(get_group_calibration, include_groups=False)
+    good = ds.reference_good.astype(bool) & ds.titrant_molinity_here.notnull()
+    grouped = ds.titrant_molinity_here.where(good).groupby(ds.analysis_batch)
+    batches = pd.DataFrame(
+        {
+            "titrant_molinity": grouped.mean(),
+            "titrant_molinity__std": grouped.std(),
+            "titrant_molinity__count": grouped.count().astype(float),
+        }
     )
     return batches
 
@@ -127,7 +587,47 @@ def prepare(ds):
         ds["file_good"] = True
 
 
-def calibrate(ds, verbose=False, **kwargs):
+def _assign_calibrated(ds, calibrated):
+    """Assign calibration results to the dataset and get titrant_molinity
+    averaged by analysis_batch.
+    """
+    for k, v in calibrated.items():
+        ds[k] = v
+    _report_errors(ds, "calibrate")
+    # Get titrant_molinity averaged by analysis_batch
+    if "analysis_batch" not in ds:
+        ds["analysis_batch"] = 0
+    if "reference_good" not in ds:
+        ds["reference_good"] = ~np.isnan(ds.titrant_molinity_here)
+    batches = get_batches(ds)
+    ds["titrant_molinity"] = batches.loc[
+        ds.analysis_batch, "titrant_molinity"
+    ].to_numpy()
+    print("Calkulate: calibration complete!")
+
+
+def _assign_solved(ds, solved):
+    """Assign solver results to the dataset."""
+    for k, v in solved.items():
+        ds[k] = v
+    if "alkalinity_certified" in ds:
+        ds["alkalinity_offset"] = ds.alkalinity - ds.alkalinity_certified
+    _report_errors(ds, "solve")
+    print("Calkulate: solving complete!")
+
+
+def calibrate(
+    ds,
+    verbose=False,
+    store=None,
+    fingerprint_method="stat",
+    checkpoint=None,
+    checkpoint_every=100,
+    resume=False,
+    threads=None,
+    sink=None,
+    **kwargs,
+):
     """Calibrate `titrant_molinity` for all titrations with an
     `alkalinity_certified` value and assign means based on `analysis_batch`.
 
@@ -138,6 +638,34 @@ def calibrate(ds, verbose=False, **kwargs):
         a method).
     verbose : bool, optional
         Whether to print progress, by default `calk.default.verbose`.
+    store : str, optional
+        A result store file (see `calk.store`).  If provided, titrations whose
+        fingerprint is found in the store are not recalibrated, and new
+        results are added to the store.  By default `None`.
+    fingerprint_method : str, optional
+        How to fingerprint the titration files when using a `store`, either
+        "stat" (default; file size and modification time) or "hash" (file
+        contents).
+    checkpoint : str, optional
+        A checkpoint file to save results to every `checkpoint_every`
+        titrations, and also if processing is interrupted, by default `None`.
+        This is a result store (see `calk.store`), so it cannot be used
+        together with `store`.
+    checkpoint_every : int, optional
+        How many titrations to process between checkpoints, by default 100.
+    resume : bool, optional
+        Whether to resume from an existing `checkpoint`, skipping titrations
+        whose fingerprint matches one that was already completed, by default
+        False, in which case any existing `checkpoint` is deleted first.
+    threads : int, optional
+        How many threads to process titrations in at once, by default `None`
+        (no threads).  Before Python 3.14, warnings are then shown but not
+        recorded in the results.
+    sink : str, optional
+        A SQLite database file (see `calk.store`) to add the results to, with
+        run metadata and fingerprints, by default `None`.  Titrations that are
+        already there (with the same `file_name` and `analysis_datetime`) are
+        updated.
 
     Returns
     -------
@@ -145,25 +673,53 @@ def calibrate(ds, verbose=False, **kwargs):
         The titration metadataset with additional columns found by the solver.
     """
     print("Calkulate: calibrating titrant_molinity...")
+    store = _get_store(store, checkpoint, resume)
     prepare(ds)
     assert "alkalinity_certified" in ds, (
         'ds must contain an "alkalinity_certified" column!'
     )
     # Calibrate titrant_molinity_here for each row with an alkalinity_certified
-    ds["titrant_molinity_here"] = ds.apply(
-        calibrate_row, axis=1, verbose=verbose, **kwargs
+    if store is None:
+        calibrated = _collect_results(
+            ds, "calibrate", threads=threads, verbose=verbose, **kwargs
+        )
+    else:
+        calibrated = _apply_stored(
+            ds,
+            "calibrate",
+            store,
+            fingerprint_method=fingerprint_method,
+            write_every=checkpoint_every if checkpoint else None,
+            threads=threads,
+            verbose=verbose,
+            **kwargs,
+        )
+    _assign_calibrated(ds, calibrated)
+    if sink is not None:
+        _write_sink(
+            ds,
+            "calibrate",
+            sink,
+            fingerprint_method=fingerprint_method,
+            **kwargs,
+        )
+    ds = solve(
+        ds,
+        verbose=verbose,
+        fingerprint_method=fingerprint_method,
+        threads=threads,
+        sink=sink,
+        **(
+            {"store": store}
+            if checkpoint is None
+            else {
+                "checkpoint": checkpoint,
+                "checkpoint_every": checkpoint_every,
+                "resume": True,
+            }
+        ),
+        **kwargs,
     )
-    # Get titrant_molinity averaged by analysis_batch
-    if "analysis_batch" not in ds:
-        ds["analysis_batch"] = 0
-    if "reference_good" not in ds:
-        ds["reference_good"] = ~np.isnan(ds.titrant_molinity_here)
-    batches = get_batches(ds)
-    ds["titrant_molinity"] = batches.loc[
-        ds.analysis_batch, "titrant_molinity"
-    ].to_numpy()
-    print("Calkulate: calibration complete!")
-    ds = solve(ds, verbose=verbose, **kwargs)
     return ds
 
 
@@ -191,60 +747,445 @@ def add_solve_results(solved, sr):
     return solved
 
 
-def solve_row(row, verbose=False, **kwargs):
-    """Solve alkalinity, EMF0 and initial pH for one titration in a dataset."""
-    # Define blank output
-    solved = pd.Series(
-        {
-            "alkalinity_npts": 0,
-            "alkalinity_std": np.nan,
-            "alkalinity": np.nan,
-            "analyte_mass": row.analyte_mass,
-            "emf0": np.nan,
-            "gran_alkalinity": np.nan,
-            "gran_emf0": np.nan,
-            "pH_init": np.nan,
-            "temperature_init": np.nan,
-        }
+def _solve_row(row, **kwargs):
+    """Solve one titration in a dataset, returning the full solver result."""
+    kwargs_solve = _resolve_kwargs(files.keys_solve, kwargs, row)
+    return files.solve(
+        row.file_name,
+        row.titrant_molinity,
+        row.salinity,
+        **kwargs_solve,
     )
+
+
+def _solve_record(row, verbose=False, **kwargs):
+    """Solve one titration in a dataset, returning the results and any errors
+    as a dict.
+    """
+    # Define blank output
+    solved = {
+        "alkalinity_npts": 0,
+        "alkalinity_std": np.nan,
+        "alkalinity": np.nan,
+        "analyte_mass": row.analyte_mass,
+        "emf0": np.nan,
+        "gran_alkalinity": np.nan,
+        "gran_emf0": np.nan,
+        "pH_init": np.nan,
+        "temperature_init": np.nan,
+        **_blank_errors("solve"),
+    }
     if pd.notnull(row.titrant_molinity) and row.file_good:
         if verbose:
             print(f"Solving {row.file_name}...")
-        try:
-            kwargs = _backcompat(kwargs, row)
-            kwargs_solve = _get_kwargs_for(files.keys_solve, kwargs, row)
-            sr = files.solve(
-                row.file_name,
-                row.titrant_molinity,
-                row.salinity,
-                **kwargs_solve,
-            )
+
+        sr = _run_captured(solved, "solve", _solve_row, row, **kwargs)
+        if sr is not None:
             solved = add_solve_results(solved, sr)
-        except Exception as e:
+        else:
             print(f'Error solving "{row.file_name}":')
-            print(f"{e}")
-            return solved
+            print(solved["solve_error_message"])
     return solved
 
 
-def solve(ds, verbose=False, **kwargs):
-    """Solve alkalinity, EMF0 and initial pH for all titrations with a
-    `titrant_molinity` value in a `Dataset`.
+def solve_row(row, verbose=False, **kwargs):
+    """Solve alkalinity, EMF0 and initial pH for one titration in a dataset."""
+    return pd.Series(_solve_record(row, verbose=verbose, **kwargs))
+
+
+def _calibrate_task(index, row, verbose, kwargs):
+    """Calibrate one row in a worker, returning a result record."""
+    return {
+        "index": index,
+        "file_name": row.file_name,
+        **_calibrate_record(row, verbose=verbose, **kwargs),
+    }
+
+
+def _solve_task(index, row, verbose, kwargs):
+    """Solve one row in a worker, returning a result record."""
+    return {
+        "index": index,
+        "file_name": row.file_name,
+        **_solve_record(row, verbose=verbose, **kwargs),
+    }
+
+
+def _iter_tasks(ds, stage, task, workers=None, verbose=False, **kwargs):
+    """Run `task` on every row of `ds` and yield the result records as they
+    are completed.
+
+    Rows that are not processed at this `stage` are yielded first, without
+    being sent to the workers.  Only a few more rows than `workers` are
+    submitted at a time so that memory use does not grow with `ds`.
+    """
+    L = _stage_rows(ds, stage)
+    if workers is None:
+        for index, row in ds.iterrows():
+            yield task(index, row, verbose, kwargs)
+        return
+    for index, row in ds[~L].iterrows():
+        yield task(index, row, verbose, kwargs)
+    rows = ds[L].iterrows()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        running = set()
+        for index, row in rows:
+            running.add(executor.submit(task, index, row, verbose, kwargs))
+            if len(running) >= 2 * workers:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(running):
+            yield future.result()
+
+
+def iter_calibrate(ds, verbose=False, workers=None, **kwargs):
+    """Calibrate `titrant_molinity_here` for all titrations in a dataset,
+    yielding each result as soon as it is available.
+
+    Unlike `calibrate`, this does not assign anything to `ds` nor compute the
+    batch-averaged `titrant_molinity`.
 
     Parameters
     ----------
     ds : pandas.DataFrame
-        A table containing metadata for each titration.
-    verbose : `bool`, optional
+        A table containing metadata for each titration (not used if running as
+        a method).
+    verbose : bool, optional
         Whether to print progress, by default False.
+    workers : int, optional
+        Number of worker processes to use, by default `None`, in which case
+        titrations are calibrated one at a time in the current process.  With
+        workers, results are yielded in the order they are completed, not the
+        order of `ds`.
+    kwargs
+        Any kwargs that would be passed to `calibrate`.
+
+    Yields
+    ------
+    dict
+        The result for one titration, containing its `index` in `ds`, its
+        `file_name` and its `titrant_molinity_here`.
+    """
+    _check_kwargs(kwargs)
+    prepare(ds)
+    assert "alkalinity_certified" in ds, (
+        'ds must contain an "alkalinity_certified" column!'
+    )
+    yield from _iter_tasks(
+        ds,
+        "calibrate",
+        _calibrate_task,
+        workers=workers,
+        verbose=verbose,
+        **kwargs,
+    )
+
+
+def iter_solve(ds, verbose=False, workers=None, **kwargs):
+    """Solve alkalinity, EMF0 and initial pH for all titrations in a dataset,
+    yielding each result as soon as it is available.
+
+    Unlike `solve`, this does not assign anything to `ds`.
+
+    Parameters
+    ----------
+    ds : pandas.DataFrame
+        A table containing metadata for each titration (not used if running as
+        a method).
+    verbose : bool, optional
+        Whether to print progress, by default False.
+    workers : int, optional
+        Number of worker processes to use, by default `None`, in which case
+        titrations are solved one at a time in the current process.  With
+        workers, results are yielded in the order they are completed, not the
+        order of `ds`.
+    kwargs
+        Any kwargs that would be passed to `solve`.
+
+    Yields
+    ------
+    dict
+        The result for one titration, containing its `index` in `ds`, its
+        `file_name` and the same fields that `solve` adds to a dataset (e.g.,
+        `alkalinity`, `emf0`).
+    """
+    _check_kwargs(kwargs)
+    prepare(ds)
+    assert "titrant_molinity" in ds, (
+        'ds must contain an "titrant_molinity" column!'
+    )
+    yield from _iter_tasks(
+        ds, "solve", _solve_task, workers=workers, verbose=verbose, **kwargs
+    )
+
+
+def get_points(sr):
+    """Get the results at each titration point from a solver result.
+
+    Parameters
+    ----------
+    sr : SolveEmfResult, SolvePhResult or SolvePhGranResult
+        The solver result.
 
     Returns
     -------
-    pandas.DataFrame
-        The titration metadataset with additional columns found by the solver.
+    dict
+        An array for each of `point` (the position in the titration),
+        `titrant_mass`, `emf`, `pH`, `temperature`, `used` and
+        `alkalinity_all`.  Fields that the solver does not produce (e.g.,
+        `emf` when solving with pH data) are NaN.
     """
-    print("Calkulate: solving alkalinity...")
-    # Check for bad kwargs, but don't break on them
+    n = np.size(sr.titrant_mass)
+    nan = np.full(n, np.nan)
+    return {
+        "point": np.arange(n),
+        "titrant_mass": sr.titrant_mass,
+        "emf": getattr(sr, "emf", nan),
+        "pH": sr.pH,
+        "temperature": np.broadcast_to(sr.temperature, n),
+        "used": sr.used,
+        "alkalinity_all": getattr(sr, "alkalinity_all", nan),
+    }
+
+
+def _points_record(row, verbose=False, **kwargs):
+    """Solve one titration in a dataset, returning the results at each
+    titration point and any errors as a dict.
+    """
+    record = {"points": None, **_blank_errors("solve")}
+    if verbose:
+        print(f"Solving {row.file_name}...")
+    sr = _run_captured(record, "solve", _solve_row, row, **kwargs)
+    if sr is not None:
+        record["points"] = get_points(sr)
+    else:
+        print(f'Error solving "{row.file_name}":')
+        print(record["solve_error_message"])
+    return record
+
+
+def export_points(
+    ds,
+    path,
+    file_format="parquet",
+    points_per_file=1000000,
+    overwrite=False,
+    threads=None,
+    verbose=False,
+    **kwargs,
+):
+    """Solve all titrations with a `titrant_molinity` value in a `Dataset` and
+    export the results at every titration point to a directory of Parquet or
+    Arrow files, partitioned by `analysis_batch`.
+
+    Each titration is solved again, and its per-point results are kept only
+    until `points_per_file` points have built up, when they are written out,
+    so memory use does not grow with `ds`.  Nothing is assigned to `ds`.  The
+    output can be read back in with, e.g., `pandas.read_parquet(path)` or
+    `pyarrow.dataset.dataset(path, partitioning="hive")`.  Requires pyarrow.
+
+    Parameters
+    ----------
+    ds : pandas.DataFrame
+        A table containing metadata for each titration (not used if running as
+        a method).
+    path : str
+        The directory to write to, which must be empty or not exist yet.
+        Files are written to `analysis_batch=<batch>/part-00000-0.parquet`
+        etc. within it.
+    file_format : str, optional
+        Either "parquet" (default) or "arrow" (Arrow IPC/Feather files).
+    points_per_file : int, optional
+        How many titration points to build up before writing them out, by
+        default 1000000.
+    overwrite : bool, optional
+        Whether to delete anything already in `path` first, by default False.
+    threads : int, optional
+        How many threads to solve titrations in at once, by default `None`
+        (no threads).
+    verbose : bool, optional
+        Whether to print progress, by default False.
+    kwargs
+        Any kwargs that would be passed to `solve`.
+
+    Returns
+    -------
+    list of str
+        The files that were written.  Each row in them is one titration point,
+        with the `index` of its titration in `ds`, its `analysis_batch` (as the
+        partition) and `file_name`, and the fields from `get_points`.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as pads
+
+    assert file_format in {"parquet", "arrow"}, (
+        'file_format must be "parquet" or "arrow".'
+    )
+    print("Calkulate: exporting titration points...")
+    _check_kwargs(kwargs)
+    prepare(ds)
+    assert "titrant_molinity" in ds, (
+        'ds must contain an "titrant_molinity" column!'
+    )
+    if os.path.isdir(path) and len(os.listdir(path)) > 0:
+        assert overwrite, f"path {path} is not empty, use overwrite=True."
+        shutil.rmtree(path)
+    if "analysis_batch" in ds:
+        analysis_batch = ds.analysis_batch.to_numpy()
+    else:
+        analysis_batch = np.zeros(len(ds), dtype=int)
+    file_names = ds.file_name.to_numpy()
+    written = []
+    buffer = []
+    n_buffered = 0
+    n_parts = 0
+
+    def flush():
+        nonlocal buffer, n_buffered, n_parts
+        table = pa.Table.from_pandas(
+            pd.concat(buffer, ignore_index=True), preserve_index=False
+        )
+        pads.write_dataset(
+            table,
+            path,
+            format="ipc" if file_format == "arrow" else "parquet",
+            partitioning=pads.partitioning(
+                pa.schema([table.schema.field("analysis_batch")]),
+                flavor="hive",
+            ),
+            basename_template=f"part-{n_parts:05d}-{{i}}.{file_format}",
+            existing_data_behavior="overwrite_or_ignore",
+            max_partitions=max(table.num_rows, 1024),
+            file_visitor=lambda f: written.append(f.path),
+        )
+        buffer = []
+        n_buffered = 0
+        n_parts += 1
+
+    positions = np.flatnonzero(_stage_rows(ds, "solve"))
+    n_failed = 0
+    for i, record in _iter_records(
+        ds, "points", positions, threads=threads, verbose=verbose, **kwargs
+    ):
+        points = record["points"]
+        if points is None:
+            n_failed += 1
+            continue
+        n = points["point"].size
+        buffer.append(
+            pd.DataFrame(
+                {
+                    "index": np.full(n, ds.index[i]),
+                    "analysis_batch": np.full(n, analysis_batch[i]),
+                    "file_name": np.full(n, file_names[i]),
+                    **points,
+                }
+            )
+        )
+        n_buffered += n
+        if n_buffered >= points_per_file:
+            flush()
+    if n_buffered > 0:
+        flush()
+    if n_failed > 0:
+        warn(f"{n_failed} titrations could not be solved and were skipped.")
+    print("Calkulate: export complete!")
+    return written
+
+
+# Functions that process one row at each stage (or for `export_points`), and
+# the numeric columns in the records that they return (all other columns are
+# error strings)
+stage_records = {
+    "calibrate": _calibrate_record,
+    "solve": _solve_record,
+    "points": _points_record,
+}
+stage_results = {
+    "calibrate": ["titrant_molinity_here"],
+    "solve": [
+        "alkalinity_npts",
+        "alkalinity_std",
+        "alkalinity",
+        "analyte_mass",
+        "emf0",
+        "gran_alkalinity",
+        "gran_emf0",
+        "pH_init",
+        "temperature_init",
+    ],
+}
+
+
+def _empty_results(stage, n):
+    """Preallocate one array per result column for `n` rows at a stage."""
+    results = {k: np.full(n, np.nan) for k in stage_results[stage]}
+    for k in _blank_errors(stage):
+        results[k] = np.full(n, "", dtype=object)
+    return results
+
+
+def _put_record(results, i, record):
+    """Write the record for one row into the result arrays at position `i`."""
+    for k, v in record.items():
+        results[k][i] = v
+
+
+def _iter_records(
+    ds, stage, positions=None, threads=None, verbose=False, **kwargs
+):
+    """Process rows of `ds` (all, or those at `positions`) at a stage,
+    yielding the position and result record of each in order.
+
+    If `threads` is provided, the rows are processed in a pool of that many
+    threads, keeping up to four times as many rows in progress at once.
+    """
+    record_func = stage_records[stage]
+    if positions is None:
+        rows = enumerate(row for _, row in ds.iterrows())
+    else:
+        rows = ((i, ds.iloc[i]) for i in positions)
+    if threads is None:
+        for i, row in rows:
+            yield i, record_func(row, verbose=verbose, **kwargs)
+        return
+    executor = ThreadPoolExecutor(max_workers=threads)
+    try:
+        pending = deque()
+        for i, row in rows:
+            pending.append(
+                (
+                    i,
+                    executor.submit(
+                        _run_in_thread, record_func, row, verbose, **kwargs
+                    ),
+                )
+            )
+            if len(pending) >= 4 * threads:
+                j, future = pending.popleft()
+                yield j, future.result()
+        while pending:
+            j, future = pending.popleft()
+            yield j, future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _collect_results(ds, stage, threads=None, verbose=False, **kwargs):
+    """Process every row of `ds` at a stage, collecting the results into
+    preallocated arrays, one per result column.
+    """
+    results = _empty_results(stage, len(ds))
+    for i, record in _iter_records(
+        ds, stage, threads=threads, verbose=verbose, **kwargs
+    ):
+        _put_record(results, i, record)
+    return results
+
+
+def _check_kwargs(kwargs):
+    """Check for bad kwargs, but don't break on them."""
     kwargs_ignored = []
     for k in _backcompat(kwargs.copy(), []):
         if k not in files.keys_calibrate | {"pH_range", "read_dat_kwargs"}:
@@ -254,20 +1195,107 @@ def solve(ds, verbose=False, **kwargs):
             "kwargs not recognised, being ignored: "
             + ("{} " * len(kwargs_ignored)).format(*kwargs_ignored)
         )
+
+
+def solve(
+    ds,
+    verbose=False,
+    store=None,
+    fingerprint_method="stat",
+    checkpoint=None,
+    checkpoint_every=100,
+    resume=False,
+    threads=None,
+    sink=None,
+    **kwargs,
+):
+    """Solve alkalinity, EMF0 and initial pH for all titrations with a
+    `titrant_molinity` value in a `Dataset`.
+
+    Parameters
+    ----------
+    ds : pandas.DataFrame
+        A table containing metadata for each titration.
+    verbose : `bool`, optional
+        Whether to print progress, by default False.
+    store : str, optional
+        A result store file (see `calk.store`).  If provided, titrations whose
+        fingerprint is found in the store are not solved again, and new
+        results are added to the store.  Because the fingerprint includes the
+        `titrant_molinity`, all titrations in an `analysis_batch` are solved
+        again whenever its calibration changes.  By default `None`.
+    fingerprint_method : str, optional
+        How to fingerprint the titration files when using a `store`, either
+        "stat" (default; file size and modification time) or "hash" (file
+        contents).
+    checkpoint : str, optional
+        A checkpoint file to save results to every `checkpoint_every`
+        titrations, and also if processing is interrupted, by default `None`.
+        This is a result store (see `calk.store`), so it cannot be used
+        together with `store`.
+    checkpoint_every : int, optional
+        How many titrations to process between checkpoints, by default 100.
+    resume : bool, optional
+        Whether to resume from an existing `checkpoint`, skipping titrations
+        whose fingerprint matches one that was already completed, by default
+        False, in which case any existing `checkpoint` is deleted first.
+    threads : int, optional
+        How many threads to process titrations in at once, by default `None`
+        (no threads).  Before Python 3.14, warnings are then shown but not
+        recorded in the results.
+    sink : str, optional
+        A SQLite database file (see `calk.store`) to add the results to, with
+        run metadata and fingerprints, by default `None`.  Titrations that are
+        already there (with the same `file_name` and `analysis_datetime`) are
+        updated.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The titration metadataset with additional columns found by the solver.
+    """
+    print("Calkulate: solving alkalinity...")
+    store = _get_store(store, checkpoint, resume)
+    _check_kwargs(kwargs)
     prepare(ds)
     assert "titrant_molinity" in ds, (
         'ds must contain an "titrant_molinity" column!'
     )
-    solved_rows = ds.apply(solve_row, axis=1, verbose=verbose, **kwargs)
-    for k, v in solved_rows.items():
-        ds[k] = v
-    if "alkalinity_certified" in ds:
-        ds["alkalinity_offset"] = ds.alkalinity - ds.alkalinity_certified
-    print("Calkulate: solving complete!")
+    if store is None:
+        solved = _collect_results(
+            ds, "solve", threads=threads, verbose=verbose, **kwargs
+        )
+    else:
+        solved = _apply_stored(
+            ds,
+            "solve",
+            store,
+            fingerprint_method=fingerprint_method,
+            write_every=checkpoint_every if checkpoint else None,
+            threads=threads,
+            verbose=verbose,
+            **kwargs,
+        )
+    _assign_solved(ds, solved)
+    if sink is not None:
+        _write_sink(
+            ds, "solve", sink, fingerprint_method=fingerprint_method, **kwargs
+        )
     return ds
 
 
-def calkulate(ds, verbose=False, **kwargs):
+def calkulate(
+    ds,
+    verbose=False,
+    store=None,
+    fingerprint_method="stat",
+    checkpoint=None,
+    checkpoint_every=100,
+    resume=False,
+    threads=None,
+    sink=None,
+    **kwargs,
+):
     """Calibrate and then solve all titrations in a `Dataset`.
 
     Parameters
@@ -277,12 +1305,166 @@ def calkulate(ds, verbose=False, **kwargs):
         method).
     verbose : `bool`, optional
         Whether to print progress, by default `calk.default.verbose`.
+    store : str, optional
+        A result store file (see `calk.store`) used to avoid recomputing
+        results for unchanged titrations, by default `None`.
+    fingerprint_method : str, optional
+        How to fingerprint the titration files when using a `store`, either
+        "stat" (default) or "hash".
+    checkpoint : str, optional
+        A checkpoint file to save results to as processing progresses (see
+        `calibrate`), by default `None`.
+    checkpoint_every : int, optional
+        How many titrations to process between checkpoints, by default 100.
+    resume : bool, optional
+        Whether to resume from an existing `checkpoint`, by default False.
+    threads : int, optional
+        How many threads to process titrations in at once (see `calibrate`),
+        by default `None`.
+    sink : str, optional
+        A SQLite database file to add the results to (see `calibrate`), by
+        default `None`.
 
     Returns
     -------
     pd.DataFrame
         The titration metadataset with additional columns found by the solver.
     """
-    calibrate(ds, verbose=verbose, **kwargs)
-    solve(ds, verbose=verbose, **kwargs)
+    kwargs_store = {
+        "store": store,
+        "fingerprint_method": fingerprint_method,
+        "checkpoint": checkpoint,
+        "checkpoint_every": checkpoint_every,
+        "threads": threads,
+        "sink": sink,
+    }
+    calibrate(ds, verbose=verbose, resume=resume, **kwargs_store, **kwargs)
+    solve(ds, verbose=verbose, resume=True, **kwargs_store, **kwargs)
+    return ds
+
+
+async def _collect_results_async(
+    ds, stage, executor=None, max_concurrent=4, verbose=False, **kwargs
+):
+    """Like `_collect_results`, but awaitable, with up to `max_concurrent`
+    rows being processed in the `executor` at once.
+    """
+    loop = asyncio.get_running_loop()
+    results = _empty_results(stage, len(ds))
+    record_func = partial(stage_records[stage], verbose=verbose, **kwargs)
+    if not isinstance(executor, ProcessPoolExecutor):
+        # The default executor is a thread pool
+        record_func = partial(_run_in_thread, record_func)
+    rows = enumerate(row for _, row in ds.iterrows())
+
+    async def process_rows():
+        # All of these share the same `rows` iterator, so each row is only
+        # processed once
+        for i, row in rows:
+            record = await loop.run_in_executor(executor, record_func, row)
+            _put_record(results, i, record)
+
+    await asyncio.gather(*[process_rows() for _ in range(max_concurrent)])
+    return results
+
+
+async def calibrate_async(
+    ds, verbose=False, executor=None, max_concurrent=4, **kwargs
+):
+    """Like `calibrate`, but awaitable, so it does not block an asyncio event
+    loop.
+
+    The titrations are read, calibrated and solved in the `executor`.  If the
+    task is cancelled, no more titrations are started and no results from the
+    step in progress (calibrating or solving) are added to `ds`.  Titrations
+    that were already running finish in the background, but their results are
+    discarded.
+
+    Parameters
+    ----------
+    ds : pandas.DataFrame
+        A table containing metadata for each titration (not used if running as
+        a method).
+    verbose : bool, optional
+        Whether to print progress, by default False.
+    executor : concurrent.futures.Executor, optional
+        Where to process the titrations, by default `None`, i.e. the event
+        loop's default executor (a thread pool).
+    max_concurrent : int, optional
+        The maximum number of titrations being processed at once, by default
+        4, so that a large dataset does not fill up the executor.
+    kwargs
+        Any kwargs that would be passed to `calibrate`.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The titration metadataset with additional columns found by the solver.
+    """
+    print("Calkulate: calibrating titrant_molinity...")
+    prepare(ds)
+    assert "alkalinity_certified" in ds, (
+        'ds must contain an "alkalinity_certified" column!'
+    )
+    calibrated = await _collect_results_async(
+        ds,
+        "calibrate",
+        executor=executor,
+        max_concurrent=max_concurrent,
+        verbose=verbose,
+        **kwargs,
+    )
+    _assign_calibrated(ds, calibrated)
+    return await solve_async(
+        ds,
+        verbose=verbose,
+        executor=executor,
+        max_concurrent=max_concurrent,
+        **kwargs,
+    )
+
+
+async def solve_async(
+    ds, verbose=False, executor=None, max_concurrent=4, **kwargs
+):
+    """Like `solve`, but awaitable, so it does not block an asyncio event loop.
+
+    See `calibrate_async` for how the titrations are processed and what
+    happens on cancellation.
+
+    Parameters
+    ----------
+    ds : pandas.DataFrame
+        A table containing metadata for each titration (not used if running as
+        a method).
+    verbose : bool, optional
+        Whether to print progress, by default False.
+    executor : concurrent.futures.Executor, optional
+        Where to process the titrations, by default `None`, i.e. the event
+        loop's default executor (a thread pool).
+    max_concurrent : int, optional
+        The maximum number of titrations being processed at once, by default 4.
+    kwargs
+        Any kwargs that would be passed to `solve`.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The titration metadataset with additional columns found by the solver.
+    """
+    print("Calkulate: solving alkalinity...")
+    _check_kwargs(kwargs)
+    prepare(ds)
+    assert "titrant_molinity" in ds, (
+        'ds must contain an "titrant_molinity" column!'
+    )
+    solved = await _collect_results_async(
+        ds,
+        "solve",
+        executor=executor,
+        max_concurrent=max_concurrent,
+        verbose=verbose,
+        **kwargs,
+    )
+    _assign_solved(ds, solved)
     return ds
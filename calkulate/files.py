@@ -17,7 +17,9 @@ The processing steps are
       molinity.
 """
 
+import asyncio
 import os
+from functools import partial
 from warnings import warn
 
 from . import core
@@ -59,6 +61,17 @@ keys_solve = (
 )
 
 
+def _run_stage(stage, func, *args, **kwargs):
+    """Run one processing step of `calibrate` or `solve`, tagging any
+    exception with the `stage` that it was raised in.
+    """
+    try:
+        return func(*args, **kwargs)
+    except Exception as e:
+        e.stage = stage
+        raise
+
+
 def calibrate(
     file_name,
     alkalinity_certified,
@@ -106,18 +119,22 @@ def calibrate(
     if "file_path" in kwargs:
         file_name = os.path.join(kwargs["file_path"], file_name)
     kwargs_read_dat = _get_kwargs_for(keys_read_dat, kwargs)
-    dd = read_dat(file_name, **kwargs_read_dat)
+    dd = _run_stage("read", read_dat, file_name, **kwargs_read_dat)
     # Convert amount units
     kwargs_cau = _get_kwargs_for(keys_cau, kwargs)
-    cv = amount_units(dd, salinity, **kwargs_cau)
+    cv = _run_stage("convert", amount_units, dd, salinity, **kwargs_cau)
     # Get total salts and equilibrium constants
     kwargs_totals_ks = _get_kwargs_for(keys_totals_ks, kwargs)
-    totals, k_constants = totals_ks(cv, **kwargs_totals_ks)
+    totals, k_constants = _run_stage(
+        "totals_ks", totals_ks, cv, **kwargs_totals_ks
+    )
     # Calibrate!
     if solve_mode.lower() == "emf":
         # Titration data are EMFs
         kwargs_calibrate_emf = _get_kwargs_for(keys_calibrate_emf, kwargs)
-        cal = core.calibrate_emf(
+        cal = _run_stage(
+            "calibrate",
+            core.calibrate_emf,
             alkalinity_certified,
             cv.titrant_mass,
             cv.measurement,
@@ -132,8 +149,12 @@ def calibrate(
         kwargs_calibrate_emf = _get_kwargs_for(keys_calibrate_emf, kwargs)
         emf0_init = 0
         kwargs_calibrate_emf["emf0_init"] = emf0_init
-        emf = pH_to_emf(cv.measurement, emf0_init, cv.temperature)
-        cal = core.calibrate_emf(
+        emf = _run_stage(
+            "calibrate", pH_to_emf, cv.measurement, emf0_init, cv.temperature
+        )
+        cal = _run_stage(
+            "calibrate",
+            core.calibrate_emf,
             alkalinity_certified,
             cv.titrant_mass,
             emf,
@@ -146,7 +167,9 @@ def calibrate(
     elif solve_mode.lower() == "ph":
         # Titration data are pHs and cannot be adjusted
         kwargs_calibrate_pH = _get_kwargs_for(keys_calibrate_pH, kwargs)
-        cal = core.calibrate_pH(
+        cal = _run_stage(
+            "calibrate",
+            core.calibrate_pH,
             alkalinity_certified,
             cv.titrant_mass,
             cv.measurement,
@@ -161,7 +184,9 @@ def calibrate(
         kwargs_calibrate_pH_gran = _get_kwargs_for(
             keys_calibrate_pH_gran, kwargs
         )
-        cal = core.calibrate_pH_gran(
+        cal = _run_stage(
+            "calibrate",
+            core.calibrate_pH_gran,
             alkalinity_certified,
             cv.titrant_mass,
             cv.measurement,
@@ -212,15 +237,19 @@ def solve(
     if "file_path" in kwargs:
         file_name = os.path.join(kwargs["file_path"], file_name)
     kwargs_read_dat = _get_kwargs_for(keys_read_dat, kwargs)
-    dd = read_dat(file_name, **kwargs_read_dat)
+    dd = _run_stage("read", read_dat, file_name, **kwargs_read_dat)
     # Convert amount units
     kwargs_cau = _get_kwargs_for(keys_cau, kwargs)
-    cv = amount_units(dd, salinity, **kwargs_cau)
+    cv = _run_stage("convert", amount_units, dd, salinity, **kwargs_cau)
     # Get total salts and equilibrium constants
     kwargs_totals_ks = _get_kwargs_for(keys_totals_ks, kwargs)
-    totals, k_constants = totals_ks(cv, **kwargs_totals_ks)
+    totals, k_constants = _run_stage(
+        "totals_ks", totals_ks, cv, **kwargs_totals_ks
+    )
     kwargs_titrant_totals = _get_kwargs_for(keys_titrant_totals, kwargs)
-    totals = add_titrant_totals(
+    totals = _run_stage(
+        "totals_ks",
+        add_titrant_totals,
         totals,
         cv.titrant_mass,
         cv.analyte_mass,
@@ -232,7 +261,9 @@ def solve(
     if solve_mode.lower() == "emf":
         # Titration data are EMFs
         kwargs_solve_emf = _get_kwargs_for(keys_solve_emf, kwargs)
-        sr = core.solve_emf(
+        sr = _run_stage(
+            "solve",
+            core.solve_emf,
             titrant_molinity,
             cv.titrant_mass,
             cv.measurement,
@@ -247,8 +278,12 @@ def solve(
         kwargs_solve_emf = _get_kwargs_for(keys_solve_emf, kwargs)
         emf0_init = 0
         kwargs_solve_emf["emf0_init"] = emf0_init
-        emf = pH_to_emf(cv.measurement, emf0_init, cv.temperature)
-        sr = core.solve_emf(
+        emf = _run_stage(
+            "solve", pH_to_emf, cv.measurement, emf0_init, cv.temperature
+        )
+        sr = _run_stage(
+            "solve",
+            core.solve_emf,
             titrant_molinity,
             cv.titrant_mass,
             emf,
@@ -261,7 +296,9 @@ def solve(
     elif solve_mode.lower() == "ph":
         # Titration data are pHs and cannot be adjusted
         kwargs_solve_pH = _get_kwargs_for(keys_solve_pH, kwargs)
-        sr = core.solve_pH(
+        sr = _run_stage(
+            "solve",
+            core.solve_pH,
             titrant_molinity,
             cv.titrant_mass,
             cv.measurement,
@@ -274,7 +311,9 @@ def solve(
     elif solve_mode.lower() == "ph_gran":
         # Titration data are pHs and cannot be adjusted
         kwargs_solve_pH_gran = _get_kwargs_for(keys_solve_pH_gran, kwargs)
-        sr = core.solve_pH_gran(
+        sr = _run_stage(
+            "solve",
+            core.solve_pH_gran,
             titrant_molinity,
             cv.titrant_mass,
             cv.measurement,
@@ -287,3 +326,82 @@ def solve(
     else:
         raise Exception("`solve_mode` not valid")
     return sr
+
+
+async def _run_async(func, executor, semaphore):
+    """Run `func` in the `executor`, waiting for the `semaphore` first."""
+    loop = asyncio.get_running_loop()
+    if semaphore is None:
+        return await loop.run_in_executor(executor, func)
+    async with semaphore:
+        return await loop.run_in_executor(executor, func)
+
+
+async def calibrate_async(
+    file_name,
+    alkalinity_certified,
+    salinity,
+    executor=None,
+    semaphore=None,
+    **kwargs,
+):
+    """Like `calibrate`, but awaitable, so it does not block an asyncio event
+    loop.  The file is read and calibrated in the `executor`.
+
+    Parameters
+    ----------
+    file_name, alkalinity_certified, salinity, kwargs
+        As for `calibrate`.
+    executor : concurrent.futures.Executor, optional
+        Where to run `calibrate`, by default `None`, i.e. the event loop's
+        default executor (a thread pool).
+    semaphore : asyncio.Semaphore, optional
+        If provided, wait to acquire this before starting.  Use the same
+        semaphore for many calls to limit how many run at once.
+
+    Returns
+    -------
+    opt_result : scipy.optimize.OptimizeResult
+        As for `calibrate`.
+    """
+    return await _run_async(
+        partial(
+            calibrate, file_name, alkalinity_certified, salinity, **kwargs
+        ),
+        executor,
+        semaphore,
+    )
+
+
+async def solve_async(
+    file_name,
+    titrant_molinity,
+    salinity,
+    executor=None,
+    semaphore=None,
+    **kwargs,
+):
+    """Like `solve`, but awaitable, so it does not block an asyncio event
+    loop.  The file is read and solved in the `executor`.
+
+    Parameters
+    ----------
+    file_name, titrant_molinity, salinity, kwargs
+        As for `solve`.
+    executor : concurrent.futures.Executor, optional
+        Where to run `solve`, by default `None`, i.e. the event loop's default
+        executor (a thread pool).
+    semaphore : asyncio.Semaphore, optional
+        If provided, wait to acquire this before starting.  Use the same
+        semaphore for many calls to limit how many run at once.
+
+    Returns
+    -------
+    SolveEmfResult, SolvePhResult or SolvePhGranResult
+        As for `solve`.
+    """
+    return await _run_async(
+        partial(solve, file_name, titrant_molinity, salinity, **kwargs),
+        executor,
+        semaphore,
+    )
@@ -0,0 +1,118 @@
+# Calkulate: seawater total alkalinity from titration data
+# Copyright (C) 2019--2025  Matthew P. Humphreys  (GNU GPLv3)
+"""Fingerprint titrations so that previously computed results can be reused.
+
+A fingerprint is a hex digest that changes whenever anything that could affect
+the result for a titration changes: the titration data file itself (its size
+and modification time, or its contents), the relevant metadata for that row,
+the resolved kwargs and the Calkulate version.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .meta import __version__
+from .read import archives
+
+
+file_methods = {"stat", "hash"}
+# kwargs that cannot affect the results
+kwargs_ignored = {"dat_cache"}
+
+
+def file_fingerprint(file_name, method="stat", chunk_size=2**20):
+    """Fingerprint a titration data file.
+
+    Parameters
+    ----------
+    file_name : str
+        The name (and path to) the titration data file.
+    method : str, optional
+        How to fingerprint the file, either
+            "stat" (default) - file size and modification time (fast)
+            "hash" - SHA-256 digest of the file contents (robust)
+    chunk_size : int, optional
+        Number of bytes to read at a time when hashing, by default 1 MiB.
+
+    Returns
+    -------
+    str
+        The file fingerprint, or "missing" if the file does not exist.
+    """
+    assert method in file_methods, f"method must be one of {file_methods}."
+    archive, member = archives.split_archive_path(file_name)
+    if archive is not None:
+        return archives.member_fingerprint(archive, member, method=method)
+    try:
+        if method == "stat":
+            st = os.stat(file_name)
+            return f"{st.st_size}:{st.st_mtime_ns}"
+        else:
+            h = hashlib.sha256()
+            with open(file_name, "rb") as f:
+                for chunk in iter(lambda: f.read(chunk_size), b""):
+                    h.update(chunk)
+            return h.hexdigest()
+    except OSError:
+        return "missing"
+
+
+def _canonical(value):
+    """Convert a metadata value into something that can be stably serialised
+    to JSON.
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        return "nan" if np.isnan(value) else repr(value)
+    if value is None or (np.ndim(value) == 0 and pd.isnull(value)):
+        return "nan"
+    if isinstance(value, (bool, int, str)):
+        return value
+    if np.ndim(value) > 0:
+        return [_canonical(v) for v in np.ravel(value)]
+    return str(value)
+
+
+def row_fingerprint(stage, file_name, metadata, kwargs, method="stat"):
+    """Fingerprint a single titration at a given processing stage.
+
+    Parameters
+    ----------
+    stage : str
+        The processing stage, e.g. "calibrate" or "solve".
+    file_name : str
+        The name (and path to) the titration data file.
+    metadata : dict
+        Metadata values for the titration that are not already in `kwargs`,
+        e.g. `salinity` and `alkalinity_certified`.
+    kwargs : dict
+        The kwargs resolved for this titration, as they would be passed to
+        `files.calibrate` or `files.solve`.
+    method : str, optional
+        How to fingerprint the file, "stat" (default) or "hash" (see
+        `file_fingerprint`).
+
+    Returns
+    -------
+    str
+        The SHA-256 hex digest fingerprint.
+    """
+    content = {
+        "version": __version__,
+        "stage": stage,
+        "file": file_fingerprint(file_name, method=method),
+        "metadata": {k: _canonical(v) for k, v in metadata.items()},
+        "kwargs": {
+            k: _canonical(v)
+            for k, v in kwargs.items()
+            if k not in kwargs_ignored
+        },
+    }
+    return hashlib.sha256(
+        json.dumps(content, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
@@ -0,0 +1,280 @@
+# Calkulate: seawater total alkalinity from titration data
+# Copyright (C) 2019--2025  Matthew P. Humphreys  (GNU GPLv3)
+"""Pack the titration files of a dataset into one memory-mapped archive.
+
+Reading thousands of small titration files means opening and parsing each one
+every time a dataset is processed.  A pack file (see `calk.read.archives` for
+the format) holds all of their data already parsed, in three flat columns that
+are memory-mapped, so reading a titration from it is just slicing an array.
+The workflow is
+  1.  `pack_dataset`: read every titration file of a `Dataset` and save their
+      data in one pack file.
+  2.  Set the dataset's `file_path` to the pack file, then use `calibrate`,
+      `solve` etc. as usual.
+  3.  Optionally, `verify` that the pack matches the original files, or
+      `unpack` it back into separate files, e.g. with the command
+          python -m calkulate.pack verify cruise.calkpack path/to/files/
+"""
+
+import argparse
+import os
+import sys
+from warnings import warn
+
+import numpy as np
+
+from . import dataset
+from .read import archives
+from .read.titrations import keys_read_dat, read_dat, write_dat_many
+
+
+def _pack_sources(pack_fname, sources, verbose=False):
+    """Read titration files and save their data in one pack file.
+
+    `sources` is an iterable of `(file_name, fname, read_dat_kwargs)`, where
+    `file_name` is the name in the pack and `fname` is the file to read.
+    """
+    dat_data = {}
+    skipped = []
+    for file_name, fname, read_dat_kwargs in sources:
+        if file_name in dat_data:
+            continue
+        try:
+            dat_data[file_name] = read_dat(fname, **read_dat_kwargs)
+        except (OSError, ValueError, KeyError):
+            skipped.append(file_name)
+    if len(skipped) > 0:
+        warn(
+            "titration files could not be read, so were not packed: "
+            + ("{} " * len(skipped)).format(*skipped)
+        )
+    archives.write_pack(pack_fname, dat_data)
+    if verbose:
+        print(
+            f"Calkulate: packed {len(dat_data)} titrations into {pack_fname}"
+        )
+    return list(dat_data)
+
+
+def pack_files(
+    pack_fname, file_names, file_path=None, verbose=False, **read_dat_kwargs
+):
+    """Read titration files and save their data in one pack file.
+
+    Files that cannot be read are skipped, with a warning.
+
+    Parameters
+    ----------
+    pack_fname : str
+        The pack file name (and path), which should end with ".calkpack".
+    file_names : iterable of str
+        The titration file names, which are used as their names in the pack.
+    file_path : str, optional
+        The path to the titration files, by default `None`.
+    verbose : bool, optional
+        Whether to print progress, by default False.
+    read_dat_kwargs
+        Any kwargs to pass to `read_dat`, e.g. `file_type`.
+
+    Returns
+    -------
+    list of str
+        The file names that were packed.
+    """
+    sources = (
+        (
+            file_name,
+            file_name
+            if file_path is None
+            else os.path.join(file_path, file_name),
+            read_dat_kwargs,
+        )
+        for file_name in file_names
+    )
+    return _pack_sources(pack_fname, sources, verbose=verbose)
+
+
+def pack_dataset(ds, pack_fname, verbose=False, **kwargs):
+    """Read the titration files of a dataset and save their data in one pack
+    file.
+
+    Each row's `file_path`, `file_type` etc. are used as they would be by
+    `calibrate` and `solve`.  Rows where `file_good` is `False` are not
+    packed.  Each `file_name` is packed only once, so they should be unique.
+    To read from the pack, set the dataset's `file_path` to `pack_fname`.
+
+    Parameters
+    ----------
+    ds : pandas.DataFrame
+        A table containing metadata for each titration.
+    pack_fname : str
+        The pack file name (and path), which should end with ".calkpack".
+    verbose : bool, optional
+        Whether to print progress, by default False.
+    kwargs
+        Any kwargs that would be passed to `calibrate` or `solve`.
+
+    Returns
+    -------
+    list of str
+        The file names that were packed.
+    """
+    if "file_good" in ds:
+        ds = ds[ds.file_good.astype(bool)]
+
+    def sources():
+        for _, row in ds.iterrows():
+            kwargs_row = dataset._resolve_kwargs(
+                keys_read_dat | {"file_path"}, kwargs, row
+            )
+            fname = row.file_name
+            if "file_path" in kwargs_row:
+                fname = os.path.join(kwargs_row.pop("file_path"), fname)
+            yield row.file_name, fname, kwargs_row
+
+    return _pack_sources(pack_fname, sources(), verbose=verbose)
+
+
+def unpack(pack_fname, output_path, fmt=".17g"):
+    """Write every titration in a pack file to a separate text file, in the
+    default format for `read_dat`.
+
+    Parameters
+    ----------
+    pack_fname : str
+        The pack file name (and path).
+    output_path : str
+        The directory to write the titration files to.  Existing files are not
+        overwritten.
+    fmt : str, optional
+        The format for all values, by default ".17g", which means that reading
+        the files back in gives exactly the values in the pack.
+
+    Returns
+    -------
+    list of str
+        The file names that were written.
+    """
+    pack = archives.Pack(pack_fname)
+    titrations = {}
+    for file_name in pack:
+        fname = os.path.join(output_path, *file_name.split("/"))
+        os.makedirs(os.path.dirname(fname), exist_ok=True)
+        titrations[fname] = pack.read(file_name)
+    return write_dat_many(
+        titrations,
+        line0=f"Titration data unpacked by Calkulate from {pack_fname}",
+        titrant_amount_fmt=fmt,
+        measurement_fmt=fmt,
+        temperature_fmt=fmt,
+    )
+
+
+def verify(pack_fname, file_path=None, **read_dat_kwargs):
+    """Check that every titration in a pack file is exactly the same as in the
+    original files.
+
+    Parameters
+    ----------
+    pack_fname : str
+        The pack file name (and path).
+    file_path : str, optional
+        The path to the original titration files (or to files written by
+        `unpack`), by default `None`.  This can be inside a zip or tar
+        archive (see `calk.read.archives`).
+    read_dat_kwargs
+        Any kwargs to pass to `read_dat` for the original files, e.g.
+        `file_type`.
+
+    Returns
+    -------
+    dict
+        The problem with each titration that does not match, i.e. "missing",
+        "could not be read" or "different".  Empty if everything matches.
+    """
+    pack = archives.Pack(pack_fname)
+    problems = {}
+    for file_name in pack:
+        fname = file_name
+        if file_path is not None:
+            fname = os.path.join(file_path, *file_name.split("/"))
+        if not archives.file_exists(fname):
+            problems[file_name] = "missing"
+            continue
+        try:
+            original = read_dat(fname, **read_dat_kwargs)
+        except (OSError, ValueError, KeyError):
+            problems[file_name] = "could not be read"
+            continue
+        packed = pack.read(file_name)
+        if not all(
+            np.shape(o) == np.shape(p) and np.array_equal(o, p, equal_nan=True)
+            for o, p in zip(original, packed)
+        ):
+            problems[file_name] = "different"
+    return problems
+
+
+def main(args=None):
+    """Command to create, unpack or verify a pack file."""
+    parser = argparse.ArgumentParser(
+        prog="python -m calkulate.pack",
+        description="Create, unpack or verify Calkulate pack files.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    create = subparsers.add_parser(
+        "create", help="pack the titration files in a directory"
+    )
+    create.add_argument("pack_fname", help="pack file to create")
+    create.add_argument("file_path", help="directory of titration files")
+    create.add_argument("--file-type", default="genfromtxt")
+    unpack_ = subparsers.add_parser(
+        "unpack", help="write each packed titration to a separate file"
+    )
+    unpack_.add_argument("pack_fname", help="pack file")
+    unpack_.add_argument("output_path", help="directory to write files to")
+    unpack_.add_argument(
+        "--verify",
+        action="store_true",
+        help="check that the files written match the pack",
+    )
+    verify_ = subparsers.add_parser(
+        "verify", help="check a pack against the original titration files"
+    )
+    verify_.add_argument("pack_fname", help="pack file")
+    verify_.add_argument("file_path", help="directory of titration files")
+    verify_.add_argument("--file-type", default="genfromtxt")
+    args = parser.parse_args(args)
+    if args.command == "create":
+        file_names = sorted(
+            f
+            for f in os.listdir(args.file_path)
+            if os.path.isfile(os.path.join(args.file_path, f))
+        )
+        pack_files(
+            args.pack_fname,
+            file_names,
+            file_path=args.file_path,
+            file_type=args.file_type,
+            verbose=True,
+        )
+        return 0
+    if args.command == "unpack":
+        fnames = unpack(args.pack_fname, args.output_path)
+        print(f"Calkulate: unpacked {len(fnames)} titrations.")
+        if not args.verify:
+            return 0
+        problems = verify(args.pack_fname, args.output_path)
+    else:
+        problems = verify(
+            args.pack_fname, args.file_path, file_type=args.file_type
+        )
+    for file_name, problem in problems.items():
+        print(f"{file_name}: {problem}")
+    n = len(archives.Pack(args.pack_fname))
+    print(f"Calkulate: {n - len(problems)} of {n} titrations match the pack.")
+    return 1 if len(problems) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
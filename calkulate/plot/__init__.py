@@ -5,7 +5,6 @@
 import numpy as np
 from matplotlib import pyplot as plt
 
-from .. import dataset
 from . import misc
 
 
@@ -49,10 +48,13 @@ def titrant_molinity(
         )
         ax.legend()
     if show_batches:
-        batches = dataset.get_batches(data)
-        for batch in batches.index:
-            B = (data.analysis_batch == batch).to_numpy()
-            ax.plot(xdata[B], data.titrant_molinity[B], c="xkcd:navy")
+        # Only the rows in each batch are needed, not the batch statistics
+        for B in data.groupby("analysis_batch").indices.values():
+            ax.plot(
+                np.asarray(xdata)[B],
+                data.titrant_molinity.to_numpy()[B],
+                c="xkcd:navy",
+            )
     ax.grid(alpha=0.3)
     misc.add_credit(ax)
     ax.set_xlabel(xlabel)
@@ -84,11 +86,7 @@ def alkalinity_offset(
     else:
         G = np.full(np.size(xdata), True)
     if show_batches:
-        batches = dataset.get_batches(data)
-        clr = np.full(np.size(xdata), -1)
-        for b, batch in enumerate(batches.index):
-            B = (data.analysis_batch == batch).to_numpy()
-            clr[B] = b
+        clr = data.groupby("analysis_batch").ngroup().to_numpy()
         clr = clr[G]
     else:
         clr = "xkcd:navy"
@@ -0,0 +1,473 @@
+# Calkulate: seawater total alkalinity from titration data
+# Copyright (C) 2019--2025  Matthew P. Humphreys  (GNU GPLv3)
+"""Read titration data from inside archive files.
+
+A titration file inside an archive is referred to with the archive's file name
+as if it were a directory, e.g. `"cruise.calkpack/0-0  0  (0)JUNK1.dat"`, so
+setting `file_path` to the archive's file name is all that is needed for
+`calibrate`, `solve` etc. to read from it.  Each archive is opened only once
+per process and kept for reuse, until `close_archives` is called.  Forked
+processes (e.g., workers started by `iter_solve`) open their own copies.
+
+Zip and tar archives (`.zip`, `.tar`, `.tar.gz`, `.tgz`, `.tar.bz2`,
+`.tar.xz`) are indexed when they are opened, and each member is then read into
+memory and passed straight to the `file_type` parser, without being extracted
+to disk.  Compressed tar archives cannot be read efficiently out of order, so
+all of their members are read into memory in one pass when they are opened,
+and they stay there until `close_archives` is called.
+
+Pack files (`.calkpack`) hold the titration data already parsed, in three flat
+float64 columns (`titrant_amount`, `measurement` and `temperature`) that are
+memory-mapped, plus an index of where each titration's rows start and stop,
+keyed by its `file_name`.  The layout is
+  1.  The 8 bytes `b"CALKPACK"`.
+  2.  The length of the JSON header in bytes, as a little-endian uint64.
+  3.  The JSON header, with keys "version", "n_points" and "index", where
+      "index" maps each `file_name` to `[start, stop]`.
+  4.  Zero padding up to the next multiple of 64 bytes.
+  5.  The data, as a little-endian float64 array of shape `(3, n_points)`.
+Use `calk.pack` to create, unpack and verify them.
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import tarfile
+import threading
+import zipfile
+
+import numpy as np
+
+
+pack_magic = b"CALKPACK"
+pack_version = 1
+pack_columns = ("titrant_amount", "measurement", "temperature")
+tar_extensions = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+archive_extensions = (".calkpack", ".zip", *tar_extensions)
+
+
+def split_archive_path(file_name):
+    """Split a file name into an archive and the name of a member inside it.
+
+    The file name is only inspected as a string, so this does not access the
+    file system.
+
+    Parameters
+    ----------
+    file_name : str
+        The file name (and path).
+
+    Returns
+    -------
+    str or None
+        The archive file name, or `None` if `file_name` is not inside an
+        archive.
+    str
+        The member name inside the archive, with "/" separators, or
+        `file_name` unchanged if it is not inside an archive.
+    """
+    parts = re.split(r"[\\/]", str(file_name))
+    for i, part in enumerate(parts[:-1]):
+        if part.lower().endswith(archive_extensions):
+            return "/".join(parts[: i + 1]), member_name(parts[i + 1 :])
+    return None, file_name
+
+
+def member_name(file_name):
+    """Normalise the name of a member inside an archive, so that it uses "/"
+    separators and has no empty or "." parts.
+
+    Parameters
+    ----------
+    file_name : str or list of str
+        The member name, or its parts.
+
+    Returns
+    -------
+    str
+        The normalised member name.
+    """
+    if isinstance(file_name, str):
+        file_name = re.split(r"[\\/]", file_name)
+    return "/".join(p for p in file_name if p not in ("", "."))
+
+
+def _pack_data_offset(header_size):
+    """Get the byte offset of the data in a pack file, after the magic,
+    header size, header and padding.
+    """
+    offset = len(pack_magic) + 8 + header_size
+    return -(-offset // 64) * 64
+
+
+class Pack:
+    """
+    calkulate.read.archives.Pack
+    ============================
+    A memory-mapped pack file of parsed titration data.
+
+    Parameters
+    ----------
+    pack_fname : str
+        The pack file name (and path).
+
+    Methods
+    -------
+    read
+        Get the titration data for one `file_name`.
+    """
+
+    def __init__(self, pack_fname):
+        self.pack_fname = pack_fname
+        with open(pack_fname, "rb") as f:
+            magic = f.read(len(pack_magic))
+            if magic != pack_magic:
+                raise ValueError(f"{pack_fname} is not a Calkulate pack file.")
+            header_size = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_size).decode("utf-8"))
+        if header["version"] > pack_version:
+            raise ValueError(
+                f"{pack_fname} is pack version {header['version']}, but only "
+                + f"versions up to {pack_version} can be read."
+            )
+        self.index = {k: tuple(v) for k, v in header["index"].items()}
+        self.n_points = header["n_points"]
+        if self.n_points > 0:
+            self.data = np.memmap(
+                pack_fname,
+                dtype="<f8",
+                mode="r",
+                offset=_pack_data_offset(header_size),
+                shape=(len(pack_columns), self.n_points),
+            )
+        else:
+            self.data = np.empty((len(pack_columns), 0))
+
+    def __contains__(self, file_name):
+        return file_name in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def read(self, file_name):
+        """Get the titration data for one `file_name`.
+
+        The arrays are read-only views of the memory-mapped pack file.
+
+        Parameters
+        ----------
+        file_name : str
+            The `file_name` of the titration, as it was packed.
+
+        Returns
+        -------
+        titrant_amount, measurement, temperature : np.ndarray
+            The titration data.
+        """
+        try:
+            start, stop = self.index[file_name]
+        except KeyError:
+            raise FileNotFoundError(
+                f"{file_name} not found in {self.pack_fname}"
+            ) from None
+        return tuple(np.asarray(column[start:stop]) for column in self.data)
+
+    def close(self):
+        """Release the memory map.  Arrays already returned by `read` remain
+        usable.
+        """
+        self.data = np.empty((len(pack_columns), 0))
+        self.index = {}
+
+    def digest(self, file_name):
+        """Get the SHA-256 hex digest of one titration's data."""
+        h = hashlib.sha256()
+        for column in self.read(file_name):
+            h.update(np.ascontiguousarray(column, dtype="<f8").tobytes())
+        return h.hexdigest()
+
+
+class _MemberArchive:
+    """Base class for archives of titration files that are read into memory
+    one member at a time.  Subclasses must set `self.index` (member name to
+    whatever `_read` needs) and define `_read`.
+    """
+
+    def __init__(self, archive_fname):
+        self.archive_fname = archive_fname
+        # Archive file objects can't be read from several threads at once
+        self._lock = threading.Lock()
+
+    def __contains__(self, member):
+        return member in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def read_bytes(self, member):
+        """Read the contents of one member.
+
+        Parameters
+        ----------
+        member : str
+            The member name inside the archive.
+
+        Returns
+        -------
+        bytes
+            The contents of the member.
+        """
+        try:
+            info = self.index[member]
+        except KeyError:
+            raise FileNotFoundError(
+                f"{member} not found in {self.archive_fname}"
+            ) from None
+        with self._lock:
+            return self._read(info)
+
+    def close(self):
+        """Close the archive file, if it is kept open."""
+
+    def open(self, member):
+        """Open one member as an in-memory binary file."""
+        return io.BytesIO(self.read_bytes(member))
+
+    def digest(self, member):
+        """Get the SHA-256 hex digest of one member's contents."""
+        return hashlib.sha256(self.read_bytes(member)).hexdigest()
+
+
+class ZipArchive(_MemberArchive):
+    """
+    calkulate.read.archives.ZipArchive
+    ==================================
+    A zip archive of titration files.
+
+    Parameters
+    ----------
+    archive_fname : str
+        The zip file name (and path).
+    """
+
+    def __init__(self, archive_fname):
+        super().__init__(archive_fname)
+        self.zip_file = zipfile.ZipFile(archive_fname)
+        self.index = {
+            member_name(info.filename): info
+            for info in self.zip_file.infolist()
+            if not info.is_dir()
+        }
+
+    def _read(self, info):
+        return self.zip_file.read(info)
+
+    def close(self):
+        """Close the zip file."""
+        with self._lock:
+            self.zip_file.close()
+
+
+class TarArchive(_MemberArchive):
+    """
+    calkulate.read.archives.TarArchive
+    ==================================
+    A tar archive of titration files, which may be compressed.
+
+    Members of an uncompressed tar archive are read from the file on disk
+    when they are needed, so the archive is not kept open.  Compressed tar
+    archives are decompressed and all of their members held in memory until
+    `close_archives` is called, so large compressed archives should be
+    extracted (or packed, see `calk.pack`) first.
+
+    Parameters
+    ----------
+    archive_fname : str
+        The tar file name (and path).
+    """
+
+    def __init__(self, archive_fname):
+        super().__init__(archive_fname)
+        with tarfile.open(archive_fname) as tar_file:
+            if archive_fname.lower().endswith(".tar"):
+                # Regular members are stored uncompressed and contiguously
+                self.index = {
+                    member_name(info.name): (
+                        (info.offset_data, info.size)
+                        if not info.issparse()
+                        else tar_file.extractfile(info).read()
+                    )
+                    for info in tar_file
+                    if info.isfile()
+                }
+            else:
+                # Seeking backwards in a compressed stream means decompressing
+                # it again from the start, so read every member now, in order
+                self.index = {
+                    member_name(info.name): tar_file.extractfile(info).read()
+                    for info in tar_file
+                    if info.isfile()
+                }
+
+    def _read(self, info):
+        if isinstance(info, bytes):
+            return info
+        offset, size = info
+        with open(self.archive_fname, "rb") as f:
+            f.seek(offset)
+            return f.read(size)
+
+
+def write_pack(pack_fname, dat_data):
+    """Write parsed titration data to a pack file.
+
+    The file is written under a temporary name and then renamed, so a pack
+    file is never left half-written.
+
+    Parameters
+    ----------
+    pack_fname : str
+        The pack file name (and path), which should end with ".calkpack".
+    dat_data : dict
+        The titration data for each `file_name`, each as a tuple of
+        `(titrant_amount, measurement, temperature)` arrays.  Data with any
+        other number of arrays (e.g., from the "orgalk_excel" reader, which
+        returns four) cannot be packed and raise a `ValueError`.
+    """
+    index = {}
+    columns = [[] for _ in pack_columns]
+    n_points = 0
+    for file_name, arrays in dat_data.items():
+        if len(arrays) != len(pack_columns):
+            raise ValueError(
+                f"{file_name}: packs can only hold {len(pack_columns)} arrays"
+                + f" per titration {pack_columns}, not {len(arrays)}."
+            )
+        arrays = [np.asarray(a, dtype=float).ravel() for a in arrays]
+        assert len({len(a) for a in arrays}) == 1, (
+            f"{file_name}: arrays must all be the same length!"
+        )
+        index[member_name(file_name)] = [n_points, n_points + len(arrays[0])]
+        n_points += len(arrays[0])
+        for column, a in zip(columns, arrays):
+            column.append(a)
+    header = json.dumps(
+        {"version": pack_version, "n_points": n_points, "index": index}
+    ).encode("utf-8")
+    data_offset = _pack_data_offset(len(header))
+    tmp_fname = f"{pack_fname}.tmp-{os.getpid()}"
+    with open(tmp_fname, "wb") as f:
+        f.write(pack_magic)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        f.write(b"\0" * (data_offset - f.tell()))
+        for column in columns:
+            if len(column) > 0:
+                f.write(np.concatenate(column).astype("<f8").tobytes())
+    os.replace(tmp_fname, pack_fname)
+    with _archives_lock:
+        _archives.pop(os.path.abspath(pack_fname), None)
+
+
+# Archives that have been opened in this process, keyed by absolute path
+_archives = {}
+# Only open each archive once, even if it is first needed by several threads
+_archives_lock = threading.Lock()
+
+
+def _forget_archives():
+    """Forget the archives opened by the parent of a forked process, because
+    their open files (and the positions in them) are shared with the parent,
+    so reading from them in both processes at once would mix up the data.
+    """
+    global _archives_lock
+    _archives.clear()
+    # The parent's lock may have been held by another thread when forking
+    _archives_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_archives)
+
+
+def open_archive(archive):
+    """Open an archive, or get it from the archives already opened in this
+    process.
+
+    Parameters
+    ----------
+    archive : str
+        The archive file name (and path).
+
+    Returns
+    -------
+    Pack, ZipArchive or TarArchive
+        The opened archive.
+    """
+    key = os.path.abspath(archive)
+    with _archives_lock:
+        if key not in _archives:
+            extension = archive.lower()
+            if extension.endswith(".zip"):
+                _archives[key] = ZipArchive(archive)
+            elif extension.endswith(tar_extensions):
+                _archives[key] = TarArchive(archive)
+            else:
+                _archives[key] = Pack(archive)
+        return _archives[key]
+
+
+def close_archives():
+    """Close and forget all archives opened in this process, so they are
+    opened again the next time they are needed (e.g., if they have been
+    rewritten by another process), and free the memory used by compressed tar
+    archives.
+    """
+    with _archives_lock:
+        for opened in _archives.values():
+            opened.close()
+        _archives.clear()
+
+
+def member_exists(archive, member):
+    """Determine whether a member exists in an archive."""
+    try:
+        return member in open_archive(archive)
+    except (OSError, ValueError, zipfile.BadZipFile, tarfile.TarError):
+        return False
+
+
+def file_exists(file_name):
+    """Determine whether a titration file exists, either on disk or inside an
+    archive.
+    """
+    archive, member = split_archive_path(file_name)
+    if archive is None:
+        return os.path.isfile(file_name)
+    return member_exists(archive, member)
+
+
+def member_fingerprint(archive, member, method="stat"):
+    """Fingerprint one member of an archive (see
+    `calk.fingerprint.file_fingerprint`).
+
+    With `method="stat"`, the archive's size and modification time are used
+    together with the member name.  With `method="hash"`, the member's
+    contents (or, for packs, its data) are hashed.
+    """
+    try:
+        if method == "stat":
+            st = os.stat(archive)
+            return f"{st.st_size}:{st.st_mtime_ns}:{member}"
+        else:
+            return open_archive(archive).digest(member)
+    except (OSError, ValueError, zipfile.BadZipFile, tarfile.TarError):
+        return "missing"
@@ -0,0 +1,273 @@
+# Calkulate: seawater total alkalinity from titration data
+# Copyright (C) 2019--2025  Matthew P. Humphreys  (GNU GPLv3)
+"""Cache parsed titration data on disk so that files are only parsed once.
+
+The cache is opt-in: pass `dat_cache` (a directory, or a `DatCache`) to
+`read_dat`, or as a kwarg to `calibrate`, `solve` etc.  Each entry holds the
+arrays returned by the reader for one file, saved as an uncompressed .npz, and
+is named by a SHA-256 key of
+  * the file's absolute path, size and modification time (`method="stat"`,
+    the default) or the file's contents (`method="hash"`, so identical files
+    share one entry wherever they are),
+  * the `file_type` and any other kwargs for the reader, and
+  * the cache format and Calkulate versions.
+
+Entries are written under a temporary name and then renamed, so several
+processes can share one cache directory without locks: a reader only ever sees
+complete entries, and an entry that disappears (e.g., evicted by another
+process) just counts as a miss.  When the total size of the entries grows
+beyond `max_size`, the least recently used entries are deleted.
+"""
+
+import hashlib
+import json
+import os
+import uuid
+import zipfile
+
+import numpy as np
+
+from ..meta import __version__
+
+
+cache_version = 2
+cache_methods = {"stat", "hash"}
+
+
+def _numeric_arrays(dat_data):
+    """Convert the arrays returned by a reader into arrays that can be saved
+    in a cache entry and loaded again without pickling, or return `None` if
+    that is not possible.
+    """
+    arrays = []
+    for a in dat_data:
+        a = np.asarray(a)
+        if a.dtype == object:
+            try:
+                a = a.astype(float)
+            except (TypeError, ValueError):
+                return None
+        if a.dtype.hasobject:
+            return None
+        arrays.append(a)
+    return arrays
+
+
+class DatCache:
+    """
+    calkulate.read.cache.DatCache
+    =============================
+    An on-disk cache of parsed titration data.
+
+    Parameters
+    ----------
+    cache_path : str
+        The directory to keep the cache in, which is created if it does not
+        exist.  It can be shared by several processes.
+    max_size : int, optional
+        The maximum total size of the cache entries in bytes, by default 1 GiB.
+    method : str, optional
+        How to identify files, either "stat" (default; uses path, size and
+        modification time) or "hash" (uses file contents).
+
+    Attributes
+    ----------
+    hits, misses : int
+        How many reads from this `DatCache` found and did not find an entry.
+
+    Methods
+    -------
+    read
+        Read a titration file through the cache.
+    evict
+        Delete the least recently used entries until the cache is small
+        enough.
+    clear
+        Delete all entries.
+    """
+
+    def __init__(self, cache_path, max_size=2**30, method="stat"):
+        assert method in cache_methods, (
+            f"method must be one of {cache_methods}."
+        )
+        self.cache_path = cache_path
+        self.max_size = max_size
+        self.method = method
+        self.hits = 0
+        self.misses = 0
+        # Estimated total size of the entries, updated as entries are written
+        # by this process and checked properly only when it gets too big
+        self._size = None
+        os.makedirs(cache_path, exist_ok=True)
+
+    def __repr__(self):
+        return f"DatCache({self.cache_path!r}, max_size={self.max_size})"
+
+    def key(self, file_name, file_type, kwargs):
+        """Get the cache key for reading a file with a given reader and
+        kwargs.
+        """
+        if self.method == "stat":
+            st = os.stat(file_name)
+            source = [os.path.abspath(file_name), st.st_size, st.st_mtime_ns]
+        else:
+            h = hashlib.sha256()
+            with open(file_name, "rb") as f:
+                for chunk in iter(lambda: f.read(2**20), b""):
+                    h.update(chunk)
+            source = h.hexdigest()
+        content = {
+            "cache_version": cache_version,
+            "version": __version__,
+            "source": source,
+            "file_type": file_type,
+            "kwargs": kwargs,
+        }
+        return hashlib.sha256(
+            json.dumps(content, sort_keys=True, default=repr).encode("utf-8")
+        ).hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.cache_path, key[:2], f"{key}.npz")
+
+    def _load(self, entry):
+        """Load an entry, or return `None` if it is missing or damaged."""
+        try:
+            with np.load(entry) as npz:
+                arrays = [npz[f"a{i}"] for i in range(len(npz.files) - 1)]
+                dat_type = str(npz["dat_type"])
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return None
+        try:
+            # Mark as recently used, for eviction
+            os.utime(entry)
+        except OSError:
+            pass
+        return arrays, dat_type
+
+    def _save(self, entry, arrays, dat_type):
+        """Save an entry atomically."""
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        tmp = f"{entry}.tmp-{uuid.uuid4().hex}"
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                dat_type=dat_type,
+                **{f"a{i}": a for i, a in enumerate(arrays)},
+            )
+        size = os.path.getsize(tmp)
+        os.replace(tmp, entry)
+        if self._size is None:
+            self._size = self.size()
+        else:
+            self._size += size
+        if self._size > self.max_size:
+            self.evict()
+
+    def read(self, reader, file_name, file_type, **kwargs):
+        """Read a titration file through the cache.
+
+        Parameters
+        ----------
+        reader : callable
+            The function that reads the file, called as
+            `reader(file_name, **kwargs)` if there is no cache entry.
+        file_name : str
+            The file name (and path).
+        file_type : str
+            The name of the reader, which is part of the cache key.
+        kwargs
+            Any kwargs for the reader, which are part of the cache key.
+
+        Returns
+        -------
+        DatData, OrgAlkData or tuple
+            Whatever `reader` returns.  Object arrays (e.g., from a
+            spreadsheet) are cached as floats, and results that cannot be
+            converted to numbers are not cached at all.
+        """
+        from .titrations import DatData
+        from .workbooks import OrgAlkData
+
+        dat_types = {"DatData": DatData, "OrgAlkData": OrgAlkData}
+        entry = self._entry(self.key(file_name, file_type, kwargs))
+        loaded = self._load(entry)
+        if loaded is not None:
+            self.hits += 1
+            arrays, dat_type = loaded
+            if dat_type in dat_types:
+                return dat_types[dat_type](*arrays)
+            return tuple(arrays)
+        self.misses += 1
+        dat_data = reader(file_name, **kwargs)
+        arrays = _numeric_arrays(dat_data)
+        if arrays is not None:
+            self._save(entry, arrays, type(dat_data).__name__)
+        return dat_data
+
+    def _entries(self):
+        """List all entries with their last-used times and sizes."""
+        entries = []
+        for dirpath, _, filenames in os.walk(self.cache_path):
+            for filename in filenames:
+                if filename.endswith(".npz"):
+                    fname = os.path.join(dirpath, filename)
+                    try:
+                        st = os.stat(fname)
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime_ns, st.st_size, fname))
+        return entries
+
+    def size(self):
+        """Get the total size of the entries in bytes."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, max_size=None):
+        """Delete the least recently used entries until the total size of the
+        cache is at most `max_size` (by default, `self.max_size`).
+        """
+        if max_size is None:
+            max_size = self.max_size
+        entries = sorted(self._entries())
+        size = sum(size for _, size, _ in entries)
+        for _, entry_size, fname in entries:
+            if size <= max_size:
+                break
+            try:
+                os.remove(fname)
+            except OSError:
+                # Another process got there first
+                pass
+            size -= entry_size
+        self._size = size
+
+    def clear(self):
+        """Delete all entries."""
+        self.evict(max_size=0)
+
+
+# DatCaches used in this process, keyed by absolute path
+_caches = {}
+
+
+def get_cache(dat_cache):
+    """Get a `DatCache` from a `dat_cache` kwarg.
+
+    Parameters
+    ----------
+    dat_cache : str or DatCache
+        The `DatCache`, or the directory of one.  The same `DatCache` is
+        reused for each directory within a process.
+
+    Returns
+    -------
+    DatCache
+        The cache.
+    """
+    if isinstance(dat_cache, DatCache):
+        return dat_cache
+    key = os.path.abspath(dat_cache)
+    if key not in _caches:
+        _caches[key] = DatCache(dat_cache)
+    return _caches[key]
@@ -1,7 +1,12 @@
+import glob
+from concurrent.futures import ThreadPoolExecutor
+from string import Formatter
+
 import matplotlib.dates as mdates
 import numpy as np
 import pandas as pd
 
+from .. import dataset
 from ..classes import Dataset
 
 
@@ -53,6 +58,64 @@ def dbs_datetime(dbs_row):
     )
 
 
+def dbs_datetimes(dbs):
+    """Convert the date and time columns from a .dbs file into datetimes, for
+    all rows at once (see `dbs_datetime` for one row).
+    """
+    date, time = dbs["date"], dbs["time"]
+    analysis_datetime = pd.Series(pd.NaT, index=dbs.index, dtype="<M8[s]")
+    # Non-string values (e.g., all dates missing) give NaT
+    if pd.api.types.is_string_dtype(date):
+        has_date = date.notnull().to_numpy()
+    else:
+        has_date = np.zeros(len(date), dtype=bool)
+    if has_date.any():
+        dspl = date[has_date].str.split("/", expand=True)
+        analysis_datetime[has_date] = pd.to_datetime(
+            "20"
+            + dspl[2]
+            + "-"
+            + dspl[0]
+            + "-"
+            + dspl[1]
+            + "T"
+            + time[has_date],
+            format="ISO8601",
+        ).astype("<M8[s]")
+    return analysis_datetime
+
+
+def format_columns(str_format, columns):
+    """Apply a format string to whole columns at once, like
+    `str_format.format(**row)` for every row.
+
+    Parameters
+    ----------
+    str_format : str
+        The format string.
+    columns : dict of pandas.Series
+        The values for each field in `str_format`, all with the same index.
+
+    Returns
+    -------
+    pandas.Series
+        The formatted strings.
+    """
+    formatted = None
+    for literal, field, spec, conversion in Formatter().parse(str_format):
+        piece = pd.Series(literal, index=next(iter(columns.values())).index)
+        if field is not None:
+            field_format = (
+                "{"
+                + ("!" + conversion if conversion else "")
+                + (":" + spec if spec else "")
+                + "}"
+            )
+            piece = piece + columns[field].map(field_format.format)
+        formatted = piece if formatted is None else formatted + piece
+    return formatted
+
+
 def get_VINDTA_filenames(dbs, filename_format="{s}-{c}  {n}  ({d}){b}.dat"):
     """Determine VINDTA filenames, assuming defaults were used, based on the
     dbs.
@@ -60,20 +123,26 @@ def get_VINDTA_filenames(dbs, filename_format="{s}-{c}  {n}  ({d}){b}.dat"):
     dbs["file_name"] = ""
     if "file_good" not in dbs:
         dbs["file_good"] = True
-    for i, row in dbs.iterrows():
-        if row.run_type == "bottle":
-            dbs.loc[i, "file_name"] = filename_format.format(
-                s=int(row.station),
-                c=int(row.cast),
-                n=int(row.niskin),
-                d=int(row.depth),
-                b=row.bottle,
-            )
-        elif row.run_type == "CRM":
-            dbs.loc[i, "file_name"] = f"CRM{row.batch}{row.bottle}.dat"
-            dbs.loc[i, "alkalinity_certified"] = row["cert. CRM AT"]
-        else:
-            dbs.loc[i, "file_good"] = False
+    bottle = (dbs.run_type == "bottle").to_numpy(dtype=bool)
+    crm = (dbs.run_type == "CRM").to_numpy(dtype=bool)
+    if bottle.any():
+        dbs.loc[bottle, "file_name"] = format_columns(
+            filename_format,
+            {
+                "s": dbs.station[bottle].astype(int),
+                "c": dbs.cast[bottle].astype(int),
+                "n": dbs.niskin[bottle].astype(int),
+                "d": dbs.depth[bottle].astype(int),
+                "b": dbs.bottle[bottle],
+            },
+        )
+    if crm.any():
+        dbs.loc[crm, "file_name"] = format_columns(
+            "CRM{batch}{bottle}.dat",
+            {"batch": dbs.batch[crm], "bottle": dbs.bottle[crm]},
+        )
+        dbs.loc[crm, "alkalinity_certified"] = dbs.loc[crm, "cert. CRM AT"]
+    dbs.loc[~(bottle | crm), "file_good"] = False
     return dbs
 
 
@@ -83,6 +152,7 @@ def read_dbs(
     analyte_mass=None,
     file_path=None,
     filename_format="{s}-{c}  {n}  ({d}){b}.dat",
+    resolve_files=False,
 ):
     """Import one .dbs file from a VINDTA as single DataFrame.
 
@@ -106,6 +176,11 @@ def read_dbs(
             d for depth
             b for bottle
         By default "{s}-{c}  {n}  ({d}){b}.dat".
+    resolve_files : bool, optional
+        Whether to look for the .dat files in `file_path` straight away with
+        `calk.dataset.resolve_files`, correcting small differences between
+        the real file names and those from `filename_format`, and setting
+        `file_good` to `False` for any that are missing; by default `False`.
 
     Returns
     -------
@@ -113,11 +188,47 @@ def read_dbs(
         The imported .dbs file ready to use with Calkulate.
     """
     headers = np.genfromtxt(fname, delimiter="\t", dtype=str, max_rows=1)
-    dbs = pd.read_table(
-        fname, header=0, names=headers, usecols=headers
-    ).rename(columns={"run type": "run_type"})
+    dbs = pd.read_table(fname, header=0, names=headers, usecols=headers)
+    return prepare_dbs(
+        dbs,
+        fname,
+        analyte_volume=analyte_volume,
+        analyte_mass=analyte_mass,
+        file_path=file_path,
+        filename_format=filename_format,
+        resolve_files=resolve_files,
+    )
+
+
+def prepare_dbs(
+    dbs,
+    fname,
+    analyte_volume=100.0,
+    analyte_mass=None,
+    file_path=None,
+    filename_format="{s}-{c}  {n}  ({d}){b}.dat",
+    resolve_files=False,
+):
+    """Prepare the table parsed from (some rows of) a .dbs file for use with
+    Calkulate, as in `read_dbs`.
+
+    Parameters
+    ----------
+    dbs : pd.DataFrame
+        The rows of the .dbs file, with its headers as the column names.
+    fname : str
+        The .dbs file name and the path to it.
+    analyte_volume, analyte_mass, file_path, filename_format, resolve_files
+        As for `read_dbs`.
+
+    Returns
+    -------
+    pd.DataFrame
+        The rows ready to use with Calkulate.
+    """
+    dbs = dbs.rename(columns={"run type": "run_type"})
     dbs["dbs_fname"] = fname
-    dbs = add_func_cols(dbs, dbs_datetime)
+    dbs["analysis_datetime"] = dbs_datetimes(dbs)
     dbs["analysis_datenum"] = mdates.date2num(dbs.analysis_datetime)
     dbs = get_VINDTA_filenames(dbs, filename_format=filename_format)
     if analyte_mass is None:
@@ -127,4 +238,82 @@ def read_dbs(
     if file_path is not None:
         assert isinstance(file_path, str), "file_path must be a string."
         dbs["file_path"] = file_path
+    dbs = Dataset(dbs)
+    if resolve_files:
+        dataset.resolve_files(dbs)
+    return dbs
+
+
+def read_dbs_many(
+    dbs_fnames,
+    file_path=None,
+    executor=None,
+    drop_duplicates=True,
+    duplicate_columns=("file_name", "analysis_datetime"),
+    **read_dbs_kwargs,
+):
+    """Import several .dbs files from a VINDTA concurrently and combine them
+    into a single DataFrame.
+
+    Parameters
+    ----------
+    dbs_fnames : str or list of str
+        The .dbs file names and the paths to them, either as a list or as a
+        glob pattern (e.g., "cruise/leg*/*.dbs").
+    file_path : str or dict, optional
+        The path to the .dat files, either the same for every .dbs file or
+        as a dict with a path for each of `dbs_fnames`, by default `None`.
+    executor : concurrent.futures.Executor, optional
+        Where to run `read_dbs` for each file, by default `None`, i.e. a
+        thread pool.
+    drop_duplicates : bool, optional
+        Whether to drop titrations that appear in more than one .dbs file
+        (e.g., if each .dbs file is a copy of the previous one with more
+        runs added), keeping the first, by default `True`.
+    duplicate_columns : tuple of str, optional
+        The columns that must all be the same for two rows to be
+        duplicates, by default `("file_name", "analysis_datetime")`.  Rows
+        with any of these missing or empty are always kept.
+    read_dbs_kwargs
+        Any other kwargs for `read_dbs`.
+
+    Returns
+    -------
+    calk.Dataset
+        The imported .dbs files in the order of `dbs_fnames`, with a new
+        index, and with the same columns for every row.  The `dbs_fname`
+        column says which .dbs file each row came from.
+    """
+    if isinstance(dbs_fnames, str):
+        dbs_fnames = sorted(glob.glob(dbs_fnames, recursive=True))
+    assert len(dbs_fnames) > 0, "No .dbs files found!"
+    if not isinstance(file_path, dict):
+        file_path = {dbs_fname: file_path for dbs_fname in dbs_fnames}
+
+    def submit(executor):
+        return [
+            executor.submit(
+                read_dbs,
+                dbs_fname,
+                file_path=file_path.get(dbs_fname),
+                **read_dbs_kwargs,
+            )
+            for dbs_fname in dbs_fnames
+        ]
+
+    if executor is None:
+        with ThreadPoolExecutor() as pool:
+            futures = submit(pool)
+    else:
+        futures = submit(executor)
+    dbs = pd.concat(
+        [pd.DataFrame(future.result()) for future in futures],
+        ignore_index=True,
+    )
+    if drop_duplicates:
+        # Rows with any key missing (e.g., blank rows) are never duplicates
+        keys = dbs[list(duplicate_columns)]
+        has_keys = (keys.notnull() & (keys != "")).all(axis=1)
+        dbs = dbs[~(dbs.duplicated(subset=list(duplicate_columns)) & has_keys)]
+        dbs = dbs.reset_index(drop=True)
     return Dataset(dbs)
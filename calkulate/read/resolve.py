@@ -0,0 +1,97 @@
+# Calkulate: seawater total alkalinity from titration data
+# Copyright (C) 2019--2025  Matthew P. Humphreys  (GNU GPLv3)
+"""Find titration files by listing each directory once.
+
+Checking whether each titration file exists one at a time can be slow on
+network drives, and file names that are generated from metadata (e.g., by
+`read_dbs`) don't always match the real file names exactly.  A `FileIndex`
+lists a directory (or the members of an archive, see `calk.read.archives`)
+once, and then finds each file name in memory, first exactly and then after
+normalising whitespace and case.
+"""
+
+import os
+
+from . import archives
+
+
+def normalise_name(file_name):
+    """Normalise a file name for approximate matching, by collapsing all runs
+    of whitespace into single spaces, removing whitespace from around the
+    extension (e.g., from a `bottle` value with a trailing space) and ignoring
+    case.
+    """
+    stem, extension = os.path.splitext(file_name)
+    return (" ".join(stem.split()) + extension.strip()).casefold()
+
+
+class FileIndex:
+    """
+    calkulate.read.resolve.FileIndex
+    ================================
+    The titration files in one directory or archive.
+
+    Parameters
+    ----------
+    file_path : str
+        The directory, or the path to a directory inside an archive.  An
+        empty string means the current working directory.
+
+    Methods
+    -------
+    resolve
+        Find the real name of a titration file.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        archive, prefix = archives.split_archive_path(
+            os.path.join(file_path, "")
+        )
+        try:
+            if archive is None:
+                with os.scandir(file_path or ".") as entries:
+                    names = [e.name for e in entries if e.is_file()]
+            else:
+                opened = archives.open_archive(archive)
+                if prefix == "":
+                    names = [m for m in opened if "/" not in m]
+                else:
+                    names = [
+                        m[len(prefix) + 1 :]
+                        for m in opened
+                        if m.startswith(prefix + "/")
+                        and "/" not in m[len(prefix) + 1 :]
+                    ]
+        except (OSError, ValueError):
+            names = []
+        self.names = set(names)
+        self.normalised = {}
+        for name in names:
+            self.normalised.setdefault(normalise_name(name), []).append(name)
+
+    def resolve(self, file_name):
+        """Find the real name of a titration file.
+
+        Parameters
+        ----------
+        file_name : str
+            The file name to look for.
+
+        Returns
+        -------
+        str or None
+            The real file name, or `None` if it is not found, or if several
+            files match it after normalising.
+        """
+        if file_name in self.names:
+            return file_name
+        if "/" in file_name or os.sep in file_name:
+            # In a subdirectory, so not indexed
+            if archives.file_exists(os.path.join(self.file_path, file_name)):
+                return file_name
+            return None
+        matches = self.normalised.get(normalise_name(file_name), [])
+        if len(matches) == 1:
+            return matches[0]
+        return None
@@ -2,19 +2,34 @@
 # Copyright (C) 2019--2025  Matthew P. Humphreys  (GNU GPLv3)
 """Import data for Calkulate and export its results."""
 
+import io
 import re
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from warnings import warn
 
 import numpy as np
 import pandas as pd
 
+from . import archives, cache, workbooks
+
 
 DatData = namedtuple(
     "DatData", ("titrant_amount", "measurement", "temperature")
 )
 
 
+def _open_binary(file_name):
+    """Open a file name, or rewind an already-open binary file (e.g., a
+    member of an archive), for reading bytes.
+    """
+    if hasattr(file_name, "read"):
+        file_name.seek(0)
+        return nullcontext(file_name)
+    return open(file_name, "rb")
+
+
 def read_dat_genfromtxt(
     file_name,
     col_titrant_amount=0,
@@ -24,13 +39,45 @@ def read_dat_genfromtxt(
     skip_header=2,
     **kwargs,
 ):
-    """Import a titration dataset from a .dat file with numpy.genfromtxt."""
-    data = np.genfromtxt(
-        file_name, delimiter=delimiter, skip_header=skip_header, **kwargs
-    )
-    titrant_amount = data[:, col_titrant_amount]
-    measurement = data[:, col_measurement]
-    temperature = data[:, col_temperature]
+    """Import a titration dataset from a .dat file.
+
+    Only the three columns that are needed are parsed, with the fast
+    `numpy.loadtxt`.  If that fails (e.g., because some values are missing),
+    or if the file contains no data, or if any `kwargs` for `numpy.genfromtxt`
+    are provided, the file is parsed with `numpy.genfromtxt` instead, so that
+    missing and invalid values become NaN.
+    """
+    cols = [col_titrant_amount, col_measurement, col_temperature]
+    data = None
+    if len(kwargs) == 0:
+        with _open_binary(file_name) as f:
+            lines = f.read().split(b"\n", skip_header)
+        # Header lines may not be valid UTF-8, but the data should be ASCII
+        body = lines[-1].decode("latin-1") if len(lines) > skip_header else ""
+        if body.strip():
+            usecols = sorted(set(cols))
+            try:
+                data = np.loadtxt(
+                    io.StringIO(body, newline=None),
+                    delimiter=delimiter,
+                    usecols=usecols,
+                )
+                cols = [usecols.index(c) for c in cols]
+            except ValueError:
+                data = None
+    if data is None:
+        if hasattr(file_name, "read"):
+            file_name.seek(0)
+        data = np.genfromtxt(
+            file_name, delimiter=delimiter, skip_header=skip_header, **kwargs
+        )
+    if np.size(data) == 0:
+        raise ValueError(f"no titration data found in {file_name}")
+    # A single line of data is read as a 1-D array
+    data = np.atleast_2d(data)
+    titrant_amount = data[:, cols[0]]
+    measurement = data[:, cols[1]]
+    temperature = data[:, cols[2]]
     return DatData(titrant_amount, measurement, temperature)
 
 
@@ -41,41 +88,53 @@ def read_dat_pclims(
     col_temperature=5,
     n_cols=6,
 ):
-    """Import a titration dataset from a PC LIMS Report."""
-    # Import full data file
-    with open(file_name, mode="r", encoding="unicode-escape") as f:
-        data_full = f.read().splitlines()
-    # Select only the lines containing the titration data
-    re_data = re.compile(r"[\d\.]*" + r"\t[\d\.]*" * (n_cols - 1))
-    data = []
-    i = 0
-    stop = False
-    found_any = False
-    while not stop and i < len(data_full):
-        line = data_full[i]
-        if re_data.match(line):
-            found_any = True
-            data.append(line.split("\t"))
-        else:
-            if found_any:
-                stop = True
-        i += 1
-    # Convert data to float arrays
-    data = np.array(data, dtype="float64")
-    titrant_amount = data[:, col_titrant_amount]
-    measurement = data[:, col_measurement]
-    temperature = data[:, col_temperature]
+    """Import a titration dataset from a PC LIMS Report.
+
+    The file is read as bytes one line at a time, only until the end of the
+    first block of titration data, and the values are parsed straight into a
+    preallocated array, so the whole report is never held in memory.
+    """
+    # Lines containing the titration data
+    re_data = re.compile(rb"[\d\.]*" + rb"\t[\d\.]*" * (n_cols - 1))
+    cols = (col_titrant_amount, col_measurement, col_temperature)
+    data = np.empty((64, len(cols)))
+    n_rows = 0
+    with _open_binary(file_name) as f:
+        for line in f:
+            if re_data.match(line):
+                if n_rows == len(data):
+                    data = np.concatenate([data, np.empty_like(data)])
+                values = line.rstrip(b"\r\n").split(b"\t")
+                data[n_rows] = [float(values[c]) for c in cols]
+                n_rows += 1
+            elif n_rows > 0:
+                break
+    if n_rows == 0:
+        raise ValueError(f"No titration data found in {file_name}")
+    titrant_amount = data[:n_rows, 0].copy()
+    measurement = data[:n_rows, 1].copy()
+    temperature = data[:n_rows, 2].copy()
     return DatData(titrant_amount, measurement, temperature)
 
 
-def read_dat_orgalk_excel(file_name):
+def read_dat_orgalk_excel(file_name, sheet_name=0, sidecar=False):
     """Import a titration dataset from an Excel file formatted for the NIOZ
     organic alkalinity project.
 
+    The whole workbook is parsed and kept in memory, so reading the other
+    sheets of the same workbook afterwards does not open it again (see
+    `calk.read.workbooks`).
+
     Parameters
     ----------
     file_name : str
         The file name (and path).
+    sheet_name : int or str, optional
+        The sheet to read, either its name or its position among all of the
+        sheets in the workbook, by default 0 (the first sheet).
+    sidecar : bool, optional
+        Whether to read from and save to a sidecar file next to the workbook
+        (see `calk.read.workbooks`), by default `False`.
 
     Returns
     -------
@@ -88,24 +147,24 @@ def read_dat_orgalk_excel(file_name):
     temperature : array-like
         The temperature at each titration step (should be in °C).
     """
-    data = pd.read_excel(file_name, skiprows=1)
-    return (
-        data.acid.to_numpy(),
-        data.base.to_numpy(),
-        data.emf.to_numpy(),
-        data.temperature.to_numpy(),
+    return workbooks.read_orgalk_sheet(
+        file_name, sheet_name=sheet_name, sidecar=sidecar
     )
 
 
 def _read_tiamo_de_df(file_name, encoding="unicode_escape"):
-    with open(file_name, "r", encoding=encoding) as f:
-        data = f.read().splitlines()
-    gran_line = data.index("Gran.1")
-    volume_start = float(data[gran_line - 3].split(";")[2])
+    # Read the file only once: find the "Gran.1" marker and the start volume
+    # in the text, then parse the numeric block that follows from memory
+    with _open_binary(file_name) as f:
+        # Decode like open(..., "r"), which converts all newlines to "\n"
+        text = io.TextIOWrapper(f, encoding=encoding).read()
+    marker = "\nGran.1\n"
+    gran_start = text.find(marker)
+    if gran_start == -1:
+        raise ValueError(f'"Gran.1" not found in {file_name}')
+    volume_start = float(text[:gran_start].rsplit("\n", 3)[-3].split(";")[2])
     data = pd.read_csv(
-        file_name,
-        skiprows=gran_line + 1,
-        encoding=encoding,
+        io.StringIO(text[gran_start + len(marker) :]),
         sep=";",
     ).rename(
         columns={
@@ -160,23 +219,76 @@ keys_read_dat = {
     "col_measurement",
     "col_temperature",
     "col_titrant_amount",
+    "dat_cache",
     "delimiter",
     "encoding",
     "file_type",
     "n_cols",
+    "sheet_name",
+    "sidecar",
     "skip_header",
 }
 
 
-def read_dat(file_name, file_type="genfromtxt", **kwargs):
-    """Import a titration dataset from a .dat file."""
+def read_dat(file_name, file_type="genfromtxt", dat_cache=None, **kwargs):
+    """Import a titration dataset from a .dat file.
+
+    If `file_name` is inside an archive (see `calk.read.archives`), then the
+    titration data are read from the archive instead.  Pack files contain data
+    that have already been parsed, so `file_type` and any other `kwargs` are
+    ignored for them.  Members of zip and tar archives are parsed with
+    `file_type` as usual.
+
+    If `dat_cache` is provided (a directory or a `calk.read.cache.DatCache`),
+    the parsed data are saved there and reused the next time the same file is
+    read with the same `file_type` and `kwargs`.
+    """
+    archive, member = archives.split_archive_path(file_name)
+    if archive is not None:
+        opened = archives.open_archive(archive)
+        if isinstance(opened, archives.Pack):
+            return DatData(*opened.read(member))
+        # Members of zip and tar archives are parsed from memory, and not
+        # cached, because they have no file on disk to fingerprint
+        file_name = opened.open(member)
+        dat_cache = None
     if file_type not in file_types:
         file_type = "genfromtxt"
         warn(f"method '{file_type}' not recognised, trying 'genfromtxt'.")
+    if dat_cache is not None:
+        return cache.get_cache(dat_cache).read(
+            file_types[file_type], file_name, file_type, **kwargs
+        )
     dat_data = file_types[file_type](file_name, **kwargs)
     return dat_data
 
 
+# Format specs that mean the same with str.format and the % operator, i.e.
+# [sign][#][0][width][.precision]type for floats
+re_percent_fmt = re.compile(r"^[+ ]?#?0?\d*(\.\d+)?[eEfFgG]$")
+
+
+def _format_dat(titrant_amount, measurement, temperature, fmts):
+    """Format the titration data lines for `write_dat` for all points at
+    once.
+    """
+    columns = [
+        np.ravel(titrant_amount),
+        np.ravel(measurement),
+        np.ravel(temperature),
+    ]
+    # Like zip, stop at the end of the shortest column
+    n = min(len(c) for c in columns)
+    if all(re_percent_fmt.match(fmt) for fmt in fmts):
+        # One % operation for the whole file is much faster than formatting
+        # each line separately
+        line = "\t".join("%" + fmt for fmt in fmts) + "\n"
+        values = np.column_stack([c[:n] for c in columns]).astype(float)
+        return (line * n) % tuple(values.ravel().tolist())
+    line = "\t".join("{:" + fmt + "}" for fmt in fmts) + "\n"
+    return "".join(map(line.format, *(c[:n].tolist() for c in columns)))
+
+
 def write_dat(
     filepath,
     titrant_amount,
@@ -190,24 +302,53 @@ def write_dat(
     temperature_fmt=".3f",
     **open_kwargs,
 ):
-    """Write titration data to a text file."""
+    """Write titration data to a text file.
+
+    The data are formatted for all points at once and written in one go.
+    """
+    text = _format_dat(
+        titrant_amount,
+        measurement,
+        temperature,
+        (titrant_amount_fmt, measurement_fmt, temperature_fmt),
+    )
     with open(filepath, mode=mode, **open_kwargs) as f:
         f.write("{}\n{}\n".format(line0, line1))
-        for titrant_amount_i, measurement_i, temperature_i in zip(
-            titrant_amount, measurement, temperature
-        ):
-            f.write(
-                (
-                    "{:"
-                    + titrant_amount_fmt
-                    + "}\t{:"
-                    + measurement_fmt
-                    + "}\t{:"
-                    + temperature_fmt
-                    + "}\n"
-                ).format(
-                    titrant_amount_i,
-                    measurement_i,
-                    temperature_i,
-                )
-            )
+        f.write(text)
+
+
+def write_dat_many(titrations, executor=None, **kwargs):
+    """Write many titrations to separate text files concurrently.
+
+    Parameters
+    ----------
+    titrations : dict
+        The titration data to write to each file name (and path), as
+        `DatData` or a tuple of `(titrant_amount, measurement, temperature)`.
+    executor : concurrent.futures.Executor, optional
+        Where to run `write_dat` for each file, by default `None`, i.e. a
+        thread pool.
+    kwargs
+        Any other kwargs for `write_dat` (e.g., `line0`, `mode` or the
+        `*_fmt` formats), which are the same for every file.
+
+    Returns
+    -------
+    list of str
+        The file names that were written.
+    """
+
+    def submit(executor):
+        return [
+            executor.submit(write_dat, filepath, *dat_data, **kwargs)
+            for filepath, dat_data in titrations.items()
+        ]
+
+    if executor is None:
+        with ThreadPoolExecutor() as pool:
+            futures = submit(pool)
+    else:
+        futures = submit(executor)
+    for future in futures:
+        future.result()
+    return list(titrations)
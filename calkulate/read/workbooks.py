@@ -0,0 +1,267 @@
+# Calkulate: seawater total alkalinity from titration data
+# Copyright (C) 2019--2025  Matthew P. Humphreys  (GNU GPLv3)
+"""Read many titrations from Excel workbooks formatted for the NIOZ organic
+alkalinity project, with one titration on each sheet.
+
+Opening a workbook is much slower than parsing the data in it, so every sheet
+is read from one opening of the workbook.  With `sidecar=True`, the parsed
+data are also saved next to the workbook in a binary "sidecar" file
+(`<workbook>.calk.npz`) and read from there next time, until the workbook
+changes (i.e., its size or modification time).
+
+The parsed data from the most recently used workbooks are also kept in memory,
+so reading one titration after another from the same workbook (e.g., with
+`read_dat` and `file_type="orgalk_excel"` for each row of a dataset) only
+opens it once per process.
+"""
+
+import json
+import os
+import uuid
+import zipfile
+from collections import namedtuple
+from functools import lru_cache
+from warnings import warn
+
+import numpy as np
+import pandas as pd
+
+
+orgalk_columns = ("acid", "base", "emf", "temperature")
+# How many parsed workbooks to keep in memory
+workbooks_kept = 8
+
+
+class OrgAlkData(
+    namedtuple(
+        "OrgAlkData", ("acid_amount", "base_amount", "emf", "temperature")
+    )
+):
+    """The titration data from one sheet of an orgalk_excel workbook.
+
+    For titrations with acid only, `titrant_amount` and `measurement` (the
+    acid amount and EMF) mean that they can be calibrated and solved in the
+    same way as `DatData`.
+    """
+
+    __slots__ = ()
+
+    @property
+    def titrant_amount(self):
+        return self.acid_amount
+
+    @property
+    def measurement(self):
+        return self.emf
+
+
+def sidecar_fname(file_name):
+    """Get the sidecar file name for a workbook."""
+    return f"{file_name}.calk.npz"
+
+
+def _workbook_stat(file_name):
+    st = os.stat(file_name)
+    return np.array([st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+
+def _read_sidecar(file_name):
+    """Read the names of all sheets and the titrations from a workbook's
+    sidecar file, or return `None` if there is no sidecar or it is out of
+    date.
+    """
+    try:
+        with np.load(sidecar_fname(file_name)) as npz:
+            if not np.array_equal(npz["stat"], _workbook_stat(file_name)):
+                return None
+            sheet_names = json.loads(str(npz["sheet_names"]))
+            all_sheet_names = json.loads(str(npz["all_sheet_names"]))
+            return all_sheet_names, {
+                sheet_name: OrgAlkData(
+                    *(npz[f"{i}_{c}"] for c in orgalk_columns)
+                )
+                for i, sheet_name in enumerate(sheet_names)
+            }
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return None
+
+
+def _write_sidecar(file_name, all_sheet_names, titrations, stat):
+    """Save parsed titrations to a workbook's sidecar file atomically.
+
+    The arrays are saved as floats, so that they can be loaded again without
+    pickling.  If they cannot all be converted to floats, or the sidecar
+    cannot be written, no sidecar is saved and a warning is given instead.
+    """
+    try:
+        arrays = {
+            f"{i}_{c}": np.asarray(a, dtype=float)
+            for i, dat_data in enumerate(titrations.values())
+            for c, a in zip(orgalk_columns, dat_data)
+        }
+    except (TypeError, ValueError):
+        warn(
+            f"non-numeric titration data, so no sidecar saved for {file_name}"
+        )
+        return
+    fname = sidecar_fname(file_name)
+    tmp = f"{fname}.tmp-{uuid.uuid4().hex}"
+    try:
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                stat=stat,
+                sheet_names=json.dumps([str(s) for s in titrations]),
+                all_sheet_names=json.dumps([str(s) for s in all_sheet_names]),
+                **arrays,
+            )
+        os.replace(tmp, fname)
+    except OSError as e:
+        warn(f"could not save sidecar for {file_name} ({e})")
+        if os.path.isfile(tmp):
+            os.remove(tmp)
+
+
+def _parse_workbook(file_name, sidecar=False):
+    """Read the names of all sheets and the titrations from a workbook (or
+    its sidecar).
+    """
+    parsed = _read_sidecar(file_name) if sidecar else None
+    if parsed is None:
+        stat = _workbook_stat(file_name) if sidecar else None
+        sheets = pd.read_excel(file_name, sheet_name=None, skiprows=1)
+        titrations = {}
+        skipped = []
+        for sheet_name, data in sheets.items():
+            if all(c in data for c in orgalk_columns):
+                titrations[sheet_name] = OrgAlkData(
+                    *(data[c].to_numpy() for c in orgalk_columns)
+                )
+            else:
+                skipped.append(sheet_name)
+        if len(skipped) > 0:
+            warn(
+                "sheets without titration data were skipped: "
+                + ("{} " * len(skipped)).format(*skipped)
+            )
+        if sidecar:
+            _write_sidecar(file_name, list(sheets), titrations, stat)
+        parsed = list(sheets), titrations
+    return parsed
+
+
+@lru_cache(maxsize=workbooks_kept)
+def _load_workbook(file_name, stat, sidecar):
+    # `stat` is part of the cache key so that changed workbooks are read again
+    return _parse_workbook(file_name, sidecar=sidecar)
+
+
+def _get_workbook(file_name, sidecar=False):
+    """Get the names of all sheets and the titrations from a workbook, from
+    memory if it has been read already in this process and not changed since.
+    """
+    if hasattr(file_name, "read"):
+        # An open file (e.g., a member of an archive) can only be parsed
+        return _parse_workbook(file_name)
+    file_name = os.path.abspath(file_name)
+    stat = tuple(_workbook_stat(file_name).tolist())
+    return _load_workbook(file_name, stat, sidecar)
+
+
+def _copy_titration(dat_data):
+    # Copy, so that changes by the caller don't affect the parsed workbook
+    return OrgAlkData(*(np.array(a) for a in dat_data))
+
+
+def read_orgalk_workbook(file_name, sheet_names=None, sidecar=False):
+    """Import titration datasets from every sheet of an Excel workbook
+    formatted for the NIOZ organic alkalinity project, opening it only once.
+
+    Sheets that do not have all of the "acid", "base", "emf" and
+    "temperature" columns are skipped, with a warning.
+
+    Parameters
+    ----------
+    file_name : str
+        The workbook file name (and path).
+    sheet_names : list of str, optional
+        Which sheets to return, by default `None`, i.e. all of them.
+    sidecar : bool, optional
+        Whether to read from and save to a sidecar file next to the workbook,
+        by default `False`.  If the sidecar cannot be saved (e.g., the folder
+        is read-only, or some data are not numbers), the titrations are still
+        returned, with a warning.
+
+    Returns
+    -------
+    dict
+        For each sheet name, an `OrgAlkData` tuple of the arrays
+            acid_amount - the amount of acid added at each titration step
+                (should be in ml).
+            base_amount - the amount of base added at each titration step
+                (should be in ml).
+            emf - the EMF at each titration step (should be in mV).
+            temperature - the temperature at each titration step (should be
+                in °C).
+    """
+    titrations = _get_workbook(file_name, sidecar=sidecar)[1]
+    if sheet_names is None:
+        sheet_names = list(titrations)
+    return {s: _copy_titration(titrations[s]) for s in sheet_names}
+
+
+def read_orgalk_sheet(file_name, sheet_name=0, sidecar=False):
+    """Import the titration dataset from one sheet of an Excel workbook
+    formatted for the NIOZ organic alkalinity project.
+
+    The whole workbook is parsed and kept in memory (see
+    `read_orgalk_workbook`), so reading the other sheets afterwards does not
+    open it again.
+
+    Parameters
+    ----------
+    file_name : str
+        The workbook file name (and path).
+    sheet_name : int or str, optional
+        The sheet to read, either its name or its position among all of the
+        sheets in the workbook, by default 0 (the first sheet).
+    sidecar : bool, optional
+        Whether to read from and save to a sidecar file next to the workbook,
+        by default `False`.
+
+    Returns
+    -------
+    OrgAlkData
+        The titration data, as for `read_orgalk_workbook`.
+    """
+    all_sheet_names, titrations = _get_workbook(file_name, sidecar=sidecar)
+    if isinstance(sheet_name, (int, np.integer)):
+        sheet_name = all_sheet_names[sheet_name]
+    if sheet_name not in titrations:
+        if sheet_name in all_sheet_names:
+            raise ValueError(
+                f'sheet "{sheet_name}" in {file_name} has no titration data'
+            )
+        raise ValueError(f'sheet "{sheet_name}" not found in {file_name}')
+    return _copy_titration(titrations[sheet_name])
+
+
+def convert_orgalk_workbooks(file_names):
+    """Parse Excel workbooks formatted for the NIOZ organic alkalinity project
+    and save their sidecar files, so that they are quick to read later.
+
+    Parameters
+    ----------
+    file_names : iterable of str
+        The workbook file names (and paths).
+
+    Returns
+    -------
+    list of str
+        The sidecar file names.
+    """
+    sidecar_fnames = []
+    for file_name in file_names:
+        _parse_workbook(file_name, sidecar=True)
+        sidecar_fnames.append(sidecar_fname(file_name))
+    return sidecar_fnames
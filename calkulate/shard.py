@@ -0,0 +1,325 @@
+# Calkulate: seawater total alkalinity from titration data
+# Copyright (C) 2019--2025  Matthew P. Humphreys  (GNU GPLv3)
+"""Split a dataset into shards that can be processed on separate machines.
+
+The workflow is
+  1.  `write_shards`: split a `Dataset` into shards, keeping each
+      `analysis_batch` together, and save each one as a Parquet file in a
+      directory that every machine can access.
+  2.  Process each shard with the worker command, e.g. on separate cluster
+      nodes:
+          python -m calkulate.shard path/to/shard-000.parquet
+  3.  `merge_shards`: combine the processed shards back into one `Dataset`,
+      identical to processing the whole dataset in one go.
+
+`run_local` does all three steps with local processes standing in for the
+separate machines.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from . import dataset
+from .classes import Dataset
+
+
+def split_shards(ds, n_shards):
+    """Split a dataset into shards without splitting any `analysis_batch`.
+
+    Batches are assigned, largest first, to whichever shard currently has the
+    fewest titrations, so the shards are about the same size.  The split only
+    depends on the contents of `ds`, so it is always the same for the same
+    dataset.
+
+    Parameters
+    ----------
+    ds : pandas.DataFrame
+        A table containing metadata for each titration.
+    n_shards : int
+        How many shards to split into.
+
+    Returns
+    -------
+    list of pandas.DataFrame
+        The shards, each keeping the original index from `ds`.  Some may be
+        empty if there are fewer batches than shards.
+    """
+    if "analysis_batch" in ds:
+        batch = ds.analysis_batch.to_numpy()
+    else:
+        batch = np.zeros(len(ds))
+    batches, first, counts = np.unique(
+        batch, return_index=True, return_counts=True
+    )
+    # Sort by size (largest first), then by first appearance in ds
+    order = np.lexsort((first, -counts))
+    shard_sizes = np.zeros(n_shards, dtype=int)
+    shard_of = {}
+    for b in order:
+        s = int(np.argmin(shard_sizes))
+        shard_of[batches[b]] = s
+        shard_sizes[s] += counts[b]
+    shard = np.array([shard_of[b] for b in batch], dtype=int)
+    return [ds[shard == s] for s in range(n_shards)]
+
+
+def write_shards(ds, n_shards, shard_path):
+    """Split a dataset into shards (see `split_shards`) and save each as a
+    Parquet file.
+
+    Parameters
+    ----------
+    ds : pandas.DataFrame
+        A table containing metadata for each titration.
+    n_shards : int
+        How many shards to split into.
+    shard_path : str
+        The directory to save the shards in.
+
+    Returns
+    -------
+    list of str
+        The file names of the shards.
+    """
+    os.makedirs(shard_path, exist_ok=True)
+    # Parquet can't store every dtype (e.g., datetime64[s]), so save the
+    # originals to be restored by `merge_shards`
+    with open(os.path.join(shard_path, "dtypes.json"), "w") as f:
+        json.dump({str(k): str(v) for k, v in ds.dtypes.items()}, f)
+    shard_fnames = []
+    for s, shard in enumerate(split_shards(ds, n_shards)):
+        shard_fname = os.path.join(shard_path, f"shard-{s:03d}.parquet")
+        pd.DataFrame(shard).to_parquet(shard_fname)
+        shard_fnames.append(shard_fname)
+    return shard_fnames
+
+
+def _output_fnames(shard_fname):
+    """Get the results and batches file names for a shard."""
+    stem = shard_fname.removesuffix(".parquet")
+    return f"{stem}.results.parquet", f"{stem}.batches.parquet"
+
+
+def process_shard(shard_fname, verbose=False, **kwargs):
+    """Calibrate and solve one shard, saving the results and the batch
+    calibration statistics next to the shard file.
+
+    Parameters
+    ----------
+    shard_fname : str
+        The shard file name, as created by `write_shards`.
+    verbose : bool, optional
+        Whether to print progress, by default False.
+    kwargs
+        Any kwargs that would be passed to `calibrate` or `solve`.
+
+    Returns
+    -------
+    str, str
+        The file names of the results and of the batch statistics.
+    """
+    ds = Dataset(pd.read_parquet(shard_fname))
+    results_fname, batches_fname = _output_fnames(shard_fname)
+    if len(ds) > 0 and "alkalinity_certified" in ds:
+        ds = dataset.calibrate(ds, verbose=verbose, **kwargs)
+        batches = dataset.get_batches(ds)
+    else:
+        if len(ds) > 0:
+            ds = dataset.solve(ds, verbose=verbose, **kwargs)
+        batches = pd.DataFrame(
+            columns=[
+                "titrant_molinity",
+                "titrant_molinity__std",
+                "titrant_molinity__count",
+            ],
+            dtype=float,
+        )
+    pd.DataFrame(ds).to_parquet(results_fname)
+    batches.to_parquet(batches_fname)
+    return results_fname, batches_fname
+
+
+def combine_batches(batches_list):
+    """Combine batch calibration statistics from several shards.
+
+    Where the same `analysis_batch` appears in more than one shard, the
+    means, standard deviations and counts are pooled as if all of the
+    `titrant_molinity_here` values had been averaged together.
+
+    Parameters
+    ----------
+    batches_list : list of pandas.DataFrame
+        Batch statistics from `get_batches` for each shard.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The combined batch statistics, in the same format as `get_batches`.
+    """
+    batches_list = [b for b in batches_list if len(b) > 0]
+    if len(batches_list) == 0:
+        return pd.DataFrame(
+            columns=[
+                "titrant_molinity",
+                "titrant_molinity__std",
+                "titrant_molinity__count",
+            ],
+            dtype=float,
+        )
+    b = pd.concat(batches_list)
+    n = b.titrant_molinity__count
+    m = b.titrant_molinity
+    g = b.groupby(level=0, sort=True)
+    count = n.groupby(level=0).sum()
+    mean = (m * n).groupby(level=0).sum() / count
+    ss = (
+        (
+            ((n - 1) * b.titrant_molinity__std**2).fillna(0)
+            + n * (m - mean.loc[b.index].to_numpy()) ** 2
+        )
+        .groupby(level=0)
+        .sum()
+    )
+    std = np.sqrt(ss / (count - 1))
+    # Single-shard batches keep their values exactly
+    single = g.size() == 1
+    combined = pd.DataFrame(
+        {
+            "titrant_molinity": mean,
+            "titrant_molinity__std": std,
+            "titrant_molinity__count": count,
+        }
+    )
+    b_single = b[b.index.isin(single[single].index)]
+    combined.loc[b_single.index] = b_single[combined.columns].to_numpy()
+    return combined
+
+
+def merge_shards(shard_fnames, verbose=False, **kwargs):
+    """Merge processed shards back into one `Dataset`.
+
+    If any `analysis_batch` was split across shards, its statistics are
+    pooled with `combine_batches` and its titrations are solved again with
+    the pooled `titrant_molinity`.
+
+    Parameters
+    ----------
+    shard_fnames : list of str
+        The shard file names, as created by `write_shards`, each of which must
+        have been processed with `process_shard`.
+    verbose : bool, optional
+        Whether to print progress, by default False.
+    kwargs
+        Any kwargs that would be passed to `solve`, needed only if any batch
+        was split across shards.
+
+    Returns
+    -------
+    calk.Dataset
+        The merged results, in the original order.
+    pandas.DataFrame
+        The combined batch statistics.
+    """
+    results, batches_list = [], []
+    for shard_fname in shard_fnames:
+        results_fname, batches_fname = _output_fnames(shard_fname)
+        results.append(pd.read_parquet(results_fname))
+        batches_list.append(pd.read_parquet(batches_fname))
+    ds = Dataset(pd.concat([r for r in results if len(r) > 0]).sort_index())
+    dtypes_fname = os.path.join(
+        os.path.dirname(shard_fnames[0]), "dtypes.json"
+    )
+    if os.path.isfile(dtypes_fname):
+        with open(dtypes_fname) as f:
+            dtypes = json.load(f)
+        for k, dtype in dtypes.items():
+            if k in ds and str(ds[k].dtype) != dtype:
+                ds[k] = ds[k].astype(dtype)
+    batches = combine_batches(batches_list)
+    if len(batches) > 0:
+        titrant_molinity = batches.loc[
+            ds.analysis_batch, "titrant_molinity"
+        ].to_numpy()
+        resolve = ~np.isclose(
+            titrant_molinity,
+            ds.titrant_molinity.to_numpy(),
+            rtol=0,
+            atol=0,
+            equal_nan=True,
+        )
+        if resolve.any():
+            ds["titrant_molinity"] = titrant_molinity
+            ds_resolve = Dataset(ds[resolve].copy())
+            dataset.solve(ds_resolve, verbose=verbose, **kwargs)
+            ds.loc[resolve, ds_resolve.columns] = ds_resolve
+    return ds, batches
+
+
+def run_local(ds, n_shards, shard_path, verbose=False, **kwargs):
+    """Process a dataset in shards using a separate local process for each
+    shard, as a stand-in for running the worker command on separate machines.
+
+    Parameters
+    ----------
+    ds : pandas.DataFrame
+        A table containing metadata for each titration.
+    n_shards : int
+        How many shards to split into.
+    shard_path : str
+        The directory to save the shards and their results in.
+    verbose : bool, optional
+        Whether to print progress, by default False.
+    kwargs
+        Any kwargs that would be passed to `calibrate` or `solve`.  These must
+        be JSON-serialisable.
+
+    Returns
+    -------
+    calk.Dataset
+        The merged results, in the original order.
+    pandas.DataFrame
+        The combined batch statistics.
+    """
+    shard_fnames = write_shards(ds, n_shards, shard_path)
+    command = [sys.executable, "-m", "calkulate.shard"]
+    if verbose:
+        command.append("--verbose")
+    if len(kwargs) > 0:
+        command += ["--kwargs", json.dumps(kwargs)]
+
+    def run_worker(shard_fname):
+        subprocess.run([*command, shard_fname], check=True)
+
+    with ThreadPoolExecutor(max_workers=n_shards) as executor:
+        list(executor.map(run_worker, shard_fnames))
+    return merge_shards(shard_fnames, verbose=verbose, **kwargs)
+
+
+def main(args=None):
+    """Worker command: process one or more shard files."""
+    parser = argparse.ArgumentParser(
+        prog="python -m calkulate.shard",
+        description="Calibrate and solve Calkulate dataset shards.",
+    )
+    parser.add_argument("shard_fnames", nargs="+", help="shard files")
+    parser.add_argument(
+        "--kwargs",
+        default="{}",
+        help="kwargs for calibrate/solve as a JSON object",
+    )
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(args)
+    kwargs = json.loads(args.kwargs)
+    for shard_fname in args.shard_fnames:
+        process_shard(shard_fname, verbose=args.verbose, **kwargs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+# Calkulate: seawater total alkalinity from titration data
+# Copyright (C) 2019--2025  Matthew P. Humphreys  (GNU GPLv3)
+"""Store calibrate and solve results keyed by titration fingerprint.
+
+A result store is a Parquet file with one row per fingerprinted titration
+result.  Its index contains the fingerprints (see `calk.fingerprint`) and its
+columns contain the processing `stage` and the results from that stage.
+Writing Parquet files requires pyarrow (or fastparquet) to be installed.
+Results can also be appended to a Parquet store quickly, without rewriting it,
+as extra "part" files in the `<store>.parts` directory next to it.  These are
+included whenever the store is read, and combined into the store itself by
+`compact_store`.
+
+If the store file name ends with .sqlite, .sqlite3 or .db, it is a SQLite
+database instead, with the same contents in its `fingerprints` table.  A SQLite
+database can also be used as a result `sink` (see `write_results`), which
+keeps the full calibrate and solve results for each titration, with run
+metadata and fingerprints, in its `results` table, indexed for quick queries
+by `analysis_batch`, `analysis_datetime` and `file_name`.  The same database
+file can be used as both a `store` and a `sink`.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from .meta import __version__
+
+
+sqlite_extensions = (".sqlite", ".sqlite3", ".db")
+# Columns of the `results` table that get their own index
+results_indexed = ("analysis_batch", "analysis_datetime", "file_name")
+
+
+def is_sqlite(store):
+    """Check whether a result store file name is for a SQLite database."""
+    return store.lower().endswith(sqlite_extensions)
+
+
+def _quote(name):
+    """Quote an SQL identifier."""
+    return '"{}"'.format(str(name).replace('"', '""'))
+
+
+def _sql_type(series):
+    """Get the SQLite column type for a pandas Series."""
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(
+        series
+    ):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(series):
+        return "REAL"
+    return "TEXT"
+
+
+def _sql_values(series):
+    """Convert a pandas Series into a list of values that SQLite can store,
+    with datetimes as ISO 8601 strings and missing values as `None`.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return [None if pd.isnull(v) else v.isoformat(sep=" ") for v in series]
+    values = series.tolist()
+    if series.dtype == object or not pd.api.types.is_numeric_dtype(series):
+        values = [
+            None if (np.ndim(v) == 0 and pd.isnull(v)) else v for v in values
+        ]
+        values = [v.item() if isinstance(v, np.generic) else v for v in values]
+    return values
+
+
+def _upsert(con, table, key, df):
+    """Insert the rows of `df` into a SQLite `table`, or update them if their
+    `key` (the index of `df`) is already there, adding any new columns.
+
+    Columns that are in the table but not in `df` keep their existing values
+    for updated rows.
+    """
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS _columns (tbl TEXT, name TEXT, dtype TEXT,"
+        + " PRIMARY KEY (tbl, name))"
+    )
+    con.execute(
+        f"CREATE TABLE IF NOT EXISTS {_quote(table)}"
+        + f" ({_quote(key)} TEXT PRIMARY KEY)"
+    )
+    existing = {
+        c[1] for c in con.execute(f"PRAGMA table_info({_quote(table)})")
+    }
+    for c in df.columns:
+        if c not in existing:
+            con.execute(
+                f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(c)}"
+                + f" {_sql_type(df[c])}"
+            )
+    con.executemany(
+        "INSERT OR REPLACE INTO _columns VALUES (?, ?, ?)",
+        [(table, str(c), str(df[c].dtype)) for c in df.columns],
+    )
+    columns = [key, *df.columns]
+    rows = zip(
+        [str(i) for i in df.index], *[_sql_values(df[c]) for c in df.columns]
+    )
+    sql = (
+        f"INSERT INTO {_quote(table)} ({', '.join(map(_quote, columns))})"
+        + f" VALUES ({', '.join('?' * len(columns))})"
+        + f" ON CONFLICT ({_quote(key)}) DO "
+    )
+    if len(df.columns) > 0:
+        sql += "UPDATE SET " + ", ".join(
+            f"{_quote(c)} = excluded.{_quote(c)}" for c in df.columns
+        )
+    else:
+        sql += "NOTHING"
+    con.executemany(sql, rows)
+
+
+def _read_table(con, table, key, query=None, params=None):
+    """Read rows from a SQLite `table`, indexed by `key`, restoring the
+    original dtypes of datetime, float (which may be all NULL) and bool
+    columns.
+    """
+    if query is None:
+        query = f"SELECT * FROM {_quote(table)}"
+    df = pd.read_sql_query(query, con, params=params)
+    dtypes = dict(
+        con.execute("SELECT name, dtype FROM _columns WHERE tbl = ?", (table,))
+    )
+    for c in df.columns:
+        dtype = dtypes.get(c, "")
+        if dtype.startswith("datetime64"):
+            df[c] = pd.to_datetime(df[c]).astype(dtype)
+        elif dtype.startswith("float"):
+            df[c] = df[c].astype(dtype)
+        elif dtype == "bool" and df[c].notnull().all():
+            df[c] = df[c].astype(bool)
+    if key in df:
+        df = df.set_index(key)
+    return df
+
+
+def _has_table(con, table):
+    return (
+        con.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (table,),
+        ).fetchone()
+        is not None
+    )
+
+
+def parts_path(store):
+    """Get the directory of the part files appended to a Parquet store."""
+    return f"{store}.parts"
+
+
+def _part_fnames(store):
+    """List the part files appended to a Parquet store, oldest first."""
+    path = parts_path(store)
+    if not os.path.isdir(path):
+        return []
+    return [
+        os.path.join(path, f)
+        for f in sorted(os.listdir(path))
+        if f.endswith(".parquet")
+    ]
+
+
+def read_store(store):
+    """Read a result store.
+
+    Parameters
+    ----------
+    store : str
+        The result store file name (and path).
+
+    Returns
+    -------
+    pd.DataFrame
+        The stored results, indexed by fingerprint, including any parts
+        appended to a Parquet store.  Empty if the store does not exist yet.
+    """
+    empty = pd.DataFrame(
+        {"stage": pd.Series(dtype=str)},
+        index=pd.Index([], dtype=str, name="fingerprint"),
+    )
+    if is_sqlite(store):
+        if not os.path.isfile(store):
+            return empty
+        with closing(sqlite3.connect(store)) as con:
+            if not _has_table(con, "fingerprints"):
+                return empty
+            return _read_table(con, "fingerprints", "fingerprint")
+    stored = []
+    for fname in [store, *_part_fnames(store)]:
+        try:
+            stored.append(pd.read_parquet(fname))
+        except FileNotFoundError:
+            # Not written yet, or a part already combined by `compact_store`
+            continue
+    stored = [df for df in stored if len(df) > 0]
+    if len(stored) == 0:
+        return empty
+    if len(stored) > 1:
+        # Later parts overwrite earlier results with the same fingerprint
+        stored = pd.concat(stored)
+        stored = stored[~stored.index.duplicated(keep="last")]
+    else:
+        stored = stored[0]
+    stored.index.name = "fingerprint"
+    return stored
+
+
+def write_store(store, results, append=False):
+    """Add results to a result store, overwriting any existing entries with
+    the same fingerprints.
+
+    A Parquet store is written to a temporary file first and then moved into
+    place, and a SQLite store is updated in one transaction, so an interrupted
+    write never leaves a corrupted store behind.
+
+    Parameters
+    ----------
+    store : str
+        The result store file name (and path).
+    results : pd.DataFrame
+        The results to add, indexed by fingerprint, with a `stage` column.
+    append : bool, optional
+        Whether to write the results to a new part file for a Parquet store,
+        instead of rewriting the whole store, by default `False`.  This is
+        much faster for frequent writes of a few results each to a large
+        store.  Use `compact_store` afterwards to combine the parts.  SQLite
+        stores are always updated in place.
+
+    Returns
+    -------
+    pd.DataFrame
+        The `results` that were added.  Use `read_store` to get the full
+        contents of the store.
+    """
+    assert "stage" in results, 'results must contain a "stage" column.'
+    if is_sqlite(store):
+        # Upsert in one transaction, so an interrupted write changes nothing
+        with closing(sqlite3.connect(store)) as con, con:
+            _upsert(con, "fingerprints", "fingerprint", results)
+        return results
+    if append:
+        path = parts_path(store)
+        os.makedirs(path, exist_ok=True)
+        # Part file names sort in the order they were written
+        part = os.path.join(
+            path, f"part-{time.time_ns():020d}-{uuid.uuid4().hex}.parquet"
+        )
+        results = results.copy()
+        results.index.name = "fingerprint"
+        results.to_parquet(f"{part}.tmp")
+        os.replace(f"{part}.tmp", part)
+        return results
+    stored = read_store(store)
+    stored = stored[~stored.index.isin(results.index)]
+    if len(stored) > 0:
+        stored = pd.concat([stored, results])
+    else:
+        stored = results.copy()
+    stored.index.name = "fingerprint"
+    store_tmp = f"{store}.tmp"
+    stored.to_parquet(store_tmp)
+    os.replace(store_tmp, store)
+    return results
+
+
+def compact_store(store):
+    """Combine the parts appended to a Parquet store into the store itself.
+
+    The store is rewritten before the parts are deleted, so no results are
+    lost if this is interrupted.  Nothing is done for SQLite stores.
+
+    Parameters
+    ----------
+    store : str
+        The result store file name (and path).
+    """
+    if is_sqlite(store):
+        return
+    part_fnames = _part_fnames(store)
+    if len(part_fnames) == 0:
+        return
+    stored = read_store(store)
+    store_tmp = f"{store}.tmp"
+    stored.to_parquet(store_tmp)
+    os.replace(store_tmp, store)
+    for fname in part_fnames:
+        try:
+            os.remove(fname)
+        except OSError:
+            pass
+    try:
+        os.rmdir(parts_path(store))
+    except OSError:
+        # Not empty, e.g. if another process has appended since
+        pass
+
+
+def remove_store(store):
+    """Delete a result store, including any parts appended to it."""
+    if os.path.isfile(store):
+        os.remove(store)
+    shutil.rmtree(parts_path(store), ignore_errors=True)
+
+
+def write_results(
+    sink, ds, run=None, key_columns=("file_name", "analysis_datetime")
+):
+    """Add the titrations in a dataset, with their calibrate and solve
+    results, to the `results` table of a SQLite result sink, updating any
+    titrations that are already there.
+
+    Parameters
+    ----------
+    sink : str
+        The SQLite database file name (and path), which is created if it does
+        not exist.
+    ds : pandas.DataFrame
+        The dataset to add, with any columns (e.g., metadata, results and
+        fingerprints).
+    run : dict, optional
+        Run metadata to add to every row, by default `None`.  Keys are
+        prefixed with "run_" to make the column names.
+    key_columns : tuple of str, optional
+        The columns that identify each titration, so that it is updated rather
+        than added again when it is processed again, by default
+        `("file_name", "analysis_datetime")`.  Any that are not in `ds` are
+        not used.
+
+    Returns
+    -------
+    int
+        How many rows were written.
+    """
+    results = pd.DataFrame(ds).copy()
+    if run is not None:
+        for k, v in run.items():
+            results[f"run_{k}"] = v
+    key_columns = [k for k in key_columns if k in results]
+    assert len(key_columns) > 0, "ds must contain at least one key column."
+    results.index = [
+        json.dumps(list(key))
+        for key in zip(*[_sql_values(results[k]) for k in key_columns])
+    ]
+    results = results.loc[~results.index.duplicated(keep="last")]
+    with closing(sqlite3.connect(sink)) as con, con:
+        _upsert(con, "results", "titration_key", results)
+        for c in results_indexed:
+            if c in results:
+                con.execute(
+                    "CREATE INDEX IF NOT EXISTS"
+                    + f" {_quote('results_' + c)} ON results ({_quote(c)})"
+                )
+    return len(results)
+
+
+def run_metadata(stage, **kwargs):
+    """Get the run metadata that `calibrate` and `solve` add to a result
+    sink.
+    """
+    return {
+        "stage": stage,
+        "datetime": datetime.now(timezone.utc).isoformat(sep=" "),
+        "version": __version__,
+        "kwargs": json.dumps(kwargs, sort_keys=True, default=repr),
+    }
+
+
+def read_results(sink, query=None, params=None):
+    """Load titrations from the `results` table of a SQLite result sink.
+
+    Parameters
+    ----------
+    sink : str
+        The SQLite database file name (and path).
+    query : str, optional
+        Which titrations to load, by default `None` (all of them).  Either a
+        full SQL `SELECT` query, or just the condition that would follow
+        `WHERE`, e.g. `"analysis_batch = ?"`.
+    params : list or dict, optional
+        Values for any placeholders in `query`, by default `None`.
+
+    Returns
+    -------
+    calk.Dataset
+        The titrations, indexed by `titration_key`.
+    """
+    from .classes import Dataset
+
+    if query is not None and not query.lstrip().lower().startswith(
+        ("select", "with")
+    ):
+        query = f"SELECT * FROM results WHERE {query}"
+    with closing(sqlite3.connect(sink)) as con:
+        return Dataset(
+            _read_table(con, "results", "titration_key", query, params)
+        )
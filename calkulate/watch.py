@@ -0,0 +1,346 @@
+# Calkulate: seawater total alkalinity from titration data
+# Copyright (C) 2019--2025  Matthew P. Humphreys  (GNU GPLv3)
+"""Watch a VINDTA .dbs file and solve new titrations as they are finished.
+
+The watcher polls the .dbs file and the titration files that it refers to (no
+operating-system-specific file notification APIs are used).  Whenever new rows
+appear in the .dbs file, their titration files are waited for until they have
+stopped changing, then reference materials are used to update the calibration
+of their `analysis_batch` and samples are solved with the latest calibration
+of their batch.  Each result is appended to an output CSV file as soon as it
+is available.
+
+Only the new complete lines of the .dbs file are parsed at each poll, so a line
+that is still being written is left until the next poll.  If the whole file
+has been rewritten (i.e., it is now smaller), it is parsed again from the
+start.
+"""
+
+import asyncio
+import io
+import os
+import time
+from warnings import warn
+
+import numpy as np
+import pandas as pd
+
+from . import dataset
+from .classes import Dataset
+from .read.metadata import prepare_dbs
+
+
+class Watcher:
+    """
+    calkulate.watch.Watcher
+    =======================
+    Watch a VINDTA .dbs file and solve its titrations as they are finished.
+
+    Parameters
+    ----------
+    dbs_fname : str
+        The .dbs file name and the path to it.
+    file_path : str
+        The path to the .dat files (not to the .dbs!).
+    output : str
+        The CSV file to append results to.
+    interval : float, optional
+        How often to poll for changes in s, by default 2.
+    settle : float, optional
+        How long in s a titration file must have been unchanged before it is
+        considered to be finished, by default 10.
+    update_dbs : callable, optional
+        A function that takes the `Dataset` imported from the .dbs file and
+        returns it with any extra metadata columns added (e.g.,
+        `alkalinity_certified` and `analysis_batch`), by default `None`.
+    read_dbs_kwargs : dict, optional
+        Any kwargs to pass to `calk.read_dbs`.
+    batch_timeout : float, optional
+        How long in s a finished sample waits for its `analysis_batch` to be
+        calibrated before it is solved with `fallback_titrant_molinity`
+        instead, by default `None` (wait forever).
+    fallback_titrant_molinity : float, optional
+        The `titrant_molinity` for samples that reach `batch_timeout`, by
+        default NaN, in which case they are recorded without results and not
+        waited for any more.
+    executor : concurrent.futures.Executor, optional
+        Where to run the reading, calibrating and solving, by default `None`,
+        i.e. the event loop's default executor.
+    kwargs
+        Any kwargs that would be passed to `calibrate` or `solve`.
+
+    Methods
+    -------
+    poll
+        Check once for new and finished titrations and process them.
+    run
+        Poll repeatedly until stopped.
+    """
+
+    def __init__(
+        self,
+        dbs_fname,
+        file_path,
+        output,
+        interval=2.0,
+        settle=10.0,
+        update_dbs=None,
+        read_dbs_kwargs=None,
+        batch_timeout=None,
+        fallback_titrant_molinity=np.nan,
+        executor=None,
+        **kwargs,
+    ):
+        self.dbs_fname = dbs_fname
+        self.file_path = file_path
+        self.output = output
+        self.interval = interval
+        self.settle = settle
+        self.update_dbs = update_dbs
+        self.read_dbs_kwargs = (
+            {} if read_dbs_kwargs is None else read_dbs_kwargs
+        )
+        self.batch_timeout = batch_timeout
+        self.fallback_titrant_molinity = fallback_titrant_molinity
+        self.executor = executor
+        self.kwargs = kwargs
+        self.dbs = None
+        self.dbs_stat = None
+        self.dbs_rows = None  # rows parsed from the .dbs file so far
+        self.dbs_headers = None
+        self.dbs_offset = 0  # bytes of the .dbs file parsed so far
+        self.waiting = {}  # when each finished sample started waiting
+        self.timed_out = set()  # samples solved with the fallback
+        self.pending = []  # dbs indices waiting to be processed
+        self.done = set()  # dbs indices already processed
+        self.file_stats = {}  # last (size, mtime_ns) seen for each file
+        self.batches = {}  # titrant_molinity_here values for each batch
+
+    def _read_dbs_rows(self, size):
+        """Parse the new complete lines of the .dbs file, which is `size`
+        bytes long, and add them to `dbs_rows`.
+        """
+        if size < self.dbs_offset:
+            # The file has been rewritten, so start again
+            self.dbs_rows = None
+            self.dbs_headers = None
+            self.dbs_offset = 0
+        with open(self.dbs_fname, "rb") as f:
+            f.seek(self.dbs_offset)
+            new = f.read(size - self.dbs_offset)
+        end = new.rfind(b"\n") + 1
+        text = new[:end].decode("utf-8")
+        headers = self.dbs_headers
+        if headers is None:
+            if end == 0:
+                return
+            header_line, text = text.split("\n", 1)
+            headers = np.genfromtxt(
+                io.StringIO(header_line), delimiter="\t", dtype=str, max_rows=1
+            )
+        if text.strip():
+            rows = pd.read_table(
+                io.StringIO(text), header=None, names=headers, usecols=headers
+            )
+            n_rows = 0 if self.dbs_rows is None else len(self.dbs_rows)
+            rows.index = pd.RangeIndex(n_rows, n_rows + len(rows))
+            rows = prepare_dbs(
+                rows,
+                self.dbs_fname,
+                file_path=self.file_path,
+                **self.read_dbs_kwargs,
+            )
+            if self.dbs_rows is None:
+                self.dbs_rows = rows
+            else:
+                self.dbs_rows = pd.concat([self.dbs_rows, rows])
+        self.dbs_headers = headers
+        self.dbs_offset += end
+
+    def _read_dbs(self):
+        """Prepare the rows parsed from the .dbs file for processing."""
+        dbs = Dataset(self.dbs_rows.copy())
+        if self.update_dbs is not None:
+            dbs = self.update_dbs(dbs)
+        if "alkalinity_certified" not in dbs:
+            dbs["alkalinity_certified"] = np.nan
+        if "analysis_batch" not in dbs:
+            dbs["analysis_batch"] = 0
+        if "reference_good" not in dbs:
+            dbs["reference_good"] = True
+        dataset.prepare(dbs)
+        return dbs
+
+    def _file_finished(self, file_name):
+        """Determine whether a titration file exists and has stopped
+        changing.
+        """
+        try:
+            st = os.stat(os.path.join(self.file_path, file_name))
+        except OSError:
+            return False
+        stat = (st.st_size, st.st_mtime_ns)
+        previous = self.file_stats.get(file_name)
+        self.file_stats[file_name] = stat
+        return (
+            stat == previous
+            and st.st_size > 0
+            and time.time() - st.st_mtime_ns * 1e-9 >= self.settle
+        )
+
+    def _titrant_molinity(self, batch):
+        """Get the latest calibrated titrant_molinity for a batch."""
+        molinities = self.batches.get(batch, [])
+        return np.mean(molinities) if len(molinities) > 0 else np.nan
+
+    def _process_row(self, index, row):
+        """Calibrate (if a reference material) and solve one titration."""
+        record = {
+            "index": index,
+            "file_name": row.file_name,
+            "analysis_datetime": row.get("analysis_datetime", pd.NaT),
+            "analysis_batch": row.analysis_batch,
+            "alkalinity_certified": row.alkalinity_certified,
+            "titrant_molinity_here": np.nan,
+        }
+        if pd.notnull(row.alkalinity_certified):
+            titrant_molinity_here = dataset.calibrate_row(row, **self.kwargs)
+            record["titrant_molinity_here"] = titrant_molinity_here
+            if row.reference_good and pd.notnull(titrant_molinity_here):
+                self.batches.setdefault(row.analysis_batch, []).append(
+                    titrant_molinity_here
+                )
+        row = row.copy()
+        row["titrant_molinity"] = self._titrant_molinity(row.analysis_batch)
+        if pd.isnull(row.titrant_molinity) and index in self.timed_out:
+            row["titrant_molinity"] = self.fallback_titrant_molinity
+        record["titrant_molinity"] = row.titrant_molinity
+        record.update(dataset._solve_record(row, **self.kwargs))
+        return record
+
+    def _append(self, record):
+        """Append one result record to the output CSV file."""
+        pd.DataFrame([record]).to_csv(
+            self.output,
+            mode="a",
+            header=not os.path.isfile(self.output),
+            index=False,
+        )
+
+    def _step(self):
+        """Check for new .dbs rows and finished files, and find which rows
+        are ready to be processed.
+        """
+        try:
+            st = os.stat(self.dbs_fname)
+            dbs_stat = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            return []
+        if dbs_stat != self.dbs_stat:
+            try:
+                self._read_dbs_rows(st.st_size)
+            except (OSError, ValueError, KeyError) as e:
+                # E.g., the .dbs file is part-way through being written, so
+                # keep the rows found so far and try again at the next poll
+                warn(f"could not read {self.dbs_fname}, retrying: {e}")
+                if self.dbs is None:
+                    return []
+            else:
+                self.dbs_stat = dbs_stat
+                if self.dbs_rows is not None:
+                    self.dbs = self._read_dbs()
+                    for index in self.dbs.index:
+                        if (
+                            index not in self.done
+                            and index not in self.pending
+                        ):
+                            self.pending.append(index)
+        if self.dbs is None:
+            return []
+        # Reference materials are processed before samples so that samples
+        # can use calibrations from the same poll
+        ready_crm, ready_sample = [], []
+        for index in self.pending:
+            row = self.dbs.loc[index]
+            if not row.file_good:
+                ready_sample.append(index)
+            elif self._file_finished(row.file_name):
+                if pd.notnull(row.alkalinity_certified):
+                    ready_crm.append(index)
+                else:
+                    ready_sample.append(index)
+        batches_ready = set(self.dbs.loc[ready_crm].analysis_batch)
+        # Samples must wait until their batch has been calibrated, or until
+        # they have waited for `batch_timeout`
+        now = time.monotonic()
+        ready_waited = []
+        for index in ready_sample:
+            row = self.dbs.loc[index]
+            if (
+                not row.file_good
+                or row.analysis_batch in batches_ready
+                or pd.notnull(self._titrant_molinity(row.analysis_batch))
+            ):
+                ready_waited.append(index)
+            else:
+                waiting_since = self.waiting.setdefault(index, now)
+                if (
+                    self.batch_timeout is not None
+                    and now - waiting_since >= self.batch_timeout
+                ):
+                    self.timed_out.add(index)
+                    ready_waited.append(index)
+        return ready_crm + ready_waited
+
+    async def poll(self):
+        """Check once for new and finished titrations and process them.
+
+        Returns
+        -------
+        list of dict
+            The result records for the titrations processed in this poll.
+        """
+        loop = asyncio.get_running_loop()
+        ready = await loop.run_in_executor(self.executor, self._step)
+        records = []
+        for index in ready:
+            row = self.dbs.loc[index]
+            record = await loop.run_in_executor(
+                self.executor, self._process_row, index, row
+            )
+            self._append(record)
+            self.pending.remove(index)
+            self.waiting.pop(index, None)
+            self.done.add(index)
+            records.append(record)
+        return records
+
+    async def run(self, stop=None, max_polls=None):
+        """Poll for new titrations every `interval` s until stopped.
+
+        Parameters
+        ----------
+        stop : asyncio.Event, optional
+            Stop watching once this is set, by default `None`.
+        max_polls : int, optional
+            Stop after this many polls, by default `None` (no limit).
+        """
+        polls = 0
+        while not (stop is not None and stop.is_set()):
+            await self.poll()
+            polls += 1
+            if max_polls is not None and polls >= max_polls:
+                break
+            await asyncio.sleep(self.interval)
+
+
+def watch(dbs_fname, file_path, output, max_polls=None, **kwargs):
+    """Watch a VINDTA .dbs file and solve new titrations as they are finished,
+    appending the results to a CSV file.  Runs until interrupted (or for
+    `max_polls` polls).
+
+    See `calk.watch.Watcher` for the available kwargs.
+    """
+    watcher = Watcher(dbs_fname, file_path, output, **kwargs)
+    asyncio.run(watcher.run(max_polls=max_polls))
+    return watcher
@@ -0,0 +1,61 @@
+# %%
+# Benchmark read_dat_genfromtxt against plain numpy.genfromtxt
+import os
+import tempfile
+from glob import glob
+from time import perf_counter
+
+import numpy as np
+
+from calkulate.read.titrations import read_dat_genfromtxt
+
+
+def time_it(func, *args, repeats=5):
+    best = np.inf
+    for _ in range(repeats):
+        start = perf_counter()
+        func(*args)
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def genfromtxt(file_name):
+    data = np.genfromtxt(file_name, delimiter="\t", skip_header=2)
+    return data[:, 0], data[:, 1], data[:, 2]
+
+
+def benchmark(file_names, label):
+    t_old = sum(time_it(genfromtxt, f) for f in file_names)
+    t_new = sum(time_it(read_dat_genfromtxt, f) for f in file_names)
+    print(
+        f"{label}: genfromtxt {t_old * 1e3:.1f} ms,"
+        + f" read_dat_genfromtxt {t_new * 1e3:.1f} ms,"
+        + f" speed-up x{t_old / t_new:.1f}"
+    )
+
+
+# VINDTA files in tests/data
+file_names = [
+    f
+    for f in glob("tests/data/vindta_database/*.dat")
+    if os.path.getsize(f) > 300
+]
+benchmark(file_names, f"{len(file_names)} VINDTA files")
+
+# Large synthetic file with extra columns
+rng = np.random.default_rng(1)
+with tempfile.TemporaryDirectory() as tmp:
+    file_name = os.path.join(tmp, "large.dat")
+    n_rows = 200_000
+    data = np.column_stack(
+        [
+            np.linspace(0, 4, n_rows),
+            np.linspace(200, 300, n_rows),
+            25 + rng.normal(size=n_rows) * 0.01,
+            rng.normal(size=(n_rows, 5)),
+        ]
+    )
+    np.savetxt(
+        file_name, data, fmt="%.5f", delimiter="\t", header="a\nb", comments=""
+    )
+    benchmark([file_name], f"Synthetic file ({n_rows} rows, 8 columns)")
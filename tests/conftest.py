@@ -0,0 +1,34 @@
+# %%
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import calkulate as calk
+
+
+fname_dbs = "tests/data/vindta_database.dbs"
+fpath_dbs = "tests/data/vindta_database/"
+
+
+def read_test_dbs(file_path=fpath_dbs, n_rows=20, copy_files=False):
+    """Import the first `n_rows` of the test .dbs file, with the certified
+    alkalinity of its CRMs, reading the titration files from `file_path`.
+    With `copy_files`, the titration files are first copied into `file_path`.
+    """
+    dbs = calk.read_dbs(fname_dbs, file_path=file_path, analyte_volume=97.7)
+    dbs = calk.Dataset(dbs.iloc[:n_rows].copy())
+    dbs["alkalinity_certified"] = np.where(dbs.station == 666, 2215, np.nan)
+    if copy_files:
+        for file_name in dbs.file_name:
+            shutil.copy2(os.path.join(fpath_dbs, file_name), file_path)
+    return dbs
+
+
+@pytest.fixture
+def get_dbs():
+    """Get the function that imports the test .dbs file (`read_test_dbs`),
+    so each test can import a fresh copy of it.
+    """
+    return read_test_dbs
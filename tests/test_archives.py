@@ -0,0 +1,165 @@
+# %%
+import multiprocessing
+import os
+import shutil
+import tarfile
+import warnings
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import calkulate as calk
+from calkulate.read import archives
+
+
+fpath_dbs = "tests/data/vindta_database/"
+
+
+def test_archives_calibrate(tmp_path, get_dbs):
+    """Does reading titration files from zip and tar archives give the same
+    results as reading them from disk?
+    """
+    tmp_path = str(tmp_path)
+    zip_fname = shutil.make_archive(
+        os.path.join(tmp_path, "vindta"),
+        "zip",
+        "tests/data",
+        "vindta_database",
+    )
+    tar_fname = shutil.make_archive(
+        os.path.join(tmp_path, "vindta"),
+        "gztar",
+        "tests/data",
+        "vindta_database",
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        dbs_direct = get_dbs().calibrate()
+        for archive in [zip_fname, tar_fname]:
+            dbs = get_dbs(
+                file_path=os.path.join(archive, "vindta_database")
+            ).calibrate()
+            assert np.allclose(
+                dbs.alkalinity, dbs_direct.alkalinity, equal_nan=True
+            )
+            assert np.allclose(
+                dbs.titrant_molinity,
+                dbs_direct.titrant_molinity,
+                equal_nan=True,
+            )
+    assert archive.endswith(".tar.gz")
+    # Missing members are caught by the prescreen
+    dbs = get_dbs(file_path=os.path.join(zip_fname, "vindta_database"))
+    dbs.loc[0, "file_name"] = "missing.dat"
+    dbs.prescreen()
+    assert dbs.prescreen_error[0] == "file not found"
+
+
+def test_archives_file_types(tmp_path):
+    """Can PC LIMS and Tiamo files be read from archives?"""
+    tmp_path = str(tmp_path)
+    files = {
+        "PC_LIMS_Report-SEA2-20200317-130328.txt": "pclims",
+        "ts-tiamo/CRM-210-0033.old": "tiamo_de",
+        "titration.dat": "genfromtxt",
+    }
+    zip_fname = os.path.join(tmp_path, "files.zip")
+    tar_fname = os.path.join(tmp_path, "files.tar")
+    with (
+        zipfile.ZipFile(zip_fname, "w") as z,
+        tarfile.open(tar_fname, "w") as t,
+    ):
+        for file_name in files:
+            z.write(os.path.join("tests/data", file_name), file_name)
+            t.add(os.path.join("tests/data", file_name), file_name)
+    for file_name, file_type in files.items():
+        dd = calk.read_dat(
+            os.path.join("tests/data", file_name), file_type=file_type
+        )
+        for archive in [zip_fname, tar_fname]:
+            dd_archive = calk.read_dat(
+                os.path.join(archive, file_name), file_type=file_type
+            )
+            for a, b in zip(dd, dd_archive):
+                assert np.array_equal(a, b, equal_nan=True)
+
+
+def test_close_archives(tmp_path):
+    """Is each archive opened only once, even from several threads, and are
+    they all closed by `close_archives`?
+    """
+    tmp_path = str(tmp_path)
+    fnames = [
+        shutil.make_archive(
+            os.path.join(tmp_path, "vindta"),
+            archive_format,
+            "tests/data",
+            "vindta_database",
+        )
+        for archive_format in ["zip", "tar", "gztar"]
+    ]
+    member = "vindta_database/" + sorted(os.listdir(fpath_dbs))[2]
+    with open(os.path.join("tests/data", member), "rb") as f:
+        contents = f.read()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        opened = list(pool.map(archives.open_archive, fnames * 8))
+    for i, fname in enumerate(fnames):
+        assert all(a is opened[i] for a in opened[i :: len(fnames)])
+        assert opened[i].read_bytes(member) == contents
+    zip_archive = opened[0]
+    archives.close_archives()
+    assert archives._archives == {}
+    assert zip_archive.zip_file.fp is None
+    # Archives are opened again when they are next needed
+    for fname in fnames:
+        assert archives.open_archive(fname).read_bytes(member) == contents
+    archives.close_archives()
+
+
+def read_member_forked(archive, member):
+    """Check which archives are open in a forked process, then read a member
+    from an archive.
+    """
+    forgotten = os.path.abspath(archive) not in archives._archives
+    return forgotten, archives.open_archive(archive).read_bytes(member)
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(),
+    reason="processes cannot be forked",
+)
+def test_archives_forked(tmp_path):
+    """Do forked processes open their own copies of archives that were
+    already opened by the parent, instead of sharing its open files?
+    """
+    zip_fname = shutil.make_archive(
+        os.path.join(str(tmp_path), "vindta"),
+        "zip",
+        "tests/data",
+        "vindta_database",
+    )
+    members = [
+        "vindta_database/" + file_name
+        for file_name in sorted(os.listdir(fpath_dbs))[:8]
+    ]
+    opened = archives.open_archive(zip_fname)
+    contents = [opened.read_bytes(member) for member in members]
+    with ProcessPoolExecutor(
+        max_workers=4, mp_context=multiprocessing.get_context("fork")
+    ) as pool:
+        forked = list(
+            pool.map(read_member_forked, [zip_fname] * len(members), members)
+        )
+    # Each worker opens the archive again the first time it is needed
+    assert any(forgotten for forgotten, _ in forked)
+    assert [c for _, c in forked] == contents
+    assert archives.open_archive(zip_fname) is opened
+    archives.close_archives()
+
+
+# test_archives_calibrate()
+# test_archives_file_types()
+# test_close_archives()
+# test_archives_forked()
@@ -0,0 +1,92 @@
+# %%
+import asyncio
+import threading
+import time
+import warnings
+
+import pandas as pd
+import pytest
+
+import calkulate as calk
+
+
+def test_calibrate_async(get_dbs):
+    """Does calibrate_async give the same results as calibrate?"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        dbs = get_dbs().calibrate()
+    dbs_async = asyncio.run(get_dbs().calibrate_async(max_concurrent=3))
+    pd.testing.assert_frame_equal(pd.DataFrame(dbs), pd.DataFrame(dbs_async))
+
+
+def slow_record(row, verbose=False, **kwargs):
+    time.sleep(0.05)
+    return {"alkalinity": 2000.0}
+
+
+def test_solve_async_limit_cancel(monkeypatch, get_dbs):
+    """Are concurrency limits respected, and does cancelling leave the
+    dataset without results?
+    """
+    active = [0, 0]  # now, max
+    lock = threading.Lock()
+
+    def record(row, verbose=False, **kwargs):
+        with lock:
+            active[0] += 1
+            active[1] = max(active)
+        try:
+            return slow_record(row)
+        finally:
+            with lock:
+                active[0] -= 1
+
+    monkeypatch.setitem(calk.dataset.stage_records, "solve", record)
+    dbs = get_dbs()
+    dbs["titrant_molinity"] = 0.1
+    asyncio.run(dbs.solve_async(max_concurrent=2))
+    assert active[1] == 2
+    assert (dbs.alkalinity == 2000).all()
+
+    async def solve_then_cancel(ds):
+        task = asyncio.create_task(ds.solve_async(max_concurrent=2))
+        await asyncio.sleep(0.12)
+        task.cancel()
+        await task
+
+    dbs = get_dbs()
+    dbs["titrant_molinity"] = 0.1
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(solve_then_cancel(dbs))
+    assert "alkalinity" not in dbs
+
+
+def test_files_solve_async():
+    """Does the file-level solve_async match solve, with many requests sharing
+    one semaphore?
+    """
+    kwargs = {
+        "analyte_mass": 0.1,
+        "file_path": "tests/data/",
+        "titrant_molinity": 0.1,
+    }
+    sr = calk.files.solve("titration.dat", salinity=35, **kwargs)
+
+    async def solve_many():
+        semaphore = asyncio.Semaphore(2)
+        return await asyncio.gather(
+            *[
+                calk.files.solve_async(
+                    "titration.dat", salinity=35, semaphore=semaphore, **kwargs
+                )
+                for _ in range(6)
+            ]
+        )
+
+    for sr_async in asyncio.run(solve_many()):
+        assert sr_async.alkalinity == sr.alkalinity
+
+
+# test_calibrate_async()
+# test_solve_async_limit_cancel()
+# test_files_solve_async()
@@ -0,0 +1,109 @@
+# %%
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import calkulate as calk
+from calkulate.batches import BatchStats, leave_one_out
+
+
+def get_calibrated():
+    dbs = calk.read_dbs(
+        "tests/data/vindta_database.dbs",
+        file_path="tests/data/vindta_database/",
+        analyte_volume=97.7,
+    )
+    dbs["alkalinity_certified"] = np.where(dbs.station == 666, 2215, np.nan)
+    dbs["analysis_batch"] = dbs.analysis_datetime.dt.hour
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        dbs.calibrate()
+    return dbs
+
+
+def test_get_batches():
+    """Does `get_batches` match the statistics from each batch separately?"""
+    dbs = get_calibrated()
+    batches = calk.dataset.get_batches(dbs)
+    for batch, group in dbs.groupby("analysis_batch"):
+        group_calibration = calk.dataset.get_group_calibration(group)
+        assert np.allclose(
+            batches.loc[batch].to_numpy(),
+            group_calibration.to_numpy(),
+            rtol=0,
+            atol=0,
+            equal_nan=True,
+        )
+
+
+def test_batch_stats_update():
+    """Do incremental updates give the same statistics as recalculating?"""
+    dbs = get_calibrated()
+    bs = BatchStats(dbs)
+    pd.testing.assert_frame_equal(
+        bs.to_frame(), calk.dataset.get_batches(dbs), rtol=1e-12
+    )
+    crms = dbs.index[dbs.titrant_molinity_here.notnull()]
+    rng = np.random.default_rng(7)
+    for _ in range(50):
+        index = rng.choice(crms)
+        if rng.random() < 0.5:
+            reference_good = not dbs.loc[index, "reference_good"]
+            dbs.loc[index, "reference_good"] = reference_good
+            stats = bs.update(index, reference_good=reference_good)
+        else:
+            titrant_molinity_here = 0.1 + rng.normal() * 1e-4
+            dbs.loc[index, "titrant_molinity_here"] = titrant_molinity_here
+            stats = bs.update(
+                index, titrant_molinity_here=titrant_molinity_here
+            )
+        expected = calk.dataset.get_batches(dbs).loc[
+            dbs.loc[index, "analysis_batch"]
+        ]
+        for k, v in stats.items():
+            assert np.isclose(
+                v, expected[k], rtol=1e-9, atol=0, equal_nan=True
+            )
+    pd.testing.assert_frame_equal(
+        bs.to_frame(), calk.dataset.get_batches(dbs), rtol=1e-9
+    )
+
+
+def test_leave_one_out():
+    """Do the leave-one-out diagnostics match calibrating again without each
+    reference material?
+    """
+    dbs = get_calibrated()
+    dbs = calk.Dataset(dbs[dbs.analysis_batch.isin([8, 13])].copy())
+    leave_one_out(dbs)
+    for ix in dbs.index[dbs.alkalinity_certified.notnull()]:
+        ds = calk.Dataset(dbs.copy())
+        ds.loc[ix, "reference_good"] = False
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=UserWarning)
+            ds.calibrate()
+        assert np.isclose(
+            ds.loc[ix, "titrant_molinity"],
+            dbs.loc[ix, "loo_titrant_molinity"],
+            rtol=1e-12,
+            atol=0,
+        )
+        assert np.isclose(
+            ds.loc[ix, "alkalinity_offset"],
+            dbs.loc[ix, "loo_alkalinity_offset"],
+            rtol=0,
+            atol=1e-3,
+        )
+        L = ds.analysis_batch == ds.loc[ix, "analysis_batch"]
+        assert np.isclose(
+            (ds.alkalinity - dbs.alkalinity)[L].abs().max(),
+            dbs.loc[ix, "loo_batch_alkalinity_change"],
+            rtol=1e-2,
+            atol=0,
+        )
+
+
+# test_get_batches()
+# test_batch_stats_update()
+# test_leave_one_out()
@@ -0,0 +1,89 @@
+# %%
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import calkulate as calk
+from calkulate.chunked import batch_chunks, calkulate_chunked, read_chunks
+
+
+fname_dbs = "tests/data/vindta_database.dbs"
+fpath_dbs = "tests/data/vindta_database/"
+dbs = calk.read_dbs(fname_dbs, file_path=fpath_dbs, analyte_volume=97.7)
+dbs = dbs[dbs.file_good].iloc[:30].copy()
+dbs["alkalinity_certified"] = np.where(dbs.station == 666, 2215, np.nan)
+dbs["analysis_batch"] = dbs.analysis_datetime.dt.day
+metadata = pd.DataFrame(
+    dbs[
+        [
+            "file_name",
+            "file_path",
+            "salinity",
+            "analyte_volume",
+            "alkalinity_certified",
+            "analysis_batch",
+        ]
+    ]
+).reset_index(drop=True)
+
+
+def test_batch_chunks():
+    """Are chunks regrouped without splitting any analysis_batch?"""
+    chunks = [metadata.iloc[i : i + 7] for i in range(0, len(metadata), 7)]
+    rechunked = list(batch_chunks(chunks))
+    assert sum(len(c) for c in rechunked) == len(metadata)
+    batches = [set(c.analysis_batch) for c in rechunked]
+    for i, b in enumerate(batches):
+        for other in batches[i + 1 :]:
+            assert len(b & other) == 0
+
+
+def test_calkulate_chunked(tmp_path):
+    """Does processing a CSV in chunks give the same results as processing it
+    all at once?
+    """
+    fname = os.path.join(str(tmp_path), "metadata.csv")
+    metadata.to_csv(fname, index=False)
+    output_path = os.path.join(str(tmp_path), "results")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        parts = calkulate_chunked(fname, output_path, chunksize=8)
+        ds = calk.read_csv(fname).calibrate()
+    assert len(parts) == metadata.analysis_batch.nunique()
+    results = pd.read_parquet(output_path).sort_index()
+    assert (results.index == ds.index).all()
+    assert np.allclose(results.titrant_molinity, ds.titrant_molinity)
+    assert np.allclose(results.alkalinity, ds.alkalinity, equal_nan=True)
+
+
+def test_read_chunks_parquet(tmp_path):
+    """Are Parquet chunks numbered through the whole table, like CSV chunks,
+    so that regrouped chunks have unique index labels?
+    """
+    fname = os.path.join(str(tmp_path), "metadata.parquet")
+    metadata.to_parquet(fname)
+    chunks = list(read_chunks(fname, chunksize=10))
+    assert len(chunks) == 3
+    assert pd.concat(chunks).index.equals(metadata.index)
+    for chunk in batch_chunks(read_chunks(fname, chunksize=10)):
+        assert chunk.index.is_unique
+
+
+def test_batch_chunks_repeated():
+    """Is a repeated analysis_batch in the final chunk warned about?"""
+    chunks = [
+        pd.concat([metadata.iloc[:5], metadata.iloc[20:25]]),
+        metadata.iloc[5:8],
+    ]
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        list(batch_chunks(chunks))
+    assert any("more than one place" in str(w.message) for w in caught)
+
+
+# test_batch_chunks()
+# test_calkulate_chunked()
+# test_read_chunks_parquet()
+# test_batch_chunks_repeated()
@@ -0,0 +1,123 @@
+# %%
+import os
+import shutil
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import calkulate as calk
+from calkulate.read.cache import DatCache
+
+
+fpath_dbs = "tests/data/vindta_database/"
+
+
+def read_all(cache_path):
+    """Read every titration file through a cache in another process."""
+    dat_cache = DatCache(cache_path)
+    for file_name in sorted(os.listdir(fpath_dbs))[:10]:
+        calk.read_dat(os.path.join(fpath_dbs, file_name), dat_cache=dat_cache)
+    return dat_cache.hits, dat_cache.misses
+
+
+def test_dat_cache(tmp_path):
+    """Are parsed files reused from the cache, and changed files parsed
+    again?
+    """
+    file_name = os.path.join(str(tmp_path), "titration.dat")
+    shutil.copy2("tests/data/titration.dat", file_name)
+    dat_cache = DatCache(os.path.join(str(tmp_path), "cache"))
+    dd = calk.read_dat(file_name)
+    for _ in range(2):
+        dd_cache = calk.read_dat(file_name, dat_cache=dat_cache)
+        assert isinstance(dd_cache, calk.read.titrations.DatData)
+        for a, b in zip(dd, dd_cache):
+            assert np.array_equal(a, b)
+    assert (dat_cache.hits, dat_cache.misses) == (1, 1)
+    # Different kwargs or file contents mean a different entry
+    calk.read_dat(file_name, dat_cache=dat_cache, col_temperature=1)
+    assert dat_cache.misses == 2
+    with open(file_name, "a") as f:
+        f.write("1\t2\t3\n")
+    dd_cache = calk.read_dat(file_name, dat_cache=dat_cache)
+    assert dat_cache.misses == 3
+    assert len(dd_cache.titrant_amount) == len(dd.titrant_amount) + 1
+    # Eviction keeps the cache within max_size, dropping the oldest entries
+    size = dat_cache.size()
+    dat_cache.evict(max_size=size - 1)
+    assert 0 < dat_cache.size() < size
+    dat_cache.clear()
+    assert dat_cache.size() == 0
+
+
+def test_dat_cache_processes(tmp_path, get_dbs):
+    """Can several processes share one cache, and does the dataset pipeline
+    give the same results through it?
+    """
+    cache_path = os.path.join(str(tmp_path), "cache")
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        counts = list(executor.map(read_all, [cache_path] * 4))
+    assert sum(misses for _, misses in counts) >= 10
+    hits, misses = read_all(cache_path)
+    assert (hits, misses) == (10, 0)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        dbs = get_dbs()
+        dbs_direct = calk.Dataset(dbs.copy()).calibrate()
+        dbs_cache = calk.Dataset(dbs.copy()).calibrate(dat_cache=cache_path)
+    assert np.allclose(
+        dbs_cache.alkalinity, dbs_direct.alkalinity, equal_nan=True
+    )
+
+
+def read_object(file_name, values=(1.5, 2.5)):
+    """A reader that returns object arrays, like from a spreadsheet."""
+    return (np.array(values, dtype=object), np.array([25, 25]))
+
+
+def test_dat_cache_object(tmp_path):
+    """Are object arrays cached as floats, and non-numeric results not cached,
+    so that entries never need pickling to load?
+    """
+    file_name = os.path.join(str(tmp_path), "titration.dat")
+    shutil.copy2("tests/data/titration.dat", file_name)
+    dat_cache = DatCache(os.path.join(str(tmp_path), "cache"))
+    for _ in range(2):
+        data = dat_cache.read(read_object, file_name, "object")
+        assert np.array_equal(data[0], [1.5, 2.5])
+    assert (dat_cache.hits, dat_cache.misses) == (1, 1)
+    assert data[0].dtype == float
+    dat_cache.clear()
+    for _ in range(2):
+        data = dat_cache.read(
+            read_object, file_name, "object", values=("1.5", "overrange")
+        )
+    assert (dat_cache.hits, dat_cache.misses) == (1, 3)
+    assert data[0][1] == "overrange"
+    assert dat_cache.size() == 0
+
+
+def test_dat_cache_damaged(tmp_path):
+    """Is a damaged cache entry treated as a miss and replaced?"""
+    file_name = os.path.join(str(tmp_path), "titration.dat")
+    shutil.copy2("tests/data/titration.dat", file_name)
+    dat_cache = DatCache(os.path.join(str(tmp_path), "cache"))
+    dd = calk.read_dat(file_name, dat_cache=dat_cache)
+    entry = dat_cache._entry(dat_cache.key(file_name, "genfromtxt", {}))
+    with open(entry, "rb") as f:
+        truncated = f.read()[:100]
+    for damaged in [b"not a zip file", truncated]:
+        with open(entry, "wb") as f:
+            f.write(damaged)
+        dd_cache = calk.read_dat(file_name, dat_cache=dat_cache)
+        assert np.array_equal(dd_cache.measurement, dd.measurement)
+    assert (dat_cache.hits, dat_cache.misses) == (0, 3)
+    calk.read_dat(file_name, dat_cache=dat_cache)
+    assert dat_cache.hits == 1
+
+
+# test_dat_cache()
+# test_dat_cache_processes()
+# test_dat_cache_object()
+# test_dat_cache_damaged()
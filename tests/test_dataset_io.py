@@ -1,4 +1,8 @@
 # %%
+import os
+import shutil
+
+import numpy as np
 import pandas as pd
 
 import calkulate as calk
@@ -28,6 +32,95 @@ def test_read_dbs():
     assert isinstance(ds, calk.Dataset)
 
 
+def test_read_dbs_rows():
+    """Are the datetimes and file names from `read_dbs` the same as from
+    parsing each row separately?
+    """
+    for dbs_fname in [
+        "tests/data/vindta_database.dbs",
+        "tests/data/ts-vindta/TA_2023.dbs",
+    ]:
+        ds = calk.read_dbs(dbs_fname)
+        for i, row in ds.iterrows():
+            assert (
+                calk.read.metadata.dbs_datetime(row).analysis_datetime
+                == ds.analysis_datetime[i]
+            )
+            if row.run_type == "bottle":
+                assert ds.file_name[i] == (
+                    f"{int(row.station)}-{int(row.cast)}  {int(row.niskin)}"
+                    + f"  ({int(row.depth)}){row.bottle}.dat"
+                )
+            elif row.run_type == "CRM":
+                assert ds.file_name[i] == f"CRM{row.batch}{row.bottle}.dat"
+                assert ds.alkalinity_certified[i] == row["cert. CRM AT"]
+    # Format specs are applied to each value
+    ds = calk.read_dbs(
+        "tests/data/vindta_database.dbs", filename_format="{s:03d}_{b!r}.dat"
+    )
+    assert ds.file_name[0] == "000_'JUNK1'.dat"
+    assert ds.analysis_datetime.dtype == np.dtype("datetime64[s]")
+
+
+def test_read_dbs_many(tmp_path):
+    """Can several .dbs files be imported together, with repeated runs
+    dropped?
+    """
+    dbs_vindta = "tests/data/vindta_database.dbs"
+    dbs_ts = "tests/data/ts-vindta/TA_2023.dbs"
+    # A later copy of a .dbs file contains all the runs from the earlier one
+    dbs_copy = os.path.join(str(tmp_path), "vindta_copy.dbs")
+    shutil.copy(dbs_vindta, dbs_copy)
+    ds = calk.read_dbs_many(
+        [dbs_vindta, dbs_ts, dbs_copy],
+        file_path={dbs_vindta: "tests/data/vindta_database/"},
+        analyte_volume=97.7,
+    )
+    ds_vindta = calk.read_dbs(dbs_vindta)
+    ds_ts = calk.read_dbs(dbs_ts)
+    assert isinstance(ds, calk.Dataset)
+    assert len(ds) == len(ds_vindta) + len(ds_ts)
+    assert (ds.index == np.arange(len(ds))).all()
+    assert (ds.dbs_fname[: len(ds_vindta)] == dbs_vindta).all()
+    assert (ds.dbs_fname[len(ds_vindta) :] == dbs_ts).all()
+    assert (
+        ds.file_path[: len(ds_vindta)] == "tests/data/vindta_database/"
+    ).all()
+    assert ds.file_path[len(ds_vindta) :].isnull().all()
+    assert ds.alkalinity_certified[: len(ds_vindta)].isnull().all()
+    assert (ds.file_name[: len(ds_vindta)] == ds_vindta.file_name).all()
+    # Without dropping duplicates, and from a glob pattern
+    shutil.copy(dbs_ts, os.path.join(str(tmp_path), "ts.dbs"))
+    ds = calk.read_dbs_many(
+        os.path.join(str(tmp_path), "*.dbs"), drop_duplicates=False
+    )
+    assert len(ds) == len(ds_vindta) + len(ds_ts)
+    assert ds.dbs_fname[0].endswith("ts.dbs")
+
+
+def test_read_dbs_many_blank(tmp_path):
+    """Are rows without a file name or datetime (e.g., blank rows) kept when
+    duplicates are dropped?
+    """
+    with open("tests/data/vindta_database.dbs") as f:
+        dbs_lines = f.readlines()
+    blank = "\t".join([""] * dbs_lines[0].count("\t")) + "\n"
+    dbs_fnames = []
+    for i in range(2):
+        dbs_fnames.append(os.path.join(str(tmp_path), f"blank{i}.dbs"))
+        with open(dbs_fnames[-1], "w") as f:
+            f.writelines([dbs_lines[0], dbs_lines[1], blank, dbs_lines[2 + i]])
+    ds = calk.read_dbs_many(dbs_fnames)
+    # The blank row from each file is kept, but the repeated run is dropped
+    assert len(ds) == 5
+    assert (ds.file_name == "").sum() == 2
+    assert ds.analysis_datetime.isnull().sum() == 2
+    assert ds.file_name.tolist().count("0-0  0  (0)JUNK1.dat") == 1
+
+
 # test_read_csv()
 # test_read_excel()
 # test_read_dbs()
+# test_read_dbs_rows()
+# test_read_dbs_many()
+# test_read_dbs_many_blank()
@@ -121,6 +121,26 @@ def test_dbs_to_Titration():
     assert np.isclose(tt.emf0, dbs.loc[ix, "emf0"], rtol=0, atol=1e-12)
 
 
+def test_solve_row_results():
+    """Are the results assembled by `solve` the same as solving each row
+    separately, with every result column stored as a float?
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        ds = calk.calibrate(calk.Dataset(dbs.iloc[:20].copy()))
+        for ix in [0, 3, 7]:
+            solved = calk.dataset.solve_row(ds.loc[ix])
+            for k, v in solved.items():
+                if k.startswith("solve_"):
+                    assert ds.loc[ix, k] == v
+                else:
+                    assert ds[k].dtype == float
+                    assert np.isclose(
+                        ds.loc[ix, k], v, rtol=0, atol=0, equal_nan=True
+                    )
+
+
 # test_dbs_calkulate()
 # test_dbs_to_Titration()
 # test_values()
+# test_solve_row_results()
@@ -0,0 +1,56 @@
+# %%
+import numpy as np
+import pytest
+
+import calkulate as calk
+
+
+def test_error_columns(get_dbs):
+    """Are errors recorded in the dataset instead of only being printed?"""
+    dbs = get_dbs()
+    dbs.loc[3, "file_name"] = "does_not_exist.dat"
+    dbs.calibrate()
+    for step in ["calibrate", "solve"]:
+        for column in ["error", "error_message", "stage", "warnings"]:
+            assert f"{step}_{column}" in dbs
+    assert dbs.loc[3, "solve_error"] == "FileNotFoundError"
+    assert dbs.loc[3, "solve_stage"] == "read"
+    assert "does_not_exist.dat" in dbs.loc[3, "solve_error_message"]
+    assert np.isnan(dbs.loc[3, "alkalinity"])
+    good = dbs.index != 3
+    assert (dbs.solve_error[good] == "").all()
+    assert (dbs.solve_stage[good] == "done").all()
+    assert (dbs.calibrate_stage[dbs.station == 666] == "done").all()
+    assert (dbs.calibrate_stage[dbs.station != 666] == "").all()
+
+
+def test_prescreen(get_dbs, monkeypatch):
+    """Does the prescreen catch bad titrations before they are solved, but
+    not hide other errors?
+    """
+    dbs = get_dbs()
+    dbs.loc[3, "file_name"] = "does_not_exist.dat"
+    dbs.prescreen()
+    assert dbs.loc[3, "prescreen_error"] == "file not found"
+    assert not dbs.loc[3, "file_good"]
+    good = dbs.index != 3
+    assert (dbs.prescreen_error[good] == "").all()
+    assert dbs.file_good[good].all()
+    # Demanding more points than any titration has fails every row
+    dbs = get_dbs().prescreen(min_points=1000)
+    assert not dbs.file_good.any()
+    assert dbs.prescreen_error.str.startswith("only").all()
+    dbs.calibrate()
+    assert dbs.alkalinity.isnull().all()
+
+    # Errors that don't come from bad titration data are raised
+    def gran_alkalinity(*args):
+        raise TypeError("bug")
+
+    monkeypatch.setattr(calk.core, "gran_alkalinity", gran_alkalinity)
+    with pytest.raises(TypeError):
+        get_dbs().prescreen()
+
+
+# test_error_columns()
+# test_prescreen()
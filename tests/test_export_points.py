@@ -0,0 +1,48 @@
+# %%
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+def test_export_points(tmp_path, get_dbs):
+    """Do the exported titration points match those from `to_Titration`, and
+    are they split into files by `points_per_file` and partitioned by
+    `analysis_batch`?
+    """
+    path = os.path.join(str(tmp_path), "points")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        dbs = get_dbs().calibrate()
+        dbs["analysis_batch"] = np.arange(20) // 10
+        written = dbs.export_points(path, points_per_file=200)
+    assert len(written) > 2
+    assert all(os.path.isfile(f) for f in written)
+    assert sorted(os.listdir(path)) == ["analysis_batch=0", "analysis_batch=1"]
+    points = pd.read_parquet(path)
+    assert points["index"].nunique() == dbs.titrant_molinity.notnull().sum()
+    for i in [0, 15]:
+        these = points[points["index"] == i].sort_values("point")
+        assert (these.analysis_batch.astype(int) == i // 10).all()
+        titration = dbs.to_Titration(i).titration
+        for c in ["titrant_mass", "emf", "pH", "temperature", "used"]:
+            assert np.allclose(these[c].to_numpy(), titration[c].to_numpy())
+        assert np.isclose(
+            these.alkalinity_all[these.used].mean(),
+            dbs.alkalinity[i],
+            rtol=1e-3,
+        )
+    # Arrow files, with threads, and overwriting
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        written = dbs.export_points(
+            path, file_format="arrow", threads=4, overwrite=True
+        )
+    assert all(f.endswith(".arrow") for f in written)
+    assert not any(
+        f.endswith(".parquet") for _, _, fs in os.walk(path) for f in fs
+    )
+
+
+# test_export_points()
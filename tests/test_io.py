@@ -33,4 +33,105 @@ def test_pclims_io():
         )
 
 
+def test_genfromtxt_io(tmp_path):
+    """Does the fast .dat file reader give the same results as
+    numpy.genfromtxt, including where values are missing?
+    """
+    for file_name in [
+        "tests/data/titration.dat",
+        "tests/data/seawater-CRM-144.dat",
+        "tests/data/ts-vindta/CRM1900884.dat",
+    ]:
+        dd = calk.read_dat(file_name)
+        data = np.genfromtxt(file_name, delimiter="\t", skip_header=2)
+        for i, field in enumerate(dd):
+            assert np.array_equal(field, data[:, i], equal_nan=True)
+    # Missing and invalid values become NaN
+    file_name = str(tmp_path / "missing.dat")
+    with open(file_name, "w") as f:
+        f.write("header\nheader\n0.0\t200.1\t25.0\t9\n0.1\t\t25.1\t9\n")
+        f.write("0.2\tbad\t25.2\t9\n")
+    dd = calk.read_dat(file_name)
+    assert np.array_equal(dd.titrant_amount, [0.0, 0.1, 0.2])
+    assert np.array_equal(
+        dd.measurement, [200.1, np.nan, np.nan], equal_nan=True
+    )
+    # Columns can be chosen in any order
+    dd = calk.read_dat(
+        file_name, col_titrant_amount=3, col_measurement=2, col_temperature=0
+    )
+    assert np.array_equal(dd.titrant_amount, [9, 9, 9])
+    assert np.array_equal(dd.measurement, [25.0, 25.1, 25.2])
+    assert np.array_equal(dd.temperature, [0.0, 0.1, 0.2])
+
+
+def test_write_dat(tmp_path):
+    """Does write_dat give the same file as formatting each line separately,
+    and can write_dat_many write several files?
+    """
+    rng = np.random.default_rng(7)
+    titrant_amount = rng.random(100) * 4
+    measurement = rng.normal(size=100) * 100
+    temperature = [25.0] * 99 + [np.nan]
+    for fmts in [(".3f", ".3f", ".3f"), (".17g", "+09.2e", ">8.1f")]:
+        file_name = str(tmp_path / "written.dat")
+        calk.write_dat(
+            file_name,
+            titrant_amount,
+            measurement,
+            temperature,
+            mode="w",
+            titrant_amount_fmt=fmts[0],
+            measurement_fmt=fmts[1],
+            temperature_fmt=fmts[2],
+        )
+        expected = "Titration data exported by Calkulate\n"
+        expected += "titrant_amount\tmeasurement\ttemperature\n"
+        for values in zip(titrant_amount, measurement, temperature):
+            expected += "\t".join(
+                format(value, fmt) for value, fmt in zip(values, fmts)
+            )
+            expected += "\n"
+        with open(file_name) as f:
+            assert f.read() == expected
+    titrations = {
+        str(tmp_path / f"titration{i}.dat"): (
+            titrant_amount,
+            measurement * i,
+            temperature,
+        )
+        for i in range(5)
+    }
+    calk.write_dat_many(titrations, titrant_amount_fmt=".17g")
+    for file_name in titrations:
+        dd = calk.read_dat(file_name)
+        assert np.array_equal(dd.titrant_amount, titrant_amount)
+
+
+def test_pclims_large(tmp_path):
+    """Can a large PC LIMS Report be read, stopping at the end of the first
+    block of titration data?
+    """
+    with open(file_names[0], "rb") as f:
+        header = f.read().split(b"\n1\t")[0]
+    n_rows = 100_000
+    file_name = str(tmp_path / "PC_LIMS_Report-large.txt")
+    with open(file_name, "wb") as f:
+        f.write(header + b"\n")
+        f.writelines(
+            f"{i + 1}\t{i / 1000:.4f}\t{i / 10:.1f}\t0.0\t0.0\t21.3\r\n".encode()
+            for i in range(n_rows)
+        )
+        f.write(b"$S Mode 2\tV1.0\r\n")
+        f.write(b"1\t9.0\t9.0\t9.0\t9.0\t9.0\r\n")
+    dd = calk.read_dat(file_name, file_type="pclims")
+    assert len(dd.titrant_amount) == n_rows
+    assert np.allclose(dd.titrant_amount, np.arange(n_rows) / 1000)
+    assert np.allclose(dd.measurement, np.arange(n_rows) / 10)
+    assert np.all(dd.temperature == 21.3)
+
+
 # test_pclims_io()
+# test_pclims_large()
+# test_genfromtxt_io()
+# test_write_dat()
@@ -0,0 +1,56 @@
+# %%
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import calkulate as calk
+
+
+fname_dbs = "tests/data/vindta_database.dbs"
+fpath_dbs = "tests/data/vindta_database/"
+dbs = calk.read_dbs(fname_dbs, file_path=fpath_dbs, analyte_volume=97.7)
+dbs = calk.Dataset(dbs.iloc[:20].copy())
+dbs["alkalinity_certified"] = np.where(dbs.station == 666, 2215, np.nan)
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", category=UserWarning)
+    dbs.calibrate()
+
+
+def test_iter_calibrate():
+    """Does iter_calibrate yield the same titrant_molinity_here values as
+    calibrate?
+    """
+    ds = calk.Dataset(dbs[["file_name", "file_path", "salinity"]].copy())
+    ds["analyte_volume"] = 97.7
+    ds["alkalinity_certified"] = dbs.alkalinity_certified
+    records = list(ds.iter_calibrate())
+    assert len(records) == len(dbs)
+    tm = pd.DataFrame(records).set_index("index").titrant_molinity_here
+    assert np.allclose(
+        tm.loc[dbs.index], dbs.titrant_molinity_here, equal_nan=True
+    )
+    assert "titrant_molinity_here" not in ds
+
+
+def test_iter_solve():
+    """Does iter_solve yield the same results as solve, with and without
+    worker processes?
+    """
+    for workers in [None, 2]:
+        ds = calk.Dataset(
+            dbs[["file_name", "file_path", "salinity", "titrant_molinity"]]
+        )
+        ds["analyte_volume"] = 97.7
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=UserWarning)
+            records = list(ds.iter_solve(workers=workers))
+        assert len(records) == len(dbs)
+        assert "alkalinity" not in ds
+        solved = pd.DataFrame(records).set_index("index").loc[dbs.index]
+        for k in ["alkalinity", "emf0", "pH_init"]:
+            assert np.allclose(solved[k], dbs[k], equal_nan=True)
+
+
+# test_iter_calibrate()
+# test_iter_solve()
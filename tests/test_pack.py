@@ -0,0 +1,116 @@
+# %%
+import os
+import shutil
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import calkulate as calk
+from calkulate import pack
+from calkulate.read import archives
+
+
+fpath_dbs = "tests/data/vindta_database/"
+
+
+def test_pack_calibrate(tmp_path, get_dbs):
+    """Does reading titration files from a pack give the same results as
+    reading the original files?
+    """
+    pack_fname = os.path.join(str(tmp_path), "test.calkpack")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        packed = pack.pack_dataset(get_dbs(), pack_fname)
+        dbs_direct = get_dbs().calibrate()
+        dbs_pack = get_dbs(file_path=pack_fname).calibrate()
+    assert len(packed) == 20
+    for file_name in packed:
+        dd_direct = calk.read_dat(os.path.join(fpath_dbs, file_name))
+        dd_pack = calk.read_dat(os.path.join(pack_fname, file_name))
+        for a, b in zip(dd_direct, dd_pack):
+            assert np.array_equal(a, b)
+    assert np.allclose(
+        dbs_pack.alkalinity, dbs_direct.alkalinity, equal_nan=True
+    )
+    assert np.allclose(
+        dbs_pack.titrant_molinity, dbs_direct.titrant_molinity, equal_nan=True
+    )
+    # Missing files are still caught
+    dbs = get_dbs(file_path=pack_fname)
+    dbs.loc[0, "file_name"] = "missing.dat"
+    dbs.prescreen()
+    assert dbs.prescreen_error[0] == "file not found"
+
+
+def test_pack_unpack_verify(tmp_path):
+    """Does a pack verify against its original files, and round-trip exactly
+    through unpack?
+    """
+    pack_fname = os.path.join(str(tmp_path), "test.calkpack")
+    output_path = os.path.join(str(tmp_path), "unpacked")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        pack.pack_files(
+            pack_fname, sorted(os.listdir(fpath_dbs)), file_path=fpath_dbs
+        )
+    assert pack.verify(pack_fname, fpath_dbs) == {}
+    # The original files can also be in an archive
+    zip_fname = shutil.make_archive(
+        os.path.join(str(tmp_path), "vindta"),
+        "zip",
+        "tests/data",
+        "vindta_database",
+    )
+    assert pack.verify(pack_fname, f"{zip_fname}/vindta_database") == {}
+    assert pack.main(["unpack", pack_fname, output_path, "--verify"]) == 0
+    assert pack.verify(pack_fname, output_path) == {}
+    # Changes to the original files are detected
+    file_name = min(os.listdir(output_path))
+    with open(os.path.join(output_path, file_name), "a") as f:
+        f.write("1\t2\t3\n")
+    os.remove(os.path.join(output_path, sorted(os.listdir(output_path))[1]))
+    problems = pack.verify(pack_fname, output_path)
+    assert len(problems) == 2
+    assert problems[file_name] == "different"
+    assert pack.main(["verify", pack_fname, output_path]) == 1
+
+
+def test_pack_orgalk(tmp_path):
+    """Are titrations with four arrays (from "orgalk_excel") refused, rather
+    than packed with one of their arrays lost?
+    """
+    n = 10
+    acid, base, emf, temperature = (
+        np.linspace(0, 4, n),
+        np.zeros(n),
+        np.linspace(250, 150, n),
+        np.full(n, 25.0),
+    )
+    pack_fname = os.path.join(str(tmp_path), "orgalk.calkpack")
+    with pytest.raises(ValueError):
+        archives.write_pack(
+            pack_fname, {"a.xlsx": (acid, base, emf, temperature)}
+        )
+    file_name = os.path.join(str(tmp_path), "a.xlsx")
+    pd.DataFrame(
+        [
+            ["title", "", "", ""],
+            ["acid", "base", "emf", "temperature"],
+            *np.array([acid, base, emf, temperature]).T.tolist(),
+        ]
+    ).to_excel(file_name, header=False, index=False)
+    with pytest.raises(ValueError):
+        pack.pack_files(
+            pack_fname,
+            ["a.xlsx"],
+            file_path=str(tmp_path),
+            file_type="orgalk_excel",
+        )
+    assert not os.path.isfile(pack_fname)
+
+
+# test_pack_calibrate()
+# test_pack_unpack_verify()
+# test_pack_orgalk()
@@ -0,0 +1,67 @@
+# %%
+import os
+import shutil
+import warnings
+
+import numpy as np
+
+import calkulate as calk
+
+
+fname_dbs = "tests/data/vindta_database.dbs"
+fpath_dbs = "tests/data/vindta_database/"
+
+
+def test_resolve_files(tmp_path):
+    """Are file names with different whitespace or case found, and missing
+    files marked as not good?
+    """
+    file_path = str(tmp_path)
+    dbs = calk.read_dbs(fname_dbs, file_path=file_path, analyte_volume=97.7)
+    dbs = calk.Dataset(dbs.iloc[:20].copy())
+    for i, file_name in enumerate(dbs.file_name):
+        new_name = file_name
+        if i == 3:
+            new_name = file_name.replace("  ", " ")
+        elif i == 4:
+            new_name = file_name.upper()
+        if i != 5:
+            shutil.copy2(
+                os.path.join(fpath_dbs, file_name),
+                os.path.join(file_path, new_name),
+            )
+    file_names = dbs.file_name.copy()
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter("always")
+        dbs.resolve_files()
+    assert any(file_names[5] in str(x.message) for x in w)
+    assert dbs.file_name[3] == file_names[3].replace("  ", " ")
+    assert dbs.file_name[4] == file_names[4].upper()
+    assert (dbs.file_name.drop([3, 4]) == file_names.drop([3, 4])).all()
+    assert not dbs.file_good[5]
+    assert dbs.file_good.drop(5).all()
+    # The resolved file names can be solved
+    dbs["alkalinity_certified"] = np.where(dbs.station == 666, 2215, np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        dbs.calibrate()
+    assert (dbs.solve_error.drop(5) == "").all()
+    assert dbs.alkalinity[[3, 4]].notnull().all()
+    # Files can also be found in archives
+    zip_fname = shutil.make_archive(
+        os.path.join(file_path, "vindta"),
+        "zip",
+        "tests/data",
+        "vindta_database",
+    )
+    dbs = calk.read_dbs(
+        fname_dbs,
+        file_path=os.path.join(zip_fname, "vindta_database"),
+        resolve_files=True,
+    )
+    # Including one with a trailing space in its bottle name in the .dbs
+    assert "5-0  0  (0)NUTSL.dat" in dbs.file_name.to_numpy()
+    assert dbs.file_good.all()
+
+
+# test_resolve_files()
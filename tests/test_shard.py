@@ -0,0 +1,58 @@
+# %%
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import calkulate as calk
+from calkulate import shard
+
+
+fname_dbs = "tests/data/vindta_database.dbs"
+fpath_dbs = "tests/data/vindta_database/"
+dbs = calk.read_dbs(fname_dbs, file_path=fpath_dbs, analyte_volume=97.7)
+dbs = calk.Dataset(dbs.iloc[:40].copy())
+dbs["alkalinity_certified"] = np.where(dbs.station == 666, 2215, np.nan)
+dbs["analysis_batch"] = dbs.analysis_datetime.dt.day
+
+
+def test_split_shards():
+    """Are shards split without splitting any analysis_batch?"""
+    shards = shard.split_shards(dbs, 3)
+    assert sum(len(s) for s in shards) == len(dbs)
+    for i, s in enumerate(shards):
+        for other in shards[i + 1 :]:
+            assert not set(s.analysis_batch) & set(other.analysis_batch)
+
+
+def test_combine_batches():
+    """Are batch statistics pooled correctly across shards?"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        ds = calk.Dataset(dbs.copy()).calibrate()
+    batches = calk.dataset.get_batches(ds)
+    # Split the rows into two arbitrary halves that each contain part of
+    # every batch
+    L = np.arange(len(ds)) % 2 == 0
+    combined = shard.combine_batches(
+        [calk.dataset.get_batches(ds[L]), calk.dataset.get_batches(ds[~L])]
+    )
+    assert np.allclose(combined, batches, equal_nan=True)
+
+
+def test_run_local(tmp_path):
+    """Does processing in shards give identical results to processing the
+    whole dataset at once?
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        ds = calk.Dataset(dbs.copy()).calibrate()
+        merged, batches = shard.run_local(dbs.copy(), 2, str(tmp_path))
+    assert isinstance(merged, calk.Dataset)
+    pd.testing.assert_frame_equal(pd.DataFrame(merged), pd.DataFrame(ds))
+    pd.testing.assert_frame_equal(batches, calk.dataset.get_batches(ds))
+
+
+# test_split_shards()
+# test_combine_batches()
+# test_run_local()
@@ -0,0 +1,232 @@
+# %%
+import os
+import shutil
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import calkulate as calk
+
+
+def test_store_reuse(tmp_path, get_dbs):
+    """Are unchanged titrations reused from the store, and only changed ones
+    recomputed?
+    """
+    file_path = str(tmp_path)
+    store = os.path.join(file_path, "results.parquet")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        dbs_direct = get_dbs(file_path, copy_files=True).calibrate()
+        n_solve = dbs_direct.titrant_molinity.notnull().sum()
+        dbs = get_dbs(file_path, copy_files=True).calibrate(store=store)
+        assert dbs.attrs["calibrate_store"] == {"hits": 0, "recomputed": 2}
+        assert dbs.attrs["solve_store"] == {"hits": 0, "recomputed": n_solve}
+        assert np.allclose(
+            dbs.alkalinity, dbs_direct.alkalinity, equal_nan=True
+        )
+        # Running again should reuse everything
+        dbs = get_dbs(file_path, copy_files=True).calibrate(store=store)
+        assert dbs.attrs["calibrate_store"] == {"hits": 2, "recomputed": 0}
+        assert dbs.attrs["solve_store"] == {"hits": n_solve, "recomputed": 0}
+        assert np.allclose(
+            dbs.alkalinity, dbs_direct.alkalinity, equal_nan=True
+        )
+        # Changing one sample means only that sample is solved again
+        dbs = get_dbs(file_path, copy_files=True)
+        dbs.loc[3, "salinity"] += 1
+        dbs.calibrate(store=store)
+        assert dbs.attrs["calibrate_store"] == {"hits": 2, "recomputed": 0}
+        assert dbs.attrs["solve_store"] == {
+            "hits": n_solve - 1,
+            "recomputed": 1,
+        }
+        # Touching a CRM file means it is recalibrated, but its result does
+        # not change, so only that titration is solved again
+        dbs = get_dbs(file_path, copy_files=True)
+        os.utime(
+            os.path.join(file_path, dbs.file_name[7]), ns=(0, 1_000_000_000)
+        )
+        dbs.calibrate(store=store)
+        assert dbs.attrs["calibrate_store"] == {"hits": 1, "recomputed": 1}
+        assert dbs.attrs["solve_store"] == {
+            "hits": n_solve - 1,
+            "recomputed": 1,
+        }
+        # Changing a CRM value means its whole batch is solved again
+        dbs = get_dbs(file_path, copy_files=True)
+        dbs.loc[7, "alkalinity_certified"] += 10
+        dbs.calibrate(store=store)
+        assert dbs.attrs["calibrate_store"] == {"hits": 1, "recomputed": 1}
+        assert dbs.attrs["solve_store"] == {"hits": 0, "recomputed": n_solve}
+
+
+def test_fingerprint_methods(tmp_path):
+    """Do both file fingerprint methods detect changes to a file?"""
+    file_name = os.path.join(str(tmp_path), "titration.dat")
+    shutil.copy2("tests/data/titration.dat", file_name)
+    for method in ["stat", "hash"]:
+        fp = calk.fingerprint.file_fingerprint(file_name, method=method)
+        assert fp != "missing"
+        assert fp == calk.fingerprint.file_fingerprint(
+            file_name, method=method
+        )
+    fp_hash = calk.fingerprint.file_fingerprint(file_name, method="hash")
+    with open(file_name, "a") as f:
+        f.write("\n")
+    assert fp_hash != calk.fingerprint.file_fingerprint(
+        file_name, method="hash"
+    )
+    assert (
+        calk.fingerprint.file_fingerprint(file_name + "x", method="stat")
+        == "missing"
+    )
+
+
+def test_checkpoint_resume(tmp_path, monkeypatch, get_dbs):
+    """Does an interrupted run leave a valid checkpoint that can be resumed
+    from?
+    """
+    file_path = str(tmp_path)
+    checkpoint = os.path.join(file_path, "checkpoint.parquet")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        dbs_direct = get_dbs(file_path, copy_files=True).calibrate()
+        n_solve = dbs_direct.titrant_molinity.notnull().sum()
+        # Interrupt the solver after 7 titrations
+        solve_original = calk.files.solve
+        n_calls = [0]
+
+        def solve_interrupted(*args, **kwargs):
+            n_calls[0] += 1
+            if n_calls[0] > 7:
+                raise KeyboardInterrupt
+            return solve_original(*args, **kwargs)
+
+        monkeypatch.setattr(calk.files, "solve", solve_interrupted)
+        try:
+            get_dbs(file_path, copy_files=True).calibrate(
+                checkpoint=checkpoint, checkpoint_every=3
+            )
+        except KeyboardInterrupt:
+            pass
+        monkeypatch.setattr(calk.files, "solve", solve_original)
+        stored = calk.store.read_store(checkpoint)
+        assert (stored.stage == "calibrate").sum() == 2
+        assert (stored.stage == "solve").sum() == 7
+        # The solve results so far were appended as parts, not yet combined
+        assert len(os.listdir(calk.store.parts_path(checkpoint))) == 3
+        # Resume
+        dbs = get_dbs(file_path, copy_files=True).calibrate(
+            checkpoint=checkpoint, resume=True
+        )
+        assert dbs.attrs["calibrate_store"] == {"hits": 2, "recomputed": 0}
+        assert dbs.attrs["solve_store"] == {
+            "hits": 7,
+            "recomputed": n_solve - 7,
+        }
+        assert np.allclose(
+            dbs.alkalinity, dbs_direct.alkalinity, equal_nan=True
+        )
+        assert not os.path.exists(calk.store.parts_path(checkpoint))
+        # Not resuming starts again from scratch
+        dbs = get_dbs(file_path, copy_files=True).calibrate(
+            checkpoint=checkpoint
+        )
+        assert dbs.attrs["solve_store"] == {"hits": 0, "recomputed": n_solve}
+
+
+def test_store_append(tmp_path):
+    """Are results appended to a Parquet store as parts, with later results
+    overwriting earlier ones, until they are combined?
+    """
+    store = os.path.join(str(tmp_path), "results.parquet")
+    calk.store.write_store(
+        store,
+        pd.DataFrame({"stage": "solve", "x": [1.0, 2.0]}, index=["a", "b"]),
+    )
+    for x in [3.0, 4.0]:
+        calk.store.write_store(
+            store,
+            pd.DataFrame({"stage": "solve", "x": [x]}, index=["b"]),
+            append=True,
+        )
+    calk.store.write_store(
+        store,
+        pd.DataFrame({"stage": "solve", "x": [5.0]}, index=["c"]),
+        append=True,
+    )
+    assert len(os.listdir(calk.store.parts_path(store))) == 3
+    stored = calk.store.read_store(store)
+    assert stored.x.to_dict() == {"a": 1.0, "b": 4.0, "c": 5.0}
+    calk.store.compact_store(store)
+    assert not os.path.exists(calk.store.parts_path(store))
+    pd.testing.assert_frame_equal(calk.store.read_store(store), stored)
+    calk.store.remove_store(store)
+    assert len(calk.store.read_store(store)) == 0
+
+
+def test_sqlite_store_sink(tmp_path, get_dbs):
+    """Can a SQLite database be used as both a result store and a result sink,
+    with re-runs updating the titrations in the sink rather than adding them
+    again?
+    """
+    file_path = str(tmp_path)
+    database = os.path.join(file_path, "results.sqlite")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        dbs_direct = get_dbs(file_path, copy_files=True).calibrate()
+        n_solve = dbs_direct.titrant_molinity.notnull().sum()
+        get_dbs(file_path, copy_files=True).calibrate(
+            store=database, sink=database
+        )
+        dbs = get_dbs(file_path, copy_files=True).calibrate(
+            store=database, sink=database
+        )
+        assert dbs.attrs["solve_store"] == {"hits": n_solve, "recomputed": 0}
+        stored = calk.store.read_store(database)
+        assert (stored.stage == "solve").sum() == n_solve
+        # Every titration is in the sink once, with its results
+        results = calk.store.read_results(database)
+        assert isinstance(results, calk.Dataset)
+        assert len(results) == len(dbs)
+        assert results.file_name.tolist() == dbs.file_name.tolist()
+        assert results.analysis_datetime.equals(
+            dbs.analysis_datetime.set_axis(results.index)
+        )
+        assert np.allclose(
+            results.alkalinity, dbs_direct.alkalinity, equal_nan=True
+        )
+        assert (results.run_stage == "solve").all()
+        assert results.solve_fingerprint.notnull().sum() == n_solve
+        assert results.calibrate_fingerprint.notnull().sum() == 2
+        # Queries
+        crms = calk.store.read_results(database, "station = ?", [666])
+        assert len(crms) == 2
+        assert np.allclose(crms.alkalinity_certified, 2215)
+        assert (
+            len(
+                calk.store.read_results(
+                    database,
+                    "SELECT file_name, alkalinity FROM results"
+                    + " WHERE analysis_datetime < ?",
+                    ["2000-01-01"],
+                )
+            )
+            == 0
+        )
+        # Changed results are updated on a re-run
+        dbs = get_dbs(file_path, copy_files=True)
+        dbs.loc[3, "salinity"] += 1
+        dbs.calibrate(store=database, sink=database)
+        results = calk.store.read_results(database)
+        assert len(results) == len(dbs)
+        assert results.salinity.iloc[3] == dbs.salinity[3]
+        assert np.isclose(results.alkalinity.iloc[3], dbs.alkalinity[3])
+
+
+# test_store_reuse()
+# test_fingerprint_methods()
+# test_checkpoint_resume()
+# test_store_append()
+# test_sqlite_store_sink()
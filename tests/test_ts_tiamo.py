@@ -126,8 +126,32 @@ def test_calibrate_solve_pH():
         assert np.isclose(spr.alkalinity, alkalinity_certified)
 
 
+def test_read_long_export(tmp_path):
+    """Can a large Tiamo export from a long titration be read, with the start
+    volume added to every titrant amount?
+    """
+    with open(
+        os.path.join(filepath, filenames[0]), encoding="unicode_escape"
+    ) as f:
+        lines = f.read().splitlines()
+    gran_line = lines.index("Gran.1")
+    volume_start = float(lines[gran_line - 3].split(";")[2])
+    data_lines = lines[gran_line + 2 :]
+    n_repeats = 200
+    file_name = str(tmp_path / "long.old")
+    with open(file_name, "w", encoding="unicode_escape", newline="\r\n") as f:
+        f.write("\n".join(lines[: gran_line + 2] + data_lines * n_repeats))
+    dd = calk.read.titrations.read_tiamo_de(file_name)
+    assert len(dd.titrant_amount) == len(data_lines) * n_repeats
+    volume = np.array([float(line.split(";")[0]) for line in data_lines])
+    assert np.allclose(
+        dd.titrant_amount[: len(data_lines)], volume + volume_start
+    )
+
+
 # test_read_dat()
 # test_get_dat_data()
 # test_cau()
 # test_calibrate_solve_emf()
 # test_calibrate_solve_pH()
+# test_read_long_export()
@@ -0,0 +1,129 @@
+# %%
+import asyncio
+import os
+import shutil
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import calkulate as calk
+from calkulate.watch import Watcher
+
+
+fname_dbs = "tests/data/vindta_database.dbs"
+fpath_dbs = "tests/data/vindta_database/"
+
+
+def add_crms(dbs):
+    dbs["alkalinity_certified"] = np.where(dbs.station == 666, 2215, np.nan)
+    return dbs
+
+
+def test_watcher(tmp_path):
+    """Does the watcher solve titrations as they appear, with the same results
+    as solving the dataset all at once?
+    """
+    file_path = str(tmp_path)
+    dbs_fname = os.path.join(file_path, "watched.dbs")
+    output = os.path.join(file_path, "results.csv")
+    with open(fname_dbs) as f:
+        dbs_lines = f.readlines()
+    dbs = add_crms(calk.read_dbs(fname_dbs, analyte_volume=97.7))
+    watcher = Watcher(
+        dbs_fname,
+        file_path,
+        output,
+        settle=0,
+        update_dbs=add_crms,
+        read_dbs_kwargs={"analyte_volume": 97.7},
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        # The first 9 rows (including a CRM in row 7) arrive
+        with open(dbs_fname, "w") as f:
+            f.writelines(dbs_lines[:10])
+        for file_name in dbs.file_name[:9]:
+            shutil.copy(os.path.join(fpath_dbs, file_name), file_path)
+        # Files are not processed until they have stopped changing
+        assert asyncio.run(watcher.poll()) == []
+        records = asyncio.run(watcher.poll())
+        assert len(records) == 9
+        assert records[0]["index"] == 7
+        # Then another row arrives, but its file is not there yet
+        with open(dbs_fname, "w") as f:
+            f.writelines(dbs_lines[:11])
+        assert asyncio.run(watcher.poll()) == []
+        shutil.copy(os.path.join(fpath_dbs, dbs.file_name[9]), file_path)
+        asyncio.run(watcher.run(max_polls=2))
+    results = pd.read_csv(output).set_index("index").sort_index()
+    assert (results.index == np.arange(10)).all()
+    # Compare with calibrating the same rows all at once
+    ds = calk.Dataset(dbs.iloc[:10].copy())
+    ds["file_path"] = fpath_dbs
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        ds.calibrate()
+    assert np.allclose(results.titrant_molinity, ds.titrant_molinity)
+    assert np.allclose(results.alkalinity, ds.alkalinity)
+
+
+def no_crms(dbs):
+    dbs["alkalinity_certified"] = np.nan
+    return dbs
+
+
+def test_watcher_dbs_lines(tmp_path):
+    """Are only the complete new lines of the .dbs file parsed, giving the
+    same rows as `read_dbs`, and are samples without a calibration solved with
+    the fallback after `batch_timeout`?
+    """
+    file_path = str(tmp_path)
+    dbs_fname = os.path.join(file_path, "watched.dbs")
+    output = os.path.join(file_path, "results.csv")
+    with open(fname_dbs) as f:
+        dbs_lines = f.readlines()
+    dbs = calk.read_dbs(fname_dbs, analyte_volume=97.7)
+    watcher = Watcher(
+        dbs_fname,
+        file_path,
+        output,
+        settle=0,
+        update_dbs=no_crms,
+        read_dbs_kwargs={"analyte_volume": 97.7},
+        batch_timeout=0,
+        fallback_titrant_molinity=0.1,
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        # The .dbs file is part-way through writing its 6th row
+        with open(dbs_fname, "w") as f:
+            f.writelines(dbs_lines[:6])
+            f.write(dbs_lines[6][:20])
+        asyncio.run(watcher.poll())
+        assert len(watcher.dbs) == 5
+        with open(dbs_fname, "w") as f:
+            f.writelines(dbs_lines[:11])
+        for file_name in dbs.file_name[:10]:
+            shutil.copy(os.path.join(fpath_dbs, file_name), file_path)
+        asyncio.run(watcher.poll())
+        assert len(watcher.dbs) == 10
+        for column in ["file_name", "analysis_datetime", "file_good"]:
+            assert (watcher.dbs[column] == dbs[column].iloc[:10]).all()
+        records = asyncio.run(watcher.poll())
+    # No reference materials, so every sample is solved with the fallback
+    assert len(records) == 10
+    assert all(r["titrant_molinity"] == 0.1 for r in records)
+    assert np.isfinite([r["alkalinity"] for r in records]).any()
+    assert watcher.pending == []
+    # Rewriting the .dbs file from scratch means it is parsed again
+    with open(dbs_fname, "w") as f:
+        f.writelines(dbs_lines[:3])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        asyncio.run(watcher.poll())
+    assert len(watcher.dbs) == 2
+
+
+# test_watcher()
+# test_watcher_dbs_lines()
@@ -0,0 +1,200 @@
+# %%
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import calkulate as calk
+from calkulate.read import workbooks
+
+
+def write_workbook(file_name, n_sheets=3, n_points=20):
+    """Write a workbook with one titration on each sheet, plus a notes sheet."""
+    with pd.ExcelWriter(file_name) as writer:
+        for i in range(n_sheets):
+            data = pd.DataFrame(
+                {
+                    "acid": np.linspace(0, 4, n_points),
+                    "base": np.zeros(n_points),
+                    "emf": np.linspace(250, 150, n_points) + i,
+                    "temperature": np.full(n_points, 25.0),
+                }
+            )
+            sheet_name = f"titration {i}"
+            pd.DataFrame([["title"]]).to_excel(
+                writer, sheet_name=sheet_name, header=False, index=False
+            )
+            data.to_excel(
+                writer, sheet_name=sheet_name, startrow=1, index=False
+            )
+        pd.DataFrame([["notes"], ["none"]]).to_excel(
+            writer, sheet_name="notes", header=False, index=False
+        )
+
+
+def test_read_orgalk_workbook(tmp_path):
+    """Does reading a whole workbook, with and without a sidecar, give the same
+    data as reading each sheet separately, and is the sidecar updated when the
+    workbook changes?
+    """
+    file_name = os.path.join(str(tmp_path), "orgalk.xlsx")
+    write_workbook(file_name)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        titrations = workbooks.read_orgalk_workbook(file_name)
+        assert not os.path.isfile(workbooks.sidecar_fname(file_name))
+        assert workbooks.convert_orgalk_workbooks([file_name]) == [
+            workbooks.sidecar_fname(file_name)
+        ]
+    # The sidecar can be loaded without pickling
+    assert workbooks._read_sidecar(file_name) is not None
+    assert list(titrations) == [f"titration {i}" for i in range(3)]
+    for sheet_name, dat_data in titrations.items():
+        for direct in [
+            calk.read_dat(
+                file_name, file_type="orgalk_excel", sheet_name=sheet_name
+            ),
+            calk.read_dat(
+                file_name,
+                file_type="orgalk_excel",
+                sheet_name=sheet_name,
+                sidecar=True,
+            ),
+        ]:
+            for a, b in zip(direct, dat_data):
+                assert np.array_equal(a, b)
+    sidecar = workbooks.read_orgalk_workbook(
+        file_name, sheet_names=["titration 1"], sidecar=True
+    )
+    assert list(sidecar) == ["titration 1"]
+    # Changing the workbook updates the sidecar
+    write_workbook(file_name, n_sheets=2, n_points=10)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        sidecar = workbooks.read_orgalk_workbook(file_name, sidecar=True)
+    assert len(sidecar) == 2
+    assert len(sidecar["titration 0"][0]) == 10
+    assert len(workbooks.read_orgalk_workbook(file_name, sidecar=True)) == 2
+
+
+def test_orgalk_sidecar_not_saved(tmp_path, monkeypatch):
+    """Are the titrations still returned, with a warning, if their sidecar
+    cannot be saved?
+    """
+    file_name = os.path.join(str(tmp_path), "orgalk.xlsx")
+    write_workbook(file_name, n_sheets=1)
+
+    # The sidecar file cannot be written
+    def replace(src, dst):
+        raise OSError("read-only")
+
+    monkeypatch.setattr(workbooks.os, "replace", replace)
+    with pytest.warns(UserWarning, match="could not save sidecar"):
+        titrations = workbooks.read_orgalk_workbook(file_name, sidecar=True)
+    assert len(titrations["titration 0"][0]) == 20
+    assert os.listdir(str(tmp_path)) == ["orgalk.xlsx"]
+    monkeypatch.undo()
+    # Some of the data are not numbers
+    with pd.ExcelWriter(file_name) as writer:
+        pd.DataFrame([["title"]]).to_excel(
+            writer, sheet_name="bad", header=False, index=False
+        )
+        pd.DataFrame(
+            {
+                "acid": [0.0, 1.0],
+                "base": [0.0, 0.0],
+                "emf": [250.0, "overrange"],
+                "temperature": [25.0, 25.0],
+            }
+        ).to_excel(writer, sheet_name="bad", startrow=1, index=False)
+    with pytest.warns(UserWarning, match="no sidecar saved"):
+        titrations = workbooks.read_orgalk_workbook(file_name, sidecar=True)
+    assert titrations["bad"][2][1] == "overrange"
+    assert not os.path.isfile(workbooks.sidecar_fname(file_name))
+
+
+def test_orgalk_dataset(tmp_path, monkeypatch):
+    """Can titrations on the sheets of a workbook be calibrated and solved
+    through a dataset, with the same results as from .dat files, opening the
+    workbook only once?
+    """
+    file_name = os.path.join(str(tmp_path), "orgalk.xlsx")
+    dd = calk.read_dat("tests/data/titration.dat")
+    with pd.ExcelWriter(file_name) as writer:
+        pd.DataFrame([["notes"]]).to_excel(
+            writer, sheet_name="notes", header=False, index=False
+        )
+        for i in range(3):
+            pd.DataFrame([["title"]]).to_excel(
+                writer, sheet_name=f"sample {i}", header=False, index=False
+            )
+            pd.DataFrame(
+                {
+                    "acid": dd.titrant_amount,
+                    "base": np.zeros_like(dd.titrant_amount),
+                    "emf": dd.measurement,
+                    "temperature": dd.temperature,
+                }
+            ).to_excel(
+                writer, sheet_name=f"sample {i}", startrow=1, index=False
+            )
+    metadata = {
+        "alkalinity_certified": [2300.0, np.nan, np.nan],
+        "salinity": 35.0,
+        "analyte_mass": 0.1,
+    }
+    ds_dat = calk.Dataset(
+        {
+            "file_name": "titration.dat",
+            "file_path": "tests/data/",
+            **metadata,
+        }
+    )
+    ds_orgalk = calk.Dataset(
+        {
+            "file_name": "orgalk.xlsx",
+            "file_path": str(tmp_path),
+            "file_type": "orgalk_excel",
+            # Integer sheet names count all of the sheets, with or without
+            # a sidecar
+            "sheet_name": ["sample 0", "sample 1", 3],
+            **metadata,
+        }
+    )
+    read_excel = pd.read_excel
+    n_read = []
+
+    def count_read_excel(*args, **kwargs):
+        n_read.append(1)
+        return read_excel(*args, **kwargs)
+
+    monkeypatch.setattr(workbooks.pd, "read_excel", count_read_excel)
+    workbooks._load_workbook.cache_clear()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=UserWarning)
+        ds_dat.calkulate()
+        for sidecar in [False, True]:
+            ds = calk.Dataset(ds_orgalk.copy())
+            ds["sidecar"] = sidecar
+            ds.calkulate()
+            assert np.allclose(ds.alkalinity, ds_dat.alkalinity)
+            assert np.allclose(ds.titrant_molinity, ds_dat.titrant_molinity)
+    assert len(n_read) == 2
+    assert os.path.isfile(workbooks.sidecar_fname(file_name))
+    for sidecar in [False, True]:
+        assert np.array_equal(
+            calk.read_dat(
+                file_name,
+                file_type="orgalk_excel",
+                sheet_name=3,
+                sidecar=sidecar,
+            ).emf,
+            dd.measurement,
+        )
+
+
+# test_read_orgalk_workbook()
+# test_orgalk_sidecar_not_saved()
+# test_orgalk_dataset()